@@ -58,35 +58,37 @@ def build_travel_info(row: Dict[str, Any]) -> str:
 
 
 def augment_csv_file(path: str) -> None:
-	with open(path, "r", encoding="utf-8-sig", newline="") as f:
-		reader = csv.DictReader(f)
-		rows = list(reader)
+	# Rows are streamed from the original file to the rewritten one, so memory
+	# does not grow with the size of the city
+	tmp_path = path + ".tmp"
+	with open(path, "r", encoding="utf-8-sig", newline="") as src, open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+		reader = csv.DictReader(src)
 		original_fields = reader.fieldnames or []
 
-	# Build combined header, appending new columns at the end
-	fieldnames = original_fields + [c for c in NEW_COLUMNS if c not in original_fields]
+		# Build combined header, appending new columns at the end
+		fieldnames = original_fields + [c for c in NEW_COLUMNS if c not in original_fields]
 
-	tmp_path = path + ".tmp"
-	with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
 		writer = csv.DictWriter(f, fieldnames=fieldnames)
 		writer.writeheader()
-		for r in rows:
-			augmented = dict(r)
-			# Fill requested columns
-			augmented["Name"] = r.get("name", "")
-			augmented["Address"] = r.get("address", "")
-			augmented["Fee Structure"] = augmented.get("Fee Structure", "") or ""
-			augmented["Basic Infomation"] = build_basic_info(r)
-			augmented["Contact Details"] = build_contact_details(r)
-			augmented["FAQ"] = augmented.get("FAQ", "") or ""
-			augmented["Admission Details"] = augmented.get("Admission Details", "") or ""
-			augmented["Other Key Infomation"] = augmented.get("Other Key Infomation", "") or (r.get("osm_url", "") or "")
-			augmented["School Infrastructure Details"] = augmented.get("School Infrastructure Details", "") or ""
-			augmented["Co-Curricular Activities"] = augmented.get("Co-Curricular Activities", "") or ""
-			augmented["Travel Infomation"] = build_travel_info(r)
-			augmented["Review"] = augmented.get("Review", "") or ""
-			augmented["Summary"] = augmented.get("Summary", "") or ""
-			writer.writerow(augmented)
+		for r in reader:
+			# Fill requested columns (derived values are computed before overwriting)
+			basic_info = build_basic_info(r)
+			contact_details = build_contact_details(r)
+			travel_info = build_travel_info(r)
+			r["Name"] = r.get("name", "")
+			r["Address"] = r.get("address", "")
+			r["Fee Structure"] = r.get("Fee Structure", "") or ""
+			r["Basic Infomation"] = basic_info
+			r["Contact Details"] = contact_details
+			r["FAQ"] = r.get("FAQ", "") or ""
+			r["Admission Details"] = r.get("Admission Details", "") or ""
+			r["Other Key Infomation"] = r.get("Other Key Infomation", "") or (r.get("osm_url", "") or "")
+			r["School Infrastructure Details"] = r.get("School Infrastructure Details", "") or ""
+			r["Co-Curricular Activities"] = r.get("Co-Curricular Activities", "") or ""
+			r["Travel Infomation"] = travel_info
+			r["Review"] = r.get("Review", "") or ""
+			r["Summary"] = r.get("Summary", "") or ""
+			writer.writerow(r)
 
 	os.replace(tmp_path, path)
 
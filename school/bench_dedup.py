@@ -0,0 +1,156 @@
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from dedup_schools import Deduper
+
+# Longitude offset of each replica, far enough that replicas never share a cell
+REPLICA_SHIFT_DEG = 40.0
+
+
+def load_rows(paths: Sequence[str]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+	out: List[Tuple[str, List[Dict[str, Any]]]] = []
+	for path in paths:
+		with open(path, "r", encoding="utf-8") as f:
+			out.append((os.path.basename(path).replace("_schools.json", ""), json.load(f)))
+	return out
+
+
+def replicate(cities: Sequence[Tuple[str, List[Dict[str, Any]]]], scale: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+	# Copies of the whole data set moved east, so the row count grows while the
+	# density of schools (and so the block sizes) stays that of the real data
+	out = list(cities)
+	for n in range(1, scale):
+		for city, rows in cities:
+			copies = []
+			for row in rows:
+				copy = dict(row)
+				if copy.get("lon") is not None:
+					copy["lon"] += n * REPLICA_SHIFT_DEG
+				copy["osm_url"] = f"{row.get('osm_url') or ''}#{n}"
+				copies.append(copy)
+			out.append((f"{city}#{n}", copies))
+	return out
+
+
+def plant_duplicates(cities: Sequence[Tuple[str, List[Dict[str, Any]]]], share: float, seed: int = 0) -> Tuple[List[Tuple[str, List[Dict[str, Any]]]], List[Tuple[str, str]]]:
+	# A second entry for a share of the named schools, up to ~15 m away, as a
+	# mapper adding a way next to an existing node would. Returns the rows and
+	# the (original, planted) osm_url pairs that should end up in one cluster.
+	r = random.Random(seed)
+	out: List[Tuple[str, List[Dict[str, Any]]]] = []
+	planted: List[Tuple[str, str]] = []
+	for city, rows in cities:
+		extra = []
+		for row in rows:
+			if not row.get("name") or row.get("lat") is None or r.random() >= share:
+				continue
+			copy = dict(row)
+			copy["lat"] += r.uniform(-0.0001, 0.0001)
+			copy["lon"] += r.uniform(-0.0001, 0.0001)
+			copy["osm_url"] = f"{row.get('osm_url') or ''}#dup"
+			extra.append(copy)
+			planted.append((row.get("osm_url") or "", copy["osm_url"]))
+		out.append((city, rows + extra))
+	return out, planted
+
+
+def brute_matches(deduper: Deduper) -> Set[Tuple[int, int]]:
+	# Every pair scored: what blocking has to agree with
+	n = len(deduper.records)
+	out = set()
+	for i in range(n):
+		for j in range(i + 1, n):
+			m = deduper.score(i, j)
+			if m is not None and m.score >= deduper.threshold:
+				out.add((i, j))
+	return out
+
+
+def blocked_matches(deduper: Deduper) -> Set[Tuple[int, int]]:
+	out = set()
+	for i, j in deduper._candidates(deduper._blocks()):
+		m = deduper.score(i, j)
+		if m is not None and m.score >= deduper.threshold:
+			out.add((i, j))
+	return out
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark duplicate detection: blocking vs all pairs, and run time as the data grows.")
+	parser.add_argument("files", nargs="*", help="<city>_schools.json files (default: all in this directory)")
+	parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="replicas of the data set to time")
+	parser.add_argument("--planted", type=float, default=0.1, help="share of schools given a second, planted entry")
+	parser.add_argument("--brute-max", type=int, default=1500, help="compare with all-pairs scoring for files up to this many rows")
+	parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement; the best is reported")
+	args = parser.parse_args(sys.argv[1:])
+
+	paths = args.files or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*_schools.json")))
+	if not paths:
+		print("No *_schools.json files found", file=sys.stderr)
+		return 1
+	cities, planted = plant_duplicates(load_rows(paths), args.planted)
+
+	# Blocking recall: matches found through blocks vs scoring every pair; any
+	# pair only all-pairs scoring finds is listed for review
+	print(f"{'file':<12} {'rows':>6} {'all pairs':>10} {'candidates':>11} {'brute ms':>9} {'blocked ms':>11} {'matches':>8} {'missed':>7}")
+	missed: List[str] = []
+	for city, rows in cities:
+		if len(rows) > args.brute_max:
+			continue
+		deduper = Deduper()
+		deduper.add(city, rows)
+		deduper.common = deduper._common_tokens()
+		t0 = time.perf_counter()
+		brute = brute_matches(deduper)
+		brute_s = time.perf_counter() - t0
+		t0 = time.perf_counter()
+		blocked = blocked_matches(deduper)
+		blocked_s = time.perf_counter() - t0
+		candidates = len(deduper._candidates(deduper._blocks()))
+		for i, j in sorted(brute - blocked):
+			missed.append(f"{city}: {deduper.records[i].row.get('name')} / {deduper.records[j].row.get('name')}")
+		print(
+			f"{city:<12} {len(rows):>6} {len(rows) * (len(rows) - 1) // 2:>10} {candidates:>11} {brute_s * 1000:>9.1f} "
+			f"{blocked_s * 1000:>11.1f} {len(brute):>8} {len(brute - blocked):>7}"
+		)
+
+	# Scaling: the full pipeline over growing replicas of every file
+	print()
+	print(f"{'scale':>5} {'rows':>8} {'candidates':>11} {'pairs/row':>10} {'clusters':>9} {'ms':>9} {'us/row':>7} {'planted found':>14}")
+	lost = 0
+	for scale in args.scales:
+		data = replicate(cities, scale)
+		best = float("inf")
+		for _ in range(args.repeat):
+			deduper = Deduper()
+			for city, rows in data:
+				deduper.add(city, rows)
+			t0 = time.perf_counter()
+			clusters = deduper.run()
+			best = min(best, time.perf_counter() - t0)
+		cluster_of = {deduper.records[i].row.get("osm_url"): n for n, ids in enumerate(clusters) for i in ids}
+		found = sum(1 for a, b in planted if a in cluster_of and cluster_of[a] == cluster_of.get(b))
+		lost += len(planted) - found
+		s = deduper.stats
+		print(
+			f"{scale:>5} {s.rows:>8} {s.candidate_pairs:>11} {s.candidate_pairs / s.rows:>10.2f} {s.clusters:>9} "
+			f"{best * 1000:>9.1f} {best * 1e6 / s.rows:>7.1f} {f'{found}/{len(planted)}':>14}"
+		)
+	if missed:
+		print(f"\n{len(missed)} all-pairs matches not found through blocking:")
+		for line in missed:
+			print(f"  {line}")
+	if lost:
+		print(f"{lost} planted duplicates not clustered with their original", file=sys.stderr)
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,142 @@
+import argparse
+import glob
+import gzip
+import html
+import json
+import os
+import random
+import re
+import sys
+import time
+import urllib.parse
+from typing import Callable, List, Tuple
+
+from enrich_csvs import LINK_HINTS, links_for_hints
+from html_tokens import parse_html
+from page_cache import PAGE_CACHE_DIR
+
+
+def legacy_strip_html_get_text(html_text: str) -> str:
+	html_text = re.sub(r"(?is)<script[^>]*>.*?</script>", " ", html_text)
+	html_text = re.sub(r"(?is)<style[^>]*>.*?</style>", " ", html_text)
+	text = re.sub(r"(?is)<[^>]+>", " ", html_text)
+	text = html.unescape(text)
+	text = re.sub(r"\s+", " ", text).strip()
+	return text
+
+
+def legacy_find_internal_links(html_text: str, base_url: str, hint_keywords: List[str]) -> List[str]:
+	links: List[str] = []
+	for m in re.finditer(r"(?is)<a[^>]+href=\"([^\"]+)\"[^>]*>(.*?)</a>", html_text):
+		href = m.group(1)
+		anchor = legacy_strip_html_get_text(m.group(2))[:120].lower()
+		if any(h in anchor for h in hint_keywords) or any(h in href.lower() for h in hint_keywords):
+			links.append(urllib.parse.urljoin(base_url, href))
+	seen = set()
+	uniq: List[str] = []
+	for u in links:
+		if u not in seen:
+			uniq.append(u)
+			seen.add(u)
+	return uniq[:6]
+
+
+def legacy_homepage(html_text: str) -> Tuple[str, List[List[str]]]:
+	# What enrich_from_website did per homepage: one text pass plus one link
+	# scan per LINK_HINTS section
+	text = legacy_strip_html_get_text(html_text)
+	return text, [legacy_find_internal_links(html_text, BASE_URL, hints) for hints in LINK_HINTS.values()]
+
+
+def tokenized_homepage(html_text: str) -> Tuple[str, List[List[str]]]:
+	page = parse_html(html_text)
+	return page.text, [links_for_hints(page, BASE_URL, hints) for hints in LINK_HINTS.values()]
+
+
+BASE_URL = "http://school.example/"
+WORDS = (
+	"school admission admissions fees fee structure campus library sports music dance faq apply registration tuition "
+	"infrastructure facilities activities clubs testimonial review our the and of students parents teachers welcome"
+).split()
+
+
+def synthetic_page(seed: int, blocks: int = 400) -> str:
+	# Stand-in for a school homepage: nav links, scripts with markup in strings,
+	# comments, headings, entities and a lot of paragraph text
+	r = random.Random(seed)
+	out = [f"<!DOCTYPE html><html><head><title>School {seed}</title>"]
+	out.append("<style>body{color:#333} .nav>li{display:inline}</style>")
+	out.append("<script>var menu='<a href=\"/fees-js\">Fees</a>'; if (a<b && c>d) {}</script><script src=\"x.js\"></script>")
+	out.append("</head><body><nav><ul>")
+	out.extend(f'<li><a class="nav" href="/{w}.html">{w.title()} &amp; More</a></li>' for w in r.sample(WORDS, 8))
+	out.append("</ul></nav>")
+	for i in range(blocks):
+		k = r.random()
+		if k < 0.1:
+			level = r.randint(1, 4)
+			out.append(f"<h{level}>{' '.join(r.choices(WORDS, k=4)).title()}</h{level}>")
+		elif k < 0.2:
+			out.append(f'<p><a href="/page{i}?a=1&amp;b=2" title="x">{" ".join(r.choices(WORDS, k=3))} <span>more</span></a></p>')
+		elif k < 0.25:
+			out.append("<!-- banner <b>old</b> -->")
+		elif k < 0.3:
+			out.append(f'<img src="/img{i}.png" alt="photo">')
+		else:
+			out.append(f"<div class=\"c{i}\"><p>{' '.join(r.choices(WORDS, k=r.randint(5, 40)))} &nbsp; &#8377; {r.randint(1, 90)}000</p></div>\n")
+	out.append("</body></html>")
+	return "".join(out)
+
+
+def load_corpus(source: str) -> List[str]:
+	# .html/.htm files, or a page cache directory written with enrich_csvs.py --page-cache
+	pages: List[str] = []
+	for path in sorted(glob.glob(os.path.join(source, "**", "*"), recursive=True)):
+		try:
+			if path.endswith((".html", ".htm")):
+				with open(path, "r", encoding="utf-8", errors="ignore") as f:
+					pages.append(f.read())
+			elif path.endswith(".json.gz"):
+				with gzip.open(path, "rt", encoding="utf-8") as f:
+					pages.append(json.load(f)["text"])
+		except (OSError, ValueError, KeyError):
+			continue
+	return pages
+
+
+def best_seconds(fn: Callable[[str], object], pages: List[str], repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		for p in pages:
+			fn(p)
+		best = min(best, time.perf_counter() - t0)
+	return best
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark homepage text + link extraction: regex passes vs one tokenizer pass.")
+	parser.add_argument("source", nargs="?", default=PAGE_CACHE_DIR, help=f"directory of saved pages (.html or a page cache; default: {PAGE_CACHE_DIR})")
+	parser.add_argument("--synthetic", type=int, default=50, metavar="N", help="pages to generate when the source has none")
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args(sys.argv[1:])
+
+	pages = load_corpus(args.source) if os.path.isdir(args.source) else []
+	label = args.source
+	if not pages:
+		pages = [synthetic_page(i) for i in range(args.synthetic)]
+		label = "synthetic"
+	total_mb = sum(len(p) for p in pages) / 1e6
+
+	mismatches = sum(1 for p in pages if legacy_homepage(p) != tokenized_homepage(p))
+
+	legacy_s = best_seconds(legacy_homepage, pages, args.repeat)
+	tokenized_s = best_seconds(tokenized_homepage, pages, args.repeat)
+	print(f"{len(pages)} pages ({label}), {total_mb:.1f} MB, {mismatches} with different text/links")
+	print(f"{'implementation':<16} {'ms/page':>9} {'MB/s':>8} {'speedup':>8}")
+	for name, secs in (("regex passes", legacy_s), ("tokenizer", tokenized_s)):
+		print(f"{name:<16} {secs * 1000 / len(pages):>9.2f} {total_mb / secs:>8.1f} {legacy_s / secs:>7.2f}x")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import sys
+from typing import Dict, List, Tuple
+
+from bench_html_parse import BASE_URL, best_seconds, load_corpus, synthetic_page
+from enrich_csvs import HOMEPAGE_SECTIONS, LINK_HINTS, SECTION_KEYWORDS, extract_snippets, links_for_hints, section_links
+from html_tokens import ParsedPage, parse_html
+from page_cache import PAGE_CACHE_DIR
+
+
+def legacy_extract_snippet(text: str, keywords: List[str], max_chars: int = 450) -> str:
+	if not text:
+		return ""
+	text_l = text.lower()
+	best_idx = -1
+	for kw in keywords:
+		idx = text_l.find(kw.lower())
+		if idx != -1 and (best_idx == -1 or idx < best_idx):
+			best_idx = idx
+	if best_idx == -1:
+		return ""
+	start = max(0, best_idx - 180)
+	end = min(len(text), best_idx + max_chars)
+	snippet = text[start:end]
+	return snippet.strip()
+
+
+def legacy_snippets(text: str) -> Dict[str, str]:
+	# What enrich_from_website did with a homepage: one extract_snippet call per column
+	out: Dict[str, str] = {}
+	for col in HOMEPAGE_SECTIONS:
+		val = legacy_extract_snippet(text, SECTION_KEYWORDS[col])
+		if val:
+			out[col] = val
+	return out
+
+
+def matcher_snippets(text: str) -> Dict[str, str]:
+	return extract_snippets(text, HOMEPAGE_SECTIONS)
+
+
+def legacy_links(page: ParsedPage) -> List[List[str]]:
+	return [links_for_hints(page, BASE_URL, hints) for hints in LINK_HINTS.values()]
+
+
+def matcher_links(page: ParsedPage) -> List[List[str]]:
+	return list(section_links(page, BASE_URL).values())
+
+
+FILLER = (
+	"the school was founded to provide quality education to every child in the neighbourhood with dedicated "
+	"teachers modern classrooms and a strong focus on values discipline and holistic development of students"
+).split()
+
+
+def sparse_text(seed: int, words: int = 50_000) -> str:
+	# Long page text where the section keywords are rare and late, so every
+	# keyword that is missing costs a full scan
+	r = random.Random(seed)
+	out = r.choices(FILLER, k=words)
+	keywords = [kw for kws in SECTION_KEYWORDS.values() for kw in kws]
+	for kw in r.sample(keywords, 4):
+		out.insert(r.randrange(words // 2, words), kw.title())
+	return " ".join(out)
+
+
+def report(title: str, rows: List[Tuple[str, float]], count: int, mismatches: int) -> None:
+	base = rows[0][1]
+	print(f"{title}: {count} pages, {mismatches} with different results")
+	print(f"  {'implementation':<22} {'ms/page':>9} {'speedup':>8}")
+	for name, secs in rows:
+		print(f"  {name:<22} {secs * 1000 / count:>9.3f} {base / secs:>7.2f}x")
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark section snippet and link matching: per-column scans vs compiled keyword groups.")
+	parser.add_argument("source", nargs="?", default=PAGE_CACHE_DIR, help=f"directory of saved pages (.html or a page cache; default: {PAGE_CACHE_DIR})")
+	parser.add_argument("--synthetic", type=int, default=50, metavar="N", help="pages to generate when the source has none")
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args(sys.argv[1:])
+
+	htmls = load_corpus(args.source) if os.path.isdir(args.source) else []
+	label = args.source
+	if not htmls:
+		htmls = [synthetic_page(i) for i in range(args.synthetic)]
+		label = "synthetic"
+	pages = [parse_html(h) for h in htmls]
+	corpora = [
+		(f"homepage text ({label})", [p.text for p in pages]),
+		("long text, sparse keywords", [sparse_text(i) for i in range(args.synthetic)]),
+	]
+
+	for title, texts in corpora:
+		mismatches = sum(1 for t in texts if legacy_snippets(t) != matcher_snippets(t))
+		report(title, [
+			("extract_snippet x col", best_seconds(legacy_snippets, texts, args.repeat)),
+			("extract_snippets", best_seconds(matcher_snippets, texts, args.repeat)),
+		], len(texts), mismatches)
+
+	mismatches = sum(1 for p in pages if legacy_links(p) != matcher_links(p))
+	report(f"homepage links ({label})", [
+		("links_for_hints x col", best_seconds(legacy_links, pages, args.repeat)),
+		("section_links", best_seconds(matcher_links, pages, args.repeat)),
+	], len(pages), mismatches)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from multi_city_schools import DEFAULT_CITIES, OVERPASS_ENDPOINTS, build_query_for_city, to_school_row
+from overpass_query import SCHOOL_ROW_TAGS, normalize_element
+
+
+# (label, mode, tags) compared for every city
+VARIANTS: List[Tuple[str, str, Optional[List[str]]]] = [
+	("full", "full", None),
+	("center", "center", None),
+	("center+tags", "center", SCHOOL_ROW_TAGS),
+]
+
+
+def post_bytes(query: str) -> bytes:
+	last_err: Optional[Exception] = None
+	for endpoint in OVERPASS_ENDPOINTS:
+		try:
+			req = urllib.request.Request(endpoint, data=query.encode("utf-8"))
+			req.add_header("Content-Type", "text/plain; charset=utf-8")
+			with urllib.request.urlopen(req, timeout=240) as resp:
+				if resp.getcode() == 200:
+					return resp.read()
+				last_err = RuntimeError(f"HTTP {resp.getcode()} from {endpoint}")
+		except Exception as e:  # noqa: BLE001
+			last_err = e
+	raise last_err or RuntimeError("no Overpass endpoint configured")
+
+
+def measure(raw: bytes) -> Dict[str, float]:
+	t0 = time.perf_counter()
+	resp = json.loads(raw.decode("utf-8", errors="replace"))
+	t1 = time.perf_counter()
+	elements = resp.get("elements", []) if isinstance(resp, dict) else []
+	rows = [to_school_row(normalize_element(el)) for el in elements if isinstance(el, dict)]
+	rows = [r for r in rows if r.get("name")]
+	t2 = time.perf_counter()
+	return {
+		"bytes": float(len(raw)),
+		"elements": float(len(elements)),
+		"rows": float(len(rows)),
+		"parse_ms": (t1 - t0) * 1000.0,
+		"rows_ms": (t2 - t1) * 1000.0,
+	}
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Compare Overpass query output modes per city.")
+	parser.add_argument("cities", nargs="?", default="", help="comma-separated city keys (default: all)")
+	parser.add_argument("--save", metavar="DIR", help="store raw responses as <city>.<variant>.json in DIR")
+	parser.add_argument("--from", dest="from_dir", metavar="DIR", help="read raw responses saved with --save instead of querying")
+	args = parser.parse_args(sys.argv[1:])
+
+	keys = [k.strip().lower() for k in args.cities.split(",") if k.strip()]
+	cities = [c for c in DEFAULT_CITIES if not keys or c.key in keys]
+	if args.save:
+		os.makedirs(args.save, exist_ok=True)
+
+	print(f"{'city':<10} {'variant':<12} {'bytes':>11} {'elements':>9} {'rows':>6} {'parse ms':>9} {'rows ms':>8}")
+	for cfg in cities:
+		baseline: Optional[float] = None
+		for label, mode, tags in VARIANTS:
+			name = f"{cfg.key}.{label}.json"
+			try:
+				if args.from_dir:
+					with open(os.path.join(args.from_dir, name), "rb") as f:
+						raw = f.read()
+				else:
+					raw = post_bytes(build_query_for_city(cfg, mode, tags))
+					if args.save:
+						with open(os.path.join(args.save, name), "wb") as f:
+							f.write(raw)
+			except Exception as e:  # noqa: BLE001
+				print(f"{cfg.key:<10} {label:<12} ERROR: {e}")
+				continue
+			m = measure(raw)
+			if baseline is None:
+				baseline = m["bytes"]
+			share = f" ({100.0 * m['bytes'] / baseline:.0f}%)" if baseline else ""
+			print(
+				f"{cfg.key:<10} {label:<12} {int(m['bytes']):>11} {int(m['elements']):>9} {int(m['rows']):>6}"
+				f" {m['parse_ms']:>9.1f} {m['rows_ms']:>8.1f}{share}",
+				flush=True,
+			)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
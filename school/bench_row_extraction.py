@@ -0,0 +1,186 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from school_rows import extract_rows
+
+
+# Row field -> tag it is rebuilt from when turning saved rows back into elements
+FIELD_TAGS = {
+	"name": "name",
+	"address": "addr:street",
+	"website": "website",
+	"operator": "operator",
+	"operator_type": "operator:type",
+	"board": "education:board",
+	"levels": "isced:level",
+	"gender": "school:gender",
+	"religion": "religion",
+	"language": "language",
+}
+
+
+def legacy_first_nonempty(*values: Optional[str]) -> str:
+	for v in values:
+		if v and str(v).strip():
+			return str(v).strip()
+	return ""
+
+
+def legacy_join_semicolon(values: List[str]) -> str:
+	parts: List[str] = []
+	for v in values:
+		if not v:
+			continue
+		for p in str(v).replace(" ", "").split(";"):
+			if p and p not in parts:
+				parts.append(p)
+	return ", ".join(parts)
+
+
+def legacy_to_school_row(el: Dict[str, Any]) -> Dict[str, Any]:
+	# The hand-written to_school_row that school_rows.ROW_SPEC replaced, kept as the baseline
+	etype = el.get("type", "")
+	eid = el.get("id")
+	tags: Dict[str, str] = el.get("tags", {}) or {}
+	name = tags.get("name", "")
+
+	lat: Optional[float] = None
+	lon: Optional[float] = None
+	if "lat" in el and "lon" in el:
+		lat = float(el["lat"])
+		lon = float(el["lon"])
+	elif "center" in el and isinstance(el["center"], dict):
+		lat = float(el["center"].get("lat"))
+		lon = float(el["center"].get("lon"))
+
+	housenumber = tags.get("addr:housenumber", "")
+	street = tags.get("addr:street", "")
+	suburb = legacy_first_nonempty(tags.get("addr:suburb"), tags.get("addr:neighbourhood"), tags.get("addr:locality"))
+	city = legacy_first_nonempty(tags.get("addr:city"), tags.get("is_in:city"))
+	state = tags.get("addr:state", "")
+	postcode = tags.get("addr:postcode", "")
+	addr_parts = [
+		" ".join([p for p in [housenumber, street] if p]).strip(),
+		suburb,
+		city,
+		state,
+		postcode,
+	]
+	address = ", ".join([p for p in addr_parts if p])
+
+	phone = legacy_join_semicolon([
+		tags.get("contact:phone", ""),
+		tags.get("contact:mobile", ""),
+		tags.get("phone", ""),
+	])
+	website = legacy_first_nonempty(tags.get("contact:website"), tags.get("website"), tags.get("url"))
+	operator = tags.get("operator", "")
+	operator_type = tags.get("operator:type", "")
+	board = legacy_first_nonempty(tags.get("education:board"), tags.get("board"))
+	levels = legacy_first_nonempty(tags.get("isced:level"), tags.get("grades"), tags.get("level"))
+	gender = legacy_first_nonempty(tags.get("school:gender"), tags.get("gender"))
+	religion = tags.get("religion", "")
+	language = legacy_first_nonempty(tags.get("language"), tags.get("medium"), tags.get("medium_of_instruction"))
+
+	osm_url = f"https://www.openstreetmap.org/{etype}/{eid}" if etype and eid is not None else ""
+
+	return {
+		"name": name,
+		"address": address,
+		"phone": phone,
+		"website": website,
+		"operator": operator,
+		"operator_type": operator_type,
+		"board": board,
+		"levels": levels,
+		"gender": gender,
+		"religion": religion,
+		"language": language,
+		"lat": lat,
+		"lon": lon,
+		"osm_url": osm_url,
+	}
+
+
+def row_to_element(row: Dict[str, Any]) -> Dict[str, Any]:
+	# Rebuild an Overpass-like element from a saved row. Phones are split back
+	# into ;-lists and repeated under phone= so the dedup path is exercised.
+	tags = {"amenity": "school"}
+	tags.update({tag: row[field] for field, tag in FIELD_TAGS.items() if row.get(field)})
+	if row.get("phone"):
+		phones = row["phone"].replace(", ", ";")
+		tags["contact:phone"] = phones
+		tags["phone"] = phones.split(";")[0]
+	el: Dict[str, Any] = {"tags": tags}
+	url = row.get("osm_url") or ""
+	parts = url.rsplit("/", 2)
+	if len(parts) == 3 and parts[2].isdigit():
+		el["type"] = parts[1]
+		el["id"] = int(parts[2])
+	if row.get("lat") is not None and row.get("lon") is not None:
+		if el.get("type") == "node":
+			el["lat"], el["lon"] = row["lat"], row["lon"]
+		else:
+			el["center"] = {"lat": row["lat"], "lon": row["lon"]}
+	return el
+
+
+def load_elements(paths: List[str]) -> List[Dict[str, Any]]:
+	elements: List[Dict[str, Any]] = []
+	for path in paths:
+		with open(path, "r", encoding="utf-8") as f:
+			rows = json.load(f)
+		elements.extend(row_to_element(r) for r in rows if isinstance(r, dict))
+	return elements
+
+
+def best_rate(convert: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]], elements: List[Dict[str, Any]], repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		convert(elements)
+		best = min(best, time.perf_counter() - t0)
+	return len(elements) / best if best > 0 else float("inf")
+
+
+def legacy_extract(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+	rows = [legacy_to_school_row(el) for el in elements if isinstance(el, dict)]
+	return [r for r in rows if r.get("name")]
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark Overpass element -> school row extraction.")
+	parser.add_argument("files", nargs="*", help="<city>_schools.json fixtures (default: all in this directory)")
+	parser.add_argument("--repeat", type=int, default=7, help="timed runs per implementation; the best is reported")
+	parser.add_argument("--scale", type=int, default=10, help="replicate the fixture elements this many times")
+	args = parser.parse_args(sys.argv[1:])
+
+	paths = args.files or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*_schools.json")))
+	if not paths:
+		print("No *_schools.json fixtures found", file=sys.stderr)
+		return 1
+	elements = load_elements(paths) * max(1, args.scale)
+
+	before = legacy_extract(elements)
+	after = extract_rows(elements)
+	if before != after:
+		print("Row mismatch between legacy and compiled extraction", file=sys.stderr)
+		return 1
+
+	legacy_rate = best_rate(legacy_extract, elements, args.repeat)
+	compiled_rate = best_rate(extract_rows, elements, args.repeat)
+
+	print(f"{len(paths)} fixtures, {len(elements)} elements, {len(after)} rows (identical)")
+	print(f"{'implementation':<22} {'elements/s':>12} {'speedup':>8}")
+	print(f"{'legacy to_school_row':<22} {legacy_rate:>12,.0f} {1.0:>7.2f}x")
+	print(f"{'compiled extract_rows':<22} {compiled_rate:>12,.0f} {compiled_rate / legacy_rate:>7.2f}x")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
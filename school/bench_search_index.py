@@ -0,0 +1,101 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Sequence, Tuple
+
+from directory_page import search_key, table_payload
+from search_index import SearchIndex
+
+# Queries every file is searched with, next to ones sampled from its rows
+FIXED_QUERIES = ["school", "cbse", "english medium", "high school", "convent", "vidyalaya", "zzqx"]
+
+
+def sample_queries(search: Sequence[str], count: int, seed: int = 0) -> List[str]:
+	# Substrings of words from random rows, 3-10 characters: what people type
+	# while looking for a school they know
+	r = random.Random(seed)
+	out = list(FIXED_QUERIES)
+	texts = [t for t in search if len(t) >= 3]
+	while texts and len(out) < count + len(FIXED_QUERIES):
+		words = [w for w in r.choice(texts).split() if len(w) >= 3]
+		if not words:
+			continue
+		word = r.choice(words)
+		size = r.randint(3, min(10, len(word)))
+		start = r.randint(0, len(word) - size)
+		out.append(word[start:start + size])
+	return out
+
+
+def scan(search: Sequence[str], q: str) -> List[int]:
+	# What the page did before the index: includes() on every row
+	return [i for i, text in enumerate(search) if q in text]
+
+
+def best_seconds(fn: Callable[[], object], repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - t0)
+	return best
+
+
+def json_sizes(value: object) -> Tuple[int, int]:
+	data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+	return len(data), len(gzip.compress(data))
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark the directory search index: build time, size and query time per city file.")
+	parser.add_argument("files", nargs="*", help="<city>_schools.json files (default: all in this directory)")
+	parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement; the best is reported")
+	parser.add_argument("--queries", type=int, default=50, help="queries sampled from each file's rows")
+	parser.add_argument("--scale", type=int, default=1, help="also time all files combined and replicated this many times")
+	args = parser.parse_args(sys.argv[1:])
+
+	paths = args.files or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*_schools.json")))
+	if not paths:
+		print("No *_schools.json files found", file=sys.stderr)
+		return 1
+
+	corpora: List[Tuple[str, List[str], List[dict]]] = []
+	for path in paths:
+		with open(path, "r", encoding="utf-8") as f:
+			rows = json.load(f)
+		name = os.path.basename(path).replace("_schools.json", "")
+		corpora.append((name, [search_key(r) for r in rows], rows))
+	if len(corpora) > 1 or args.scale > 1:
+		rows = [r for _, _, rs in corpora for r in rs] * max(1, args.scale)
+		label = "all" if args.scale <= 1 else f"all x{args.scale}"
+		corpora.append((label, [search_key(r) for r in rows], rows))
+
+	print(f"{'file':<12} {'rows':>7} {'build ms':>9} {'grams':>7} {'index KB':>9} {'gzip KB':>8} {'data KB':>8} {'scan us/q':>10} {'index us/q':>11} {'speedup':>8}")
+	mismatches = 0
+	for name, search, rows in corpora:
+		build_s = best_seconds(lambda: SearchIndex.build(search), args.repeat)
+		index = SearchIndex.build(search)
+		raw, packed = json_sizes(index.to_json())
+		data_raw, _ = json_sizes(table_payload(rows))
+		queries = sample_queries(search, args.queries)
+		mismatches += sum(1 for q in queries if index.search(search, q) != scan(search, q))
+		scan_s = best_seconds(lambda: [scan(search, q) for q in queries], args.repeat)
+		index_s = best_seconds(lambda: [index.search(search, q) for q in queries], args.repeat)
+		print(
+			f"{name:<12} {len(search):>7} {build_s * 1000:>9.1f} {len(index.postings):>7} {raw / 1024:>9.1f} {packed / 1024:>8.1f} "
+			f"{data_raw / 1024:>8.1f} {scan_s * 1e6 / len(queries):>10.1f} {index_s * 1e6 / len(queries):>11.1f} {scan_s / index_s:>7.2f}x"
+		)
+	if mismatches:
+		print(f"{mismatches} queries gave different rows through the index than a scan", file=sys.stderr)
+		return 1
+	print("index results identical to a full scan for every query")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,147 @@
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from spatial_index import SpatialIndex, haversine_km, np
+
+
+def load_rows(paths: Sequence[str], scale: int, seed: int = 0) -> List[Tuple[str, List[Dict[str, Any]]]]:
+	# Rows per city; with scale > 1 every school is repeated with its position
+	# jittered by up to ~1 km and a distinct osm_url, so nothing is deduplicated
+	r = random.Random(seed)
+	out: List[Tuple[str, List[Dict[str, Any]]]] = []
+	for path in paths:
+		with open(path, "r", encoding="utf-8") as f:
+			rows = [row for row in json.load(f) if row.get("lat") is not None and row.get("lon") is not None]
+		copies = list(rows)
+		for n in range(1, max(1, scale)):
+			for row in rows:
+				copy = dict(row)
+				copy["lat"] += r.uniform(-0.01, 0.01)
+				copy["lon"] += r.uniform(-0.01, 0.01)
+				copy["osm_url"] = f"{row.get('osm_url') or ''}#{n}"
+				copies.append(copy)
+		out.append((os.path.basename(path).replace("_schools.json", ""), copies))
+	return out
+
+
+def query_points(points: Sequence[Tuple[float, float]], count: int, seed: int = 1) -> Dict[str, List[Tuple[float, float]]]:
+	# Points within ~3 km of a school (an address in town), and points anywhere
+	# in the bounding box of all schools (mostly far from any city)
+	r = random.Random(seed)
+	lats = [p[0] for p in points]
+	lons = [p[1] for p in points]
+	town: List[Tuple[float, float]] = []
+	for _ in range(count):
+		lat, lon = r.choice(points)
+		town.append((lat + r.uniform(-0.03, 0.03), lon + r.uniform(-0.03, 0.03)))
+	anywhere = [(r.uniform(min(lats), max(lats)), r.uniform(min(lons), max(lons))) for _ in range(count)]
+	return {"town": town, "anywhere": anywhere}
+
+
+def brute_within(points: Sequence[Tuple[float, float]], lat: float, lon: float, km: float) -> List[float]:
+	return sorted(d for d in (haversine_km(lat, lon, p[0], p[1]) for p in points) if d <= km)
+
+
+def brute_nearest(points: Sequence[Tuple[float, float]], lat: float, lon: float, k: int) -> List[float]:
+	return sorted(haversine_km(lat, lon, p[0], p[1]) for p in points)[:k]
+
+
+def same(a: Sequence[float], b: Sequence[float]) -> bool:
+	return len(a) == len(b) and all(abs(x - y) < 1e-6 for x, y in zip(a, b))
+
+
+def best_us(fn: Callable[[float, float], object], queries: Sequence[Tuple[float, float]], repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		for lat, lon in queries:
+			fn(lat, lon)
+		best = min(best, time.perf_counter() - t0)
+	return best * 1e6 / len(queries)
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Benchmark radius and k-nearest school queries: grid and k-d tree index vs brute force over all cities.")
+	parser.add_argument("files", nargs="*", help="<city>_schools.json files (default: all in this directory)")
+	parser.add_argument("--queries", type=int, default=500)
+	parser.add_argument("--checked", type=int, default=50, help="queries compared with (and timed for) pure-Python brute force")
+	parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement; the best is reported")
+	parser.add_argument("--scale", type=int, default=1, help="repeat every school this many times, jittered")
+	parser.add_argument("-k", type=int, default=10)
+	parser.add_argument("--radius", type=float, nargs="+", default=[1.0, 5.0], metavar="KM")
+	args = parser.parse_args(sys.argv[1:])
+
+	paths = args.files or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*_schools.json")))
+	if not paths:
+		print("No *_schools.json files found", file=sys.stderr)
+		return 1
+	cities = load_rows(paths, args.scale)
+
+	# "scan+numpy" is the vectorized scan over every school, with the same
+	# sorted Nearby results as the grid: the baseline the grid has to beat
+	indexes: Dict[str, SpatialIndex] = {}
+	variants = (("grid", False, 0), ("grid+numpy", True, 0), ("scan+numpy", True, sys.maxsize))
+	for label, use_numpy, scan_max in variants:
+		if use_numpy and np is None:
+			continue
+		t0 = time.perf_counter()
+		index = SpatialIndex(use_numpy=use_numpy, scan_max_points=scan_max)
+		for city, rows in cities:
+			index.add(city, rows)
+		index.nearest(0.0, 0.0, 1)
+		indexes[label] = index
+		print(f"{label}: {len(index)} schools indexed in {(time.perf_counter() - t0) * 1000:.1f} ms")
+	# The schools the index holds: one per osm_url, as in SpatialIndex.add
+	seen = set()
+	points: List[Tuple[float, float]] = []
+	for _, rows in cities:
+		for row in rows:
+			url = row.get("osm_url") or ""
+			if url and url in seen:
+				continue
+			seen.add(url)
+			points.append((row["lat"], row["lon"]))
+	query_sets = query_points(points, args.queries)
+	print(f"{len(cities)} files, {len(points)} schools, {args.queries} query points per set ({args.checked} checked against brute force)")
+
+	cases: List[Tuple[str, Callable[[float, float], List[float]], Callable[[SpatialIndex], Callable[[float, float], Any]]]] = []
+	for km in args.radius:
+		cases.append((
+			f"within {km:g} km",
+			lambda lat, lon, km=km: brute_within(points, lat, lon, km),
+			lambda ix, km=km: lambda lat, lon: ix.within(lat, lon, km),
+		))
+	cases.append((
+		f"nearest {args.k}",
+		lambda lat, lon: brute_nearest(points, lat, lon, args.k),
+		lambda ix: lambda lat, lon: ix.nearest(lat, lon, args.k),
+	))
+
+	mismatches = 0
+	header = f"{'query':<26} {'brute':>10}" + "".join(f" {label:>11}" for label in indexes) + "   (us/query)"
+	print(header)
+	for title, brute, make in cases:
+		for set_name, queries in query_sets.items():
+			# Pure-Python brute force is slow; it is timed and checked on a sample
+			checked = queries[: args.checked]
+			line = f"{title + ', ' + set_name:<26} {best_us(brute, checked, 1):>10.1f}"
+			for label, index in indexes.items():
+				query = make(index)
+				mismatches += sum(1 for lat, lon in checked if not same([r.distance_km for r in query(lat, lon)], brute(lat, lon)))
+				line += f" {best_us(query, queries, args.repeat):>11.1f}"
+			print(line)
+	if mismatches:
+		print(f"{mismatches} queries differ from brute force", file=sys.stderr)
+		return 1
+	print("index results identical to brute force")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+
+Point = Tuple[float, float]  # (lon, lat)
+Ring = List[Point]
+
+
+def assemble_rings(segments: List[List[Point]]) -> List[Ring]:
+	# Join boundary way geometries that share end points into closed rings.
+	# Unclosed leftovers (clipped or broken boundaries) are closed as-is.
+	remaining = [list(s) for s in segments if len(s) >= 2]
+	rings: List[Ring] = []
+	while remaining:
+		ring = remaining.pop()
+		while ring[0] != ring[-1]:
+			tail = ring[-1]
+			for i, seg in enumerate(remaining):
+				if seg[0] == tail:
+					ring.extend(seg[1:])
+				elif seg[-1] == tail:
+					ring.extend(reversed(seg[:-1]))
+				else:
+					continue
+				remaining.pop(i)
+				break
+			else:
+				ring.append(ring[0])
+		if len(ring) >= 4:
+			rings.append(ring)
+	return rings
+
+
+def element_rings(el: Dict[str, Any]) -> List[Ring]:
+	# Rings of an Overpass element fetched with `out geom` (closed way or
+	# boundary/multipolygon relation). Inner rings are kept: even-odd testing over
+	# all rings of one element handles holes.
+	def coords(geometry: Any) -> List[Point]:
+		return [(float(p["lon"]), float(p["lat"])) for p in geometry or [] if p and "lat" in p and "lon" in p]
+
+	if el.get("type") == "way":
+		return assemble_rings([coords(el.get("geometry"))])
+	if el.get("type") == "relation":
+		segments = [
+			coords(m.get("geometry"))
+			for m in el.get("members") or []
+			if m.get("type") == "way" and m.get("role", "") in ("outer", "inner", "")
+		]
+		return assemble_rings(segments)
+	return []
+
+
+class _Polygon:
+	# Edges bucketed into horizontal bands so a ray cast only visits the edges
+	# that span the query latitude.
+	def __init__(self, rings: List[Ring], band_count: int = 0) -> None:
+		edges: List[Tuple[float, float, float, float]] = []
+		for ring in rings:
+			for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+				if y1 != y2:
+					edges.append((x1, y1, x2, y2))
+		xs = [x for ring in rings for x, _ in ring]
+		ys = [y for ring in rings for _, y in ring]
+		self.min_x, self.max_x = min(xs), max(xs)
+		self.min_y, self.max_y = min(ys), max(ys)
+		self.bands = band_count or max(1, int(len(edges) ** 0.5))
+		self.band_h = (self.max_y - self.min_y) / self.bands or 1.0
+		self.buckets: List[List[Tuple[float, float, float, float]]] = [[] for _ in range(self.bands)]
+		for e in edges:
+			lo = self._band(min(e[1], e[3]))
+			hi = self._band(max(e[1], e[3]))
+			for b in range(lo, hi + 1):
+				self.buckets[b].append(e)
+
+	def _band(self, y: float) -> int:
+		return min(self.bands - 1, max(0, int((y - self.min_y) / self.band_h)))
+
+	def contains(self, x: float, y: float) -> bool:
+		if not (self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y):
+			return False
+		inside = False
+		for x1, y1, x2, y2 in self.buckets[self._band(y)]:
+			if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+				inside = not inside
+		return inside
+
+
+class CityLocator:
+	# Point-in-polygon lookup over the boundaries of several cities. A city may
+	# have several (possibly overlapping) boundary elements; a point belongs to
+	# the city if it is inside any of them.
+	def __init__(self) -> None:
+		self._cities: Dict[str, List[_Polygon]] = {}
+
+	def add(self, key: str, rings_per_element: List[List[Ring]]) -> None:
+		polys = [_Polygon(rings) for rings in rings_per_element if rings]
+		if polys:
+			self._cities.setdefault(key, []).extend(polys)
+
+	def keys(self) -> List[str]:
+		return list(self._cities)
+
+	def locate(self, lat: Optional[float], lon: Optional[float]) -> List[str]:
+		if lat is None or lon is None:
+			return []
+		return [key for key, polys in self._cities.items() if any(p.contains(lon, lat) for p in polys)]
@@ -0,0 +1,300 @@
+import asyncio
+import multiprocessing
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, Hashable, Iterable, List, Optional, Tuple, TypeVar, Union
+from urllib.robotparser import RobotFileParser
+
+from site_discovery import crawl_delay, parse_robots, robots_url
+
+
+T = TypeVar("T")
+
+@dataclass
+class CpuTask:
+	# Yielded by a crawl job instead of a URL: fn(*args) is computed and its
+	# result sent back. With cpu_workers the call runs in a worker process, so
+	# fn must be a module-level function and args/result must pickle.
+	fn: Callable[..., Any]
+	args: Tuple[Any, ...] = ()
+
+
+@dataclass(frozen=True)
+class Fetch:
+	# Yielded instead of a bare URL to tell the fetch function what the job is
+	# looking for in the page (`want`), so it may stop reading once it has it.
+	# The engine itself only uses the URL.
+	url: str
+	want: Tuple[str, ...] = ()
+
+
+def request_url(request: Union[str, Fetch]) -> str:
+	return request if isinstance(request, str) else request.url
+
+
+# A crawl job is a generator that yields the URLs it wants, receives each page
+# (or None) back, and returns its result, so the same extraction logic can be
+# driven by a blocking loop or by the engine below. Parsing is yielded as a
+# CpuTask so the engine can move it off the event loop.
+Steps = Generator[Union[str, Fetch, CpuTask], Any, T]
+
+MAX_IN_FLIGHT = 256
+PER_HOST_LIMIT = 2
+HOST_INTERVAL_S = 0.5
+# CPU tasks waiting for a worker process; when full, jobs stop fetching
+CPU_QUEUE = 64
+# A robots.txt Crawl-delay slows a host down to at most this interval
+MAX_CRAWL_DELAY_S = 30.0
+
+
+@dataclass
+class CrawlOptions:
+	max_in_flight: int = MAX_IN_FLIGHT
+	per_host: int = PER_HOST_LIMIT
+	host_interval_s: float = HOST_INTERVAL_S
+	deadline_s: Optional[float] = None
+	# 0 runs CPU tasks inline on the event loop
+	cpu_workers: int = 0
+	cpu_queue: int = CPU_QUEUE
+	# Fetch each host's robots.txt before its first request: disallowed URLs
+	# are not fetched and Crawl-delay becomes the host's interval
+	robots: bool = False
+	robots_agent: str = "*"
+	max_crawl_delay_s: float = MAX_CRAWL_DELAY_S
+
+
+@dataclass
+class CrawlStats:
+	jobs: int = 0
+	finished: int = 0
+	failed: int = 0
+	unfinished: int = 0
+	fetches: int = 0
+	disallowed: int = 0
+	slowed_hosts: int = 0
+	cpu_tasks: int = 0
+	seconds: float = 0.0
+
+
+class _HostGate:
+	# Per-host politeness: at most `limit` requests in flight and request starts
+	# spaced `interval_s` apart. Slots are reserved without awaiting, so the
+	# bookkeeping needs no lock on a single event loop.
+	def __init__(self, limit: int, interval_s: float) -> None:
+		self._sem = asyncio.Semaphore(max(1, limit))
+		self.interval_s = interval_s
+		self._next_start = 0.0
+		# Set by the first request to the host when robots.txt is honoured
+		self.robots: Optional["asyncio.Future[Optional[RobotFileParser]]"] = None
+
+	async def __aenter__(self) -> None:
+		await self._sem.acquire()
+		loop = asyncio.get_running_loop()
+		now = loop.time()
+		start = max(now, self._next_start)
+		self._next_start = start + self.interval_s
+		if start > now:
+			try:
+				await asyncio.sleep(start - now)
+			except BaseException:
+				self._sem.release()
+				raise
+
+	async def __aexit__(self, *exc: Any) -> None:
+		self._sem.release()
+
+	def slow_down(self, interval_s: float) -> None:
+		# Also delays the next start that was booked with the old interval
+		self._next_start += interval_s - self.interval_s
+		self.interval_s = interval_s
+
+
+def host_key(url: str) -> str:
+	try:
+		return (urllib.parse.urlsplit(url).hostname or "").lower()
+	except ValueError:
+		return ""
+
+
+class CrawlEngine:
+	# Runs many crawl jobs on one event loop. Blocking page fetches go to a
+	# thread pool sized to max_in_flight; per-host gates replace the old global
+	# sleep-after-every-request, and an optional deadline stops the whole crawl.
+	# With cpu_workers, CpuTasks go through a bounded queue to a process pool:
+	# the fetch threads only do I/O, parsing scales with cores instead of
+	# sharing the GIL, and a full queue holds jobs back from fetching more.
+	def __init__(self, fetch: Callable[[Union[str, Fetch]], Optional[str]], options: Optional[CrawlOptions] = None) -> None:
+		self.fetch_blocking = fetch
+		self.options = options or CrawlOptions()
+		self._gates: Dict[str, _HostGate] = {}
+		self._global: Optional[asyncio.Semaphore] = None
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._processes: Optional[ProcessPoolExecutor] = None
+		self._cpu_queue: Optional["asyncio.Queue[Tuple[CpuTask, asyncio.Future]]"] = None
+		self.stats = CrawlStats()
+
+	def _gate(self, url: str) -> _HostGate:
+		key = host_key(url)
+		gate = self._gates.get(key)
+		if gate is None:
+			gate = self._gates[key] = _HostGate(self.options.per_host, self.options.host_interval_s)
+		return gate
+
+	async def _fetch_through(self, gate: _HostGate, request: Union[str, Fetch]) -> Optional[str]:
+		assert self._global is not None
+		# Wait for the host first so a busy host does not hold global slots
+		async with gate:
+			async with self._global:
+				self.stats.fetches += 1
+				loop = asyncio.get_running_loop()
+				return await loop.run_in_executor(self._executor, self.fetch_blocking, request)
+
+	async def _robots(self, gate: _HostGate, url: str) -> Optional[RobotFileParser]:
+		# robots.txt is fetched once per host, by whichever request comes first;
+		# no (or an unreadable) robots.txt allows everything
+		if gate.robots is None:
+			gate.robots = asyncio.get_running_loop().create_future()
+			rules = None
+			try:
+				text = await self._fetch_through(gate, robots_url(url))
+				if text:
+					rules = parse_robots(text)
+					delay = crawl_delay(rules, self.options.robots_agent)
+					if delay is not None and delay > gate.interval_s:
+						gate.slow_down(min(delay, self.options.max_crawl_delay_s))
+						self.stats.slowed_hosts += 1
+			except Exception:  # noqa: BLE001
+				rules = None
+			finally:
+				if not gate.robots.done():
+					gate.robots.set_result(rules)
+		return await asyncio.shield(gate.robots)
+
+	async def fetch(self, request: Union[str, Fetch]) -> Optional[str]:
+		url = request_url(request)
+		gate = self._gate(url)
+		if self.options.robots:
+			rules = await self._robots(gate, url)
+			if rules is not None and not rules.can_fetch(self.options.robots_agent, url):
+				self.stats.disallowed += 1
+				return None
+		return await self._fetch_through(gate, request)
+
+	async def compute(self, task: CpuTask) -> Any:
+		self.stats.cpu_tasks += 1
+		if self._cpu_queue is None:
+			return task.fn(*task.args)
+		fut = asyncio.get_running_loop().create_future()
+		await self._cpu_queue.put((task, fut))
+		return await fut
+
+	async def _cpu_worker(self) -> None:
+		assert self._cpu_queue is not None
+		loop = asyncio.get_running_loop()
+		while True:
+			task, fut = await self._cpu_queue.get()
+			try:
+				if fut.done():  # its job was cancelled while queued
+					continue
+				try:
+					result = await loop.run_in_executor(self._processes, task.fn, *task.args)
+				except asyncio.CancelledError:
+					raise
+				except Exception as e:  # noqa: BLE001
+					if not fut.done():
+						fut.set_exception(e)
+				else:
+					if not fut.done():
+						fut.set_result(result)
+			finally:
+				self._cpu_queue.task_done()
+
+	async def drive(self, steps: Steps) -> Any:
+		try:
+			item = next(steps)
+			while True:
+				if isinstance(item, CpuTask):
+					item = steps.send(await self.compute(item))
+				else:
+					item = steps.send(await self.fetch(item))
+		except StopIteration as stop:
+			return stop.value
+
+	async def _run(self, jobs: Iterable[Tuple[Hashable, Callable[[], Steps]]], on_result: Callable[[Hashable, Any], None]) -> None:
+		self._global = asyncio.Semaphore(max(1, self.options.max_in_flight))
+		self._cpu_queue = None
+		cpu_workers: List["asyncio.Task[None]"] = []
+		if self._processes is not None:
+			self._cpu_queue = asyncio.Queue(maxsize=max(1, self.options.cpu_queue))
+			# Two feeders per process, so the next task is already pickled and
+			# waiting when a worker finishes
+			cpu_workers = [asyncio.ensure_future(self._cpu_worker()) for _ in range(2 * self.options.cpu_workers)]
+		try:
+			await self._run_jobs(jobs, on_result)
+		finally:
+			for w in cpu_workers:
+				w.cancel()
+			if cpu_workers:
+				await asyncio.wait(cpu_workers)
+
+	async def _run_jobs(self, jobs: Iterable[Tuple[Hashable, Callable[[], Steps]]], on_result: Callable[[Hashable, Any], None]) -> None:
+		async def one(key: Hashable, make: Callable[[], Steps]) -> None:
+			try:
+				result = await self.drive(make())
+			except asyncio.CancelledError:
+				raise
+			except Exception:  # noqa: BLE001
+				self.stats.failed += 1
+				result = None
+			else:
+				self.stats.finished += 1
+			on_result(key, result)
+
+		tasks = [asyncio.ensure_future(one(key, make)) for key, make in jobs]
+		self.stats.jobs = len(tasks)
+		if not tasks:
+			return
+		_done, pending = await asyncio.wait(tasks, timeout=self.options.deadline_s)
+		self.stats.unfinished = len(pending)
+		for t in pending:
+			t.cancel()
+		if pending:
+			await asyncio.wait(pending)
+
+	def run(self, jobs: Iterable[Tuple[Hashable, Callable[[], Steps]]], on_result: Callable[[Hashable, Any], None]) -> CrawlStats:
+		# `on_result(key, result)` is called on the loop thread as each job
+		# finishes (result None if the job raised); jobs cut off by the deadline
+		# are not reported.
+		t0 = time.perf_counter()
+		self.stats = CrawlStats()
+		self._gates = {}
+		if self.options.cpu_workers > 0:
+			# Started before the fetch threads; spawn rather than fork a threaded process
+			self._processes = ProcessPoolExecutor(max_workers=self.options.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+		self._executor = ThreadPoolExecutor(max_workers=max(1, self.options.max_in_flight), thread_name_prefix="crawl")
+		try:
+			asyncio.run(self._run(jobs, on_result))
+		finally:
+			# Fetches still blocked in a thread after the deadline are abandoned
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+			if self._processes is not None:
+				self._processes.shutdown(wait=True, cancel_futures=True)
+				self._processes = None
+		self.stats.seconds = time.perf_counter() - t0
+		return self.stats
+
+
+def run_steps(steps: Steps, fetch: Callable[[Union[str, Fetch]], Optional[str]]) -> Any:
+	# Blocking driver for a crawl job; CPU tasks run inline
+	try:
+		item = next(steps)
+		while True:
+			if isinstance(item, CpuTask):
+				item = steps.send(item.fn(*item.args))
+			else:
+				item = steps.send(fetch(item))
+	except StopIteration as stop:
+		return stop.value
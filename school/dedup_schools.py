@@ -0,0 +1,514 @@
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from school_table import SCHOOL_FIELDS, SchoolTable
+from spatial_index import haversine_km
+
+MASTER_PATH = "schools_master.json"
+REPORT_PATH = "schools_duplicates.json"
+
+# Blocking cell size in degrees (about 550 m north-south). A record is paired
+# with records in its own and the 8 surrounding cells, so every pair closer
+# than one cell is a candidate.
+CELL_DEG = 0.005
+# Pairs further apart are never scored
+MAX_PAIR_KM = 0.5
+# Name tokens in more than this share of all rows ("school", "high", "public"),
+# and in more than MIN_COMMON_ROWS rows, are not blocking keys; names made
+# only of such tokens are blocked on the whole name instead
+MAX_TOKEN_SHARE = 0.02
+MIN_COMMON_ROWS = 50
+# Always common, so a run over one small city scores names like a full run
+GENERIC_WORDS = frozenset({
+	"the", "of", "and", "for", "school", "schools", "public", "international",
+	"model", "government", "municipal", "corporation", "vidyalaya", "vidya",
+	"mandir", "academy", "convent", "institute", "centre", "center", "education",
+	"sri", "saint", "new", "national", "medium", "high", "higher", "primary",
+	"secondary", "senior", "junior", "college", "english", "girls", "boys",
+})
+# Other tokens are blocked on their first two characters, which keeps the
+# spelling variants same_token accepts in one block ("Dnyaneshwar" /
+# "Dnayneshwar", "Belaghata" / "Beleghata")
+BLOCK_PREFIX = 2
+
+# Pair score: weighted name similarity, distance and contact agreement
+NAME_WEIGHT = 0.55
+DISTANCE_WEIGHT = 0.3
+CONTACT_WEIGHT = 0.15
+# Distance score is exp(-km / DISTANCE_SCALE_KM): 0.9 at 10 m, 0.37 at 100 m
+DISTANCE_SCALE_KM = 0.1
+# Contact score when neither phone nor website can be compared
+UNKNOWN_CONTACT = 0.5
+# Name similarity when one name's tokens are all in the other and include a
+# blocking token ("Infant Jesus School" / "Infant Jesus International School")
+SUBSET_SIMILARITY = 0.9
+# Pairs scoring at least this are the same school. Identical names need to be
+# within ~140 m, or share a phone number or website.
+MATCH_THRESHOLD = 0.7
+# Tokens this long may differ by one edit ("Frances" / "Francis"), and by two
+# from TYPO_LONG_CHARS on ("Deshbondhu" / "Deshabandhu")
+TYPO_MIN_CHARS = 5
+TYPO_LONG_CHARS = 9
+
+_ABBREVIATIONS = {
+	"govt": "government",
+	"gov": "government",
+	"sr": "senior",
+	"sec": "secondary",
+	"hr": "higher",
+	"st": "saint",
+	"pvt": "private",
+	"eng": "english",
+	"intl": "international",
+	"vidyalay": "vidyalaya",
+	"sch": "school",
+	"schl": "school",
+	"sree": "sri",
+	"shri": "sri",
+	"shree": "sri",
+	"no": "",
+}
+# Level, medium and gender words tell schools on one campus apart: a name
+# using one that the other name lacks ("Oxford English School" / "Oxford
+# Secondary School", "Senior Secondary" / "Secondary") is another school
+_DISTINCT_WORDS = frozenset({
+	"nursery", "kindergarten", "pre", "primary", "elementary", "middle", "high",
+	"higher", "secondary", "senior", "junior", "college", "pu",
+	"english", "hindi", "marathi", "gujarati", "kannada", "tamil", "telugu",
+	"urdu", "bengali", "malayalam", "sanskrit",
+	"boys", "girls", "bal", "balak", "kanya", "balika",
+})
+_VOWELS = frozenset("aeiou")
+# Letters, digits and the combining marks of the Indic scripts, which \w
+# does not match
+_WORD = re.compile(r"[\wऀ-෿]+")
+_URL_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://")
+
+
+def name_tokens(name: str) -> List[str]:
+	text = unicodedata.normalize("NFKC", name or "").casefold().replace("'", "").replace("’", "")
+	# Runs of single letters are one initialism: "S. D. A." is "sda"
+	words: List[str] = []
+	initials = False
+	for word in _WORD.findall(text):
+		if len(word) == 1 and word.isalpha():
+			if initials:
+				words[-1] += word
+			else:
+				words.append(word)
+			initials = True
+		else:
+			words.append(word)
+			initials = False
+	return [t for t in (_ABBREVIATIONS.get(w, w) for w in words) if t]
+
+
+def phone_numbers(value: str) -> Set[str]:
+	# Last 10 digits of each number, so +91 and trunk-prefix variants compare equal
+	out = set()
+	for part in re.split(r"[,;/]", value or ""):
+		digits = re.sub(r"\D", "", part)
+		if len(digits) >= 8:
+			out.add(digits[-10:])
+	return out
+
+
+def website_key(value: str) -> str:
+	url = _URL_SCHEME.sub("", (value or "").strip().lower())
+	if url.startswith("www."):
+		url = url[4:]
+	return url.split("#", 1)[0].rstrip("/")
+
+
+def _acronym(token: str) -> bool:
+	# "ghps", "guhps", "gtelps": initialisms differing by a letter are other schools
+	return len(token) <= 6 and sum(1 for c in token if c in _VOWELS) <= 1
+
+
+def _within_edits(a: str, b: str, limit: int) -> bool:
+	# Levenshtein distance <= limit, row by row with an early exit
+	if abs(len(a) - len(b)) > limit:
+		return False
+	prev = list(range(len(b) + 1))
+	for i, ca in enumerate(a, 1):
+		cur = [i]
+		for j, cb in enumerate(b, 1):
+			cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+		if min(cur) > limit:
+			return False
+		prev = cur
+	return prev[-1] <= limit
+
+
+def same_token(a: str, b: str) -> bool:
+	if a == b:
+		return True
+	shortest = min(len(a), len(b))
+	if shortest < TYPO_MIN_CHARS or a.isdigit() or b.isdigit() or _acronym(a) or _acronym(b):
+		return False
+	return _within_edits(a, b, 2 if shortest >= TYPO_LONG_CHARS else 1)
+
+
+def distinct_names(a: Iterable[str], b: Iterable[str], common: Set[str]) -> bool:
+	# True when the names cannot be one school: a distinctive token of either
+	# name has no equal (up to a typo) in the other, both names have words the
+	# other lacks ("Model Primary" / "Model Public"), or a level, medium or
+	# gender word is in one name only
+	sa, sb = set(a), set(b)
+	extra_a = {t for t in sa if not any(same_token(t, u) for u in sb)}
+	extra_b = {t for t in sb if not any(same_token(t, u) for u in sa)}
+	if extra_a and extra_b:
+		return True
+	return any(t not in common or t in _DISTINCT_WORDS for t in extra_a | extra_b)
+
+
+def _osm_rank(url: str) -> int:
+	# Ways and relations carry the school's outline and usually more tags
+	return 0 if "/node/" in url else 1
+
+
+@dataclass
+class Match:
+	a: int
+	b: int
+	score: float
+	name_score: float
+	distance_km: Optional[float]
+	contact: str
+
+	def to_dict(self, records: List["_Record"]) -> Dict[str, Any]:
+		out = asdict(self)
+		out["a"] = records[self.a].row.get("osm_url") or ""
+		out["b"] = records[self.b].row.get("osm_url") or ""
+		out["score"] = round(self.score, 3)
+		out["name_score"] = round(self.name_score, 3)
+		if self.distance_km is not None:
+			out["distance_km"] = round(self.distance_km, 3)
+		return out
+
+
+@dataclass
+class DedupStats:
+	rows: int = 0
+	blocks: int = 0
+	candidate_pairs: int = 0
+	matched_pairs: int = 0
+	clusters: int = 0
+	merged_rows: int = 0
+	seconds: float = 0.0
+
+
+class _Record:
+	__slots__ = ("city", "row", "tokens", "lat", "lon", "phones", "website")
+
+	def __init__(self, city: str, row: Mapping) -> None:
+		self.city = city
+		self.row = row
+		self.tokens = name_tokens(row.get("name") or "")
+		lat, lon = row.get("lat"), row.get("lon")
+		if lat is None or lon is None or lat != lat or lon != lon:
+			self.lat = self.lon = None
+		else:
+			self.lat, self.lon = float(lat), float(lon)
+		self.phones = phone_numbers(row.get("phone") or "")
+		self.website = website_key(row.get("website") or "")
+
+
+class UnionFind:
+	def __init__(self, size: int) -> None:
+		self.parent = list(range(size))
+		self.size = [1] * size
+
+	def find(self, i: int) -> int:
+		parent = self.parent
+		while parent[i] != i:
+			parent[i] = parent[parent[i]]
+			i = parent[i]
+		return i
+
+	def union(self, a: int, b: int) -> bool:
+		a, b = self.find(a), self.find(b)
+		if a == b:
+			return False
+		if self.size[a] < self.size[b]:
+			a, b = b, a
+		self.parent[b] = a
+		self.size[a] += self.size[b]
+		return True
+
+
+class Deduper:
+	# Finds rows that are the same school across and within city files: the
+	# same OSM element listed under two cities, or a node and a way drawn for
+	# one school. Rows are blocked on (grid cell, name token) so only nearby
+	# rows sharing a distinctive token are compared; each candidate pair is
+	# scored once and matches are clustered with union-find. The work grows
+	# with the rows times the block sizes, not with the square of the rows.
+	def __init__(self, threshold: float = MATCH_THRESHOLD, cell_deg: float = CELL_DEG) -> None:
+		self.threshold = threshold
+		self.cell_deg = cell_deg
+		self.records: List[_Record] = []
+		self.common: Set[str] = set()
+		self.matches: List[Match] = []
+		self.stats = DedupStats()
+
+	def add(self, city: str, rows: Iterable[Mapping]) -> None:
+		for row in rows:
+			self.records.append(_Record(city, row))
+
+	def _common_tokens(self) -> Set[str]:
+		counts: Counter = Counter()
+		for rec in self.records:
+			counts.update(set(rec.tokens))
+		cutoff = max(MAX_TOKEN_SHARE * len(self.records), MIN_COMMON_ROWS)
+		return {t for t, n in counts.items() if n > cutoff} | GENERIC_WORDS
+
+	def _blocks(self) -> Dict[Tuple[Any, ...], List[int]]:
+		# (cell row, cell column, key) -> records; cell is (None, None) without
+		# coordinates. key is the prefix of a distinctive token or, for names
+		# with none, the whole name.
+		blocks: Dict[Tuple[Any, ...], List[int]] = defaultdict(list)
+		for i, rec in enumerate(self.records):
+			if not rec.tokens:
+				continue
+			if rec.lat is None:
+				cell: Tuple[Optional[int], Optional[int]] = (None, None)
+			else:
+				cell = (math.floor(rec.lat / self.cell_deg), math.floor(rec.lon / self.cell_deg))
+			keys = {t[:BLOCK_PREFIX] for t in rec.tokens if t not in self.common} or {" ".join(rec.tokens)}
+			for key in keys:
+				blocks[cell + (key,)].append(i)
+		return blocks
+
+	def _candidates(self, blocks: Dict[Tuple[Any, ...], List[int]]) -> Set[Tuple[int, int]]:
+		# Pairs within a block and with the same key in the neighbouring cells;
+		# only half the neighbours are visited so each cell pair is seen once
+		pairs: Set[Tuple[int, int]] = set()
+		for (iy, ix, key), ids in blocks.items():
+			for n, a in enumerate(ids):
+				for b in ids[n + 1:]:
+					pairs.add((a, b) if a < b else (b, a))
+			if iy is None:
+				continue
+			for dy, dx in ((0, 1), (1, -1), (1, 0), (1, 1)):
+				other = blocks.get((iy + dy, ix + dx, key))
+				if not other:
+					continue
+				for a in ids:
+					for b in other:
+						pairs.add((a, b) if a < b else (b, a))
+		return pairs
+
+	def name_similarity(self, a: List[str], b: List[str]) -> float:
+		if not a or not b:
+			return 0.0
+		if a == b:
+			return 1.0
+		if distinct_names(a, b, self.common):
+			return 0.0
+		sa, sb = set(a), set(b)
+		similarity = SequenceMatcher(None, " ".join(a), " ".join(b)).ratio()
+		small, large = (sa, sb) if len(sa) <= len(sb) else (sb, sa)
+		if small <= large and small - self.common:
+			similarity = max(similarity, SUBSET_SIMILARITY)
+		return similarity
+
+	def score(self, i: int, j: int) -> Optional[Match]:
+		# None when the pair is too far apart to be one school
+		a, b = self.records[i], self.records[j]
+		distance: Optional[float] = None
+		if a.lat is not None and b.lat is not None:
+			distance = haversine_km(a.lat, a.lon, b.lat, b.lon)
+			if distance > MAX_PAIR_KM:
+				return None
+		name = self.name_similarity(a.tokens, b.tokens)
+		contact = "unknown"
+		if (a.phones and b.phones) or (a.website and b.website):
+			same = bool(a.phones & b.phones) or bool(a.website and a.website == b.website)
+			contact = "same" if same else "different"
+		contact_score = {"same": 1.0, "different": 0.0}.get(contact, UNKNOWN_CONTACT)
+		closeness = 0.0 if distance is None else math.exp(-distance / DISTANCE_SCALE_KM)
+		total = NAME_WEIGHT * name + DISTANCE_WEIGHT * closeness + CONTACT_WEIGHT * contact_score
+		return Match(i, j, total, name, distance, contact)
+
+	def run(self) -> List[List[int]]:
+		# Clusters of two or more records, largest first
+		t0 = time.perf_counter()
+		n = len(self.records)
+		uf = UnionFind(n)
+		self.matches = []
+		# The same OSM element in two city files needs no scoring
+		first: Dict[str, int] = {}
+		for i, rec in enumerate(self.records):
+			url = rec.row.get("osm_url") or ""
+			if not url:
+				continue
+			j = first.setdefault(url, i)
+			if j != i:
+				uf.union(j, i)
+				self.matches.append(Match(j, i, 1.0, 1.0, 0.0, "same osm element"))
+		self.common = self._common_tokens()
+		blocks = self._blocks()
+		pairs = self._candidates(blocks)
+		scored: List[Match] = []
+		for i, j in pairs:
+			url = self.records[i].row.get("osm_url")
+			if url and url == self.records[j].row.get("osm_url"):
+				continue
+			match = self.score(i, j)
+			if match is not None and match.score >= self.threshold:
+				scored.append(match)
+		# Strongest matches first. A match is dropped if it would put two
+		# distinct names in one cluster, which stops "Don Bosco School" from
+		# chaining "Don Bosco High School" and "Don Bosco Primary School".
+		names: Dict[int, List[Set[str]]] = {}
+		for m in sorted(scored, key=lambda m: (-m.score, m.a, m.b)):
+			ra, rb = uf.find(m.a), uf.find(m.b)
+			if ra == rb:
+				self.matches.append(m)
+				continue
+			na = names.pop(ra, None) or [set(self.records[ra].tokens)]
+			nb = names.pop(rb, None) or [set(self.records[rb].tokens)]
+			if any(distinct_names(x, y, self.common) for x in na for y in nb):
+				names[ra], names[rb] = na, nb
+				continue
+			uf.union(ra, rb)
+			names[uf.find(ra)] = na + nb
+			self.matches.append(m)
+		members: Dict[int, List[int]] = defaultdict(list)
+		for i in range(n):
+			members[uf.find(i)].append(i)
+		clusters = sorted((ids for ids in members.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+		self.stats = DedupStats(
+			rows=n,
+			blocks=len(blocks),
+			candidate_pairs=len(pairs),
+			matched_pairs=len(self.matches),
+			clusters=len(clusters),
+			merged_rows=sum(len(ids) - 1 for ids in clusters),
+			seconds=time.perf_counter() - t0,
+		)
+		return clusters
+
+	def _filled(self, i: int) -> Tuple[int, int, int]:
+		row = self.records[i].row
+		filled = sum(1 for f in SCHOOL_FIELDS if row.get(f) not in (None, ""))
+		return (filled, _osm_rank(row.get("osm_url") or ""), -i)
+
+	def merge(self, ids: List[int]) -> Dict[str, Any]:
+		# The most complete row (ways before nodes), with empty fields filled
+		# from the others in the same order and every distinct phone number kept
+		ordered = sorted(ids, key=self._filled, reverse=True)
+		merged = {f: self.records[ordered[0]].row.get(f) for f in SCHOOL_FIELDS}
+		phones: List[str] = []
+		for i in ordered:
+			row = self.records[i].row
+			for f in SCHOOL_FIELDS:
+				if merged.get(f) in (None, "") and row.get(f) not in (None, ""):
+					merged[f] = row.get(f)
+			for p in (row.get("phone") or "").split(","):
+				p = p.strip()
+				if p and p not in phones:
+					phones.append(p)
+		merged["phone"] = ", ".join(phones)
+		return merged
+
+	def master(self, clusters: List[List[int]]) -> SchoolTable:
+		# One row per school: merged rows for clusters, the rest as they were
+		in_cluster = {i for ids in clusters for i in ids}
+		rows = [self.merge(ids) for ids in clusters]
+		rows.extend(rec.row for i, rec in enumerate(self.records) if i not in in_cluster)
+		return SchoolTable.from_rows(rows).sorted_by_name()
+
+	def report(self, clusters: List[List[int]]) -> List[Dict[str, Any]]:
+		# Per cluster: the kept osm_url, its members and the pairs that joined them
+		cluster_of = {i: n for n, ids in enumerate(clusters) for i in ids}
+		pairs: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+		for m in self.matches:
+			pairs[cluster_of[m.a]].append(m.to_dict(self.records))
+		out = []
+		for n, ids in enumerate(clusters):
+			kept = max(ids, key=self._filled)
+			out.append({
+				"osm_url": self.records[kept].row.get("osm_url") or "",
+				"name": self.records[kept].row.get("name") or "",
+				"cities": sorted({self.records[i].city for i in ids}),
+				"members": [
+					{
+						"city": self.records[i].city,
+						"osm_url": self.records[i].row.get("osm_url") or "",
+						"name": self.records[i].row.get("name") or "",
+						"lat": self.records[i].lat,
+						"lon": self.records[i].lon,
+					}
+					for i in ids
+				],
+				"pairs": pairs[n],
+			})
+		return out
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(
+		description=(
+			"Find schools listed more than once across the <city>_schools.json files "
+			"(boundary overlaps, OSM node + way for one school) and write a merged master "
+			"file plus a duplicates report."
+		),
+	)
+	parser.add_argument("--cities", default="", help="comma-separated city keys (default: every file found)")
+	parser.add_argument("--src", default=".", help="directory with the <city>_schools.json files")
+	parser.add_argument("--out", default=MASTER_PATH, help=f"merged master file (default: {MASTER_PATH}; a .csv is written next to it)")
+	parser.add_argument("--report", default=REPORT_PATH, help=f"duplicates report (default: {REPORT_PATH})")
+	parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help=f"pair score counted as a match (default: {MATCH_THRESHOLD})")
+	return parser.parse_args(argv)
+
+
+def main() -> int:
+	args = parse_args(sys.argv[1:])
+	keys = [c.strip().lower() for c in args.cities.split(",") if c.strip()]
+	if keys:
+		paths = [os.path.join(args.src, f"{k}_schools.json") for k in keys]
+		missing = [p for p in paths if not os.path.exists(p)]
+		if missing:
+			print(f"Missing: {', '.join(missing)}", file=sys.stderr)
+			return 2
+	else:
+		paths = sorted(os.path.join(args.src, n) for n in os.listdir(args.src) if n.endswith("_schools.json"))
+	if not paths:
+		print("No <city>_schools.json files found.", file=sys.stderr)
+		return 1
+
+	deduper = Deduper(threshold=args.threshold)
+	for path in paths:
+		deduper.add(os.path.basename(path)[: -len("_schools.json")], SchoolTable.read_json(path))
+	clusters = deduper.run()
+	master = deduper.master(clusters)
+	master.write_json(args.out)
+	master.write_csv(os.path.splitext(args.out)[0] + ".csv")
+	tmp_path = args.report + ".tmp"
+	with open(tmp_path, "w", encoding="utf-8") as f:
+		json.dump(deduper.report(clusters), f, ensure_ascii=False, indent=2)
+	os.replace(tmp_path, args.report)
+
+	s = deduper.stats
+	print(
+		f"{s.rows} rows from {len(paths)} files: {s.candidate_pairs} candidate pairs in {s.blocks} blocks, "
+		f"{s.matched_pairs} matches, {s.clusters} clusters, {s.merged_rows} rows merged ({s.seconds * 1000:.0f} ms)"
+	)
+	print(f"Wrote {len(master)} schools to {args.out} and {s.clusters} clusters to {args.report}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,536 @@
+import json
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from school_table import CATEGORICAL_FIELDS
+
+# (key, label, width in px) of the directory table, in display order. Widths
+# are fixed so every row has the same height and the page only needs to draw
+# the rows that are scrolled into view.
+DIRECTORY_COLUMNS: List[Tuple[str, str, int]] = [
+	("name", "Name", 280),
+	("address", "Address", 300),
+	("phone", "Phone", 160),
+	("website", "Website", 200),
+	("operator", "Operator", 180),
+	("operator_type", "Operator Type", 120),
+	("board", "Board", 110),
+	("levels", "Levels", 110),
+	("gender", "Gender", 90),
+	("religion", "Religion", 100),
+	("language", "Language", 100),
+	("lat", "Lat", 100),
+	("lon", "Lon", 100),
+	("osm_url", "OSM", 70),
+]
+
+# Fields the search box matches, joined into one lowercase string per row
+SEARCH_FIELDS = (
+	"name", "address", "phone", "website", "operator", "operator_type",
+	"board", "levels", "gender", "religion", "language",
+)
+SEARCH_SEPARATOR = " | "
+NUMERIC_FIELDS = ("lat", "lon")
+# OSM stores coordinates with 7 decimals; more digits are float noise
+COORD_DIGITS = 7
+OSM_PREFIX = "https://www.openstreetmap.org/"
+
+
+def _missing(value: Any) -> bool:
+	return value is None or value == ""
+
+
+def search_key(row: Mapping) -> str:
+	return SEARCH_SEPARATOR.join(str(row.get(f)) for f in SEARCH_FIELDS if row.get(f)).lower()
+
+
+def sort_order(values: Sequence[Any], numeric: bool = False) -> List[int]:
+	# Row indices in ascending order of `values`; missing values first. Ties keep
+	# row order, so a column sorts stably within the name order of the rows.
+	if numeric:
+		return sorted(range(len(values)), key=lambda i: (not _missing(values[i]), 0.0 if _missing(values[i]) else float(values[i])))
+	return sorted(range(len(values)), key=lambda i: "" if _missing(values[i]) else str(values[i]).lower())
+
+
+def encode_column(field: str, values: List[Any]) -> Any:
+	# Compact JSON for one column: categorical columns as codes into a value
+	# list, OSM links without their common prefix, coordinates rounded. The
+	# page decodes all three (decodeColumn).
+	if field in NUMERIC_FIELDS:
+		return [None if v is None else round(v, COORD_DIGITS) for v in values]
+	if field in CATEGORICAL_FIELDS:
+		index: Dict[str, int] = {"": 0}
+		codes = [index.setdefault(v, len(index)) for v in values]
+		return {"values": list(index), "codes": codes}
+	if field == "osm_url" and all(not v or v.startswith(OSM_PREFIX) for v in values):
+		return {"prefix": OSM_PREFIX, "values": [v[len(OSM_PREFIX):] for v in values]}
+	return values
+
+
+def table_payload(rows: Sequence[Mapping], columns: Sequence[Tuple[str, str, int]] = DIRECTORY_COLUMNS) -> Dict[str, Any]:
+	# Everything the page needs, computed once here instead of on every
+	# keystroke: the encoded columns, the search column and a presorted index
+	# array per column (descending order is the same array read backwards)
+	fields = [key for key, _, _ in columns]
+	cols: List[List[Any]] = []
+	for f in fields:
+		if f in NUMERIC_FIELDS:
+			cols.append([None if _missing(r.get(f)) else float(r.get(f)) for r in rows])
+		else:
+			cols.append(["" if _missing(r.get(f)) else str(r.get(f)) for r in rows])
+	return {
+		"fields": fields,
+		"columns": [encode_column(f, col) for f, col in zip(fields, cols)],
+		"search": [search_key(r) for r in rows],
+		"order": [sort_order(col, f in NUMERIC_FIELDS) for f, col in zip(fields, cols)],
+	}
+
+
+def script_json(value: Any) -> str:
+	# JSON that is safe inside an inline <script>
+	return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+PAGE_STYLE = """
+		body { font-family: -apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin: 16px; }
+		h1 { margin: 0 0 8px 0; font-size: 22px; }
+		.summary { color: #555; margin-bottom: 12px; }
+		.controls { display: flex; gap: 12px; align-items: center; margin: 12px 0; flex-wrap: wrap; }
+		input[type=search] { padding: 8px 10px; font-size: 14px; width: 320px; max-width: 100%; }
+		select { padding: 7px 8px; font-size: 14px; }
+		.table-wrap { overflow: auto; height: 72vh; border: 1px solid #e3e3e3; border-radius: 6px; }
+		table { border-collapse: collapse; table-layout: fixed; font-size: 14px; }
+		th, td { border-bottom: 1px solid #eee; padding: 8px 10px; text-align: left; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+		th { position: sticky; top: 0; background: #fafafa; z-index: 1; cursor: pointer; }
+		th.sort-asc::after { content: " \\25B2"; font-size: 10px; }
+		th.sort-desc::after { content: " \\25BC"; font-size: 10px; }
+		tr:hover td { background: #fcfcff; }
+		tr.spacer td { padding: 0; border: 0; }
+		.small { color: #666; font-size: 12px; }
+		.count { font-weight: 600; }
+		footer { margin-top: 16px; color: #666; font-size: 12px; }
+		.osm-link { text-decoration: none; color: #06c; }
+		.osm-link:hover { text-decoration: underline; }
+"""
+
+# Table markup shared by the single-file page and the site shell
+TABLE_HTML = """
+	<div id="table-wrap" class="table-wrap">
+		<table id="schools-table" style="width: __TABLE_WIDTH__px">
+			<colgroup>__TABLE_COLS__</colgroup>
+			<thead>
+				<tr>__TABLE_HEADERS__</tr>
+			</thead>
+			<tbody></tbody>
+		</table>
+	</div>
+"""
+
+# showTable(data) puts a table_payload on display. Sort orders that the data
+# leaves out (null) come from loadOrders(), which a page can set to fetch them
+# on first use; until they arrive the rows stay in name order. Likewise a page
+# can set loadIndex() to fetch a search_index.SearchIndex (to_json) on the
+# first keystroke; searches scan every row until it is there.
+TABLE_SCRIPT = """
+		// Rows drawn above and below the visible window, and the typing pause
+		// before a search runs
+		const OVERSCAN = 10;
+		const DEBOUNCE_MS = 80;
+
+		const wrap = document.getElementById('table-wrap');
+		const tbody = document.querySelector('#schools-table tbody');
+		let FIELDS = [];
+		let COLUMN = {};
+		let ORDER = {};
+		let SEARCH = [];
+		let TOTAL = 0;
+		let loadOrders = null;
+		let loadIndex = null;
+		let dataVersion = 0;
+		let ordersPending = false;
+		let indexPending = false;
+		// {size, common: Set, postings: {gram: deltas}, decoded: Map}
+		let INDEX = null;
+		let sortKey = 'name';
+		let sortDir = 'asc';
+		let query = '';
+		// Matching row ids in row order (null = every row) and a mask of them
+		let matchRows = null;
+		let matchMask = null;
+		// Row ids in display order, and the measured height of one row
+		let view = new Int32Array(0);
+		let rowHeight = 0;
+		let frame = 0;
+
+		function escapeHtml(s) {
+			return String(s)
+				.replaceAll('&', '&amp;')
+				.replaceAll('<', '&lt;')
+				.replaceAll('>', '&gt;')
+				.replaceAll('"', '&quot;')
+				.replaceAll("'", '&#039;');
+		}
+
+		function decodeColumn(col) {
+			if (Array.isArray(col)) return col;
+			if (col.codes) return col.codes.map(c => col.values[c]);
+			return col.values.map(v => v ? col.prefix + v : '');
+		}
+
+		function cellHtml(key, v) {
+			if (v === null || v === '') return '';
+			if (key === 'name') return `<strong>${escapeHtml(v)}</strong>`;
+			if (key === 'phone') {
+				const phones = v.split(',').map(p => p.trim()).filter(Boolean);
+				return phones.map(p => `<a href="tel:${escapeHtml(p.replace(/\\s+/g, ''))}">${escapeHtml(p)}</a>`).join(', ');
+			}
+			if (key === 'website') {
+				const url = /^https?:\\/\\//i.test(v) ? v : 'http://' + v;
+				return `<a href="${escapeHtml(url)}" target="_blank" rel="noopener noreferrer">${escapeHtml(v)}</a>`;
+			}
+			if (key === 'osm_url') return `<a class="osm-link" href="${escapeHtml(v)}" target="_blank" rel="noopener noreferrer">Open</a>`;
+			return escapeHtml(v);
+		}
+
+		function rowHtml(i) {
+			let html = '<tr>';
+			for (const f of FIELDS) {
+				const v = COLUMN[f][i];
+				const title = v === null || v === '' || f === 'osm_url' ? '' : ` title="${escapeHtml(v)}"`;
+				html += `<td${title}>${cellHtml(f, v)}</td>`;
+			}
+			return html + '</tr>';
+		}
+
+		function spacerHtml(height) {
+			return `<tr class="spacer"><td colspan="${FIELDS.length}" style="height: ${height}px"></td></tr>`;
+		}
+
+		function render() {
+			frame = 0;
+			const h = rowHeight || 36;
+			const first = Math.max(0, Math.floor(wrap.scrollTop / h) - OVERSCAN);
+			const last = Math.min(view.length, first + Math.ceil(wrap.clientHeight / h) + 2 * OVERSCAN);
+			let html = spacerHtml(first * h);
+			for (let k = first; k < last; k++) html += rowHtml(view[k]);
+			tbody.innerHTML = html + spacerHtml((view.length - last) * h);
+			if (!rowHeight && last > first) {
+				rowHeight = tbody.rows[1].getBoundingClientRect().height || h;
+				if (rowHeight !== h) render();
+			}
+		}
+
+		function scheduleRender() {
+			if (!frame) frame = requestAnimationFrame(render);
+		}
+
+		function postingList(g) {
+			let ids = INDEX.decoded.get(g);
+			if (!ids) {
+				const deltas = INDEX.postings[g];
+				ids = new Int32Array(deltas.length);
+				let v = 0;
+				for (let k = 0; k < deltas.length; k++) ids[k] = v += deltas[k];
+				INDEX.decoded.set(g, ids);
+			}
+			return ids;
+		}
+
+		function intersect(a, b) {
+			// Ascending a (the shorter) and b; each id of a is looked up in b by
+			// binary search from where the previous one was found
+			const out = [];
+			let lo = 0;
+			for (const x of a) {
+				let hi = b.length;
+				while (lo < hi) {
+					const mid = (lo + hi) >> 1;
+					if (b[mid] < x) lo = mid + 1; else hi = mid;
+				}
+				if (lo === b.length) break;
+				if (b[lo] === x) out.push(x);
+			}
+			return out;
+		}
+
+		function indexCandidates(q) {
+			// Rows that may contain q (see SearchIndex.candidates), or null to scan
+			if (!INDEX) return null;
+			const chars = Array.from(q);
+			const lists = [];
+			const seen = new Set();
+			for (let k = 0; k + INDEX.size <= chars.length; k++) {
+				const g = chars.slice(k, k + INDEX.size).join('');
+				if (seen.has(g)) continue;
+				seen.add(g);
+				if (Object.prototype.hasOwnProperty.call(INDEX.postings, g)) lists.push(postingList(g));
+				else if (!INDEX.common.has(g)) return [];
+			}
+			if (!lists.length) return null;
+			lists.sort((a, b) => a.length - b.length);
+			let out = Array.from(lists[0]);
+			for (let j = 1; j < lists.length && out.length; j++) out = intersect(out, lists[j]);
+			return out;
+		}
+
+		function requestIndex() {
+			if (INDEX || !loadIndex || indexPending) return;
+			const version = dataVersion;
+			indexPending = true;
+			loadIndex().then(data => {
+				if (version !== dataVersion) return;
+				INDEX = { size: data.size, common: new Set(data.common), postings: data.postings, decoded: new Map() };
+				indexPending = false;
+			}).catch(() => {
+				if (version === dataVersion) indexPending = false;
+			});
+		}
+
+		function filterRows(q) {
+			if (!q) {
+				matchRows = null;
+				matchMask = null;
+				return;
+			}
+			// Only rows that are index candidates, or matched a query that this one
+			// contains, can match; the smaller of the two sets is checked
+			let pool = matchRows && query && q.includes(query) ? matchRows : null;
+			const candidates = indexCandidates(q);
+			if (candidates && (!pool || candidates.length < pool.length)) pool = candidates;
+			const rows = [];
+			if (pool) {
+				for (const i of pool) if (SEARCH[i].includes(q)) rows.push(i);
+			} else {
+				for (let i = 0; i < TOTAL; i++) if (SEARCH[i].includes(q)) rows.push(i);
+			}
+			matchRows = rows;
+			matchMask = new Uint8Array(TOTAL);
+			for (const i of rows) matchMask[i] = 1;
+		}
+
+		function requestOrders() {
+			if (!loadOrders || ordersPending) return;
+			const version = dataVersion;
+			ordersPending = true;
+			loadOrders().then(orders => {
+				if (version !== dataVersion) return;
+				FIELDS.forEach((f, i) => { ORDER[f] = orders[i]; });
+				ordersPending = false;
+				buildView();
+			}).catch(() => {
+				if (version === dataVersion) ordersPending = false;
+			});
+		}
+
+		function buildView() {
+			let order = ORDER[sortKey];
+			if (!order) {
+				requestOrders();
+				order = ORDER.name;
+			}
+			const out = new Int32Array(matchRows ? matchRows.length : TOTAL);
+			let k = 0;
+			if (sortDir === 'asc' || order !== ORDER[sortKey]) {
+				for (let j = 0; j < order.length; j++) if (!matchMask || matchMask[order[j]]) out[k++] = order[j];
+			} else {
+				for (let j = order.length - 1; j >= 0; j--) if (!matchMask || matchMask[order[j]]) out[k++] = order[j];
+			}
+			view = out;
+			document.getElementById('shown-count').textContent = String(view.length);
+			wrap.scrollTop = 0;
+			scheduleRender();
+		}
+
+		function update() {
+			const q = document.getElementById('search').value.toLowerCase();
+			if (q === query) return;
+			filterRows(q);
+			query = q;
+			buildView();
+		}
+
+		function showTable(data) {
+			dataVersion += 1;
+			ordersPending = false;
+			indexPending = false;
+			INDEX = null;
+			FIELDS = data.fields;
+			COLUMN = {};
+			ORDER = {};
+			FIELDS.forEach((f, i) => {
+				COLUMN[f] = decodeColumn(data.columns[i]);
+				if (data.order[i]) ORDER[f] = data.order[i];
+			});
+			SEARCH = data.search;
+			TOTAL = SEARCH.length;
+			// Re-run the current search against the new rows
+			query = null;
+			matchRows = null;
+			matchMask = null;
+			document.getElementById('total-count').textContent = String(TOTAL);
+			const q = document.getElementById('search').value.toLowerCase();
+			filterRows(q);
+			query = q;
+			buildView();
+		}
+
+		function initSortHeaders() {
+			const thead = document.querySelector('#schools-table thead');
+			const mark = () => {
+				for (const th of thead.querySelectorAll('th')) {
+					th.classList.toggle('sort-asc', th.dataset.key === sortKey && sortDir === 'asc');
+					th.classList.toggle('sort-desc', th.dataset.key === sortKey && sortDir === 'desc');
+				}
+			};
+			thead.addEventListener('click', (ev) => {
+				const th = ev.target.closest('th');
+				if (!th || !th.dataset.key) return;
+				if (sortKey === th.dataset.key) {
+					sortDir = sortDir === 'asc' ? 'desc' : 'asc';
+				} else {
+					sortKey = th.dataset.key;
+					sortDir = 'asc';
+				}
+				mark();
+				buildView();
+			});
+			mark();
+		}
+
+		let debounce = 0;
+		document.getElementById('search').addEventListener('input', () => {
+			requestIndex();
+			clearTimeout(debounce);
+			debounce = setTimeout(update, DEBOUNCE_MS);
+		});
+		wrap.addEventListener('scroll', scheduleRender, { passive: true });
+		window.addEventListener('resize', scheduleRender);
+		initSortHeaders();
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+	<meta charset="utf-8" />
+	<meta name="viewport" content="width=device-width, initial-scale=1" />
+	<title>__TITLE__</title>
+	<style>__STYLE__	</style>
+</head>
+<body>
+	<h1>__TITLE__</h1>
+	<div class="summary">
+		Showing <span id="shown-count" class="count"></span> of <span id="total-count" class="count"></span> schools.
+		<span class="small">Generated __GENERATED_AT__ from OpenStreetMap via Overpass.</span>
+	</div>
+	<div class="controls">
+		<input id="search" type="search" placeholder="Search by name, address, board, operator, etc." />
+		<div class="small">Click a column header to sort.</div>
+	</div>
+__TABLE_HTML__
+	<script>__TABLE_SCRIPT__
+		showTable(__DATA_JSON__);
+	</script>
+	<footer>
+		Data: © OpenStreetMap contributors. This is a derived dataset; accuracy may vary.
+	</footer>
+</body>
+</html>
+"""
+
+# Site shell: the city list is inline, each city's rows are fetched when it is
+# picked, so the shell stays the same size however many cities there are
+SHELL_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+	<meta charset="utf-8" />
+	<meta name="viewport" content="width=device-width, initial-scale=1" />
+	<title>__TITLE__</title>
+	<style>__STYLE__	</style>
+</head>
+<body>
+	<h1>__TITLE__</h1>
+	<div class="summary">
+		Showing <span id="shown-count" class="count">0</span> of <span id="total-count" class="count">0</span> schools
+		in <span id="city-name"></span>. <span id="status" class="small"></span>
+		<span class="small">Generated __GENERATED_AT__ from OpenStreetMap via Overpass.</span>
+	</div>
+	<div class="controls">
+		<select id="city" aria-label="City"></select>
+		<input id="search" type="search" placeholder="Search by name, address, board, operator, etc." />
+		<div class="small">Click a column header to sort.</div>
+	</div>
+__TABLE_HTML__
+	<script>
+		// [{key, label, rows, data, orders, index}]; the last three are URLs
+		const CITIES = __CITIES_JSON__;__TABLE_SCRIPT__
+		const cityData = new Map();
+		const picker = document.getElementById('city');
+		const statusEl = document.getElementById('status');
+		let currentCity = '';
+
+		function fetchJson(url) {
+			return fetch(url).then(r => {
+				if (!r.ok) throw new Error(`HTTP ${r.status} for ${url}`);
+				return r.json();
+			});
+		}
+
+		function openCity(key) {
+			const city = CITIES.find(c => c.key === key) || CITIES[0];
+			if (!city || city.key === currentCity) return;
+			currentCity = city.key;
+			picker.value = city.key;
+			document.getElementById('city-name').textContent = city.label;
+			if (location.hash.slice(1) !== city.key) history.replaceState(null, '', '#' + city.key);
+			if (!cityData.has(city.key)) cityData.set(city.key, fetchJson(city.data));
+			statusEl.textContent = 'Loading…';
+			cityData.get(city.key).then(data => {
+				if (currentCity !== city.key) return;
+				statusEl.textContent = '';
+				loadOrders = () => fetchJson(city.orders);
+				loadIndex = () => fetchJson(city.index);
+				showTable(data);
+			}).catch(err => {
+				cityData.delete(city.key);
+				if (currentCity === city.key) statusEl.textContent = `Could not load ${city.label}: ${err.message}`;
+			});
+		}
+
+		for (const c of CITIES) picker.add(new Option(`${c.label} (${c.rows})`, c.key));
+		picker.addEventListener('change', () => openCity(picker.value));
+		window.addEventListener('hashchange', () => openCity(location.hash.slice(1)));
+		openCity(location.hash.slice(1));
+	</script>
+	<footer>
+		Data: © OpenStreetMap contributors. This is a derived dataset; accuracy may vary.
+	</footer>
+</body>
+</html>
+"""
+
+
+def _fill(template: str, title: str, generated_at: str, columns: Sequence[Tuple[str, str, int]]) -> str:
+	header_cells = "".join(f'<th data-key="{key}">{label}</th>' for key, label, _ in columns)
+	col_tags = "".join(f'<col style="width: {width}px" />' for _, _, width in columns)
+	table_html = (
+		TABLE_HTML
+		.replace("__TABLE_WIDTH__", str(sum(width for _, _, width in columns)))
+		.replace("__TABLE_COLS__", col_tags)
+		.replace("__TABLE_HEADERS__", header_cells)
+	)
+	return (
+		template
+		.replace("__STYLE__", PAGE_STYLE)
+		.replace("__TABLE_HTML__", table_html.strip("\n"))
+		.replace("__TABLE_SCRIPT__", TABLE_SCRIPT.rstrip() + "\n")
+		.replace("__TITLE__", title)
+		.replace("__GENERATED_AT__", generated_at)
+	)
+
+
+def render_page(title: str, generated_at: str, payload: Dict[str, Any], columns: Sequence[Tuple[str, str, int]] = DIRECTORY_COLUMNS) -> str:
+	# Single file with the data inline, which also works from file://
+	return _fill(PAGE_TEMPLATE, title, generated_at, columns).replace("__DATA_JSON__", script_json(payload))
+
+
+def render_shell(title: str, generated_at: str, cities: List[Dict[str, Any]], columns: Sequence[Tuple[str, str, int]] = DIRECTORY_COLUMNS) -> str:
+	return _fill(SHELL_TEMPLATE, title, generated_at, columns).replace("__CITIES_JSON__", script_json(cities))
@@ -0,0 +1,120 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from directory_page import render_shell, table_payload
+from multi_city_schools import DEFAULT_CITIES, CityConfig
+from school_table import SchoolTable
+from search_index import SearchIndex
+
+SITE_DIR = "site"
+DATA_DIR = "data"
+SITE_TITLE = "India Schools Directory"
+# Sort order shipped with each city's rows; the others are fetched on the
+# first click of another column
+DEFAULT_SORT = "name"
+
+
+def city_label(cfg: CityConfig) -> str:
+	return cfg.name_patterns[0] if cfg.name_patterns else cfg.key.title()
+
+
+def _write_json(path: str, value: Any) -> str:
+	# Compact JSON; returns a short content hash for cache busting
+	data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+	tmp_path = path + ".tmp"
+	with open(tmp_path, "wb") as f:
+		f.write(data)
+	os.replace(tmp_path, path)
+	return hashlib.sha1(data).hexdigest()[:10]
+
+
+def write_city_data(out_dir: str, key: str, rows: Sequence[Mapping]) -> Dict[str, Any]:
+	# data/<key>.json holds the columns, the search column and the default sort
+	# order; data/<key>.orders.json the remaining presorted orders and
+	# data/<key>.index.json the search index. Returns the city's entry for the
+	# shell's city list (URLs relative to the shell).
+	payload = table_payload(rows)
+	orders = payload["order"]
+	payload["order"] = [o if f == DEFAULT_SORT else None for f, o in zip(payload["fields"], orders)]
+	data_name = f"{DATA_DIR}/{key}.json"
+	orders_name = f"{DATA_DIR}/{key}.orders.json"
+	index_name = f"{DATA_DIR}/{key}.index.json"
+	data_hash = _write_json(os.path.join(out_dir, data_name), payload)
+	orders_hash = _write_json(os.path.join(out_dir, orders_name), orders)
+	index_hash = _write_json(os.path.join(out_dir, index_name), SearchIndex.build(payload["search"]).to_json())
+	return {
+		"key": key,
+		"rows": len(rows),
+		"data": f"{data_name}?v={data_hash}",
+		"orders": f"{orders_name}?v={orders_hash}",
+		"index": f"{index_name}?v={index_hash}",
+	}
+
+
+def build_site(
+	out_dir: str,
+	tables: Mapping[str, Sequence[Mapping]],
+	labels: Optional[Mapping[str, str]] = None,
+	title: str = SITE_TITLE,
+) -> List[Dict[str, Any]]:
+	# Shell page plus per-city data files for every city in `tables`, in order
+	generated_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+	os.makedirs(os.path.join(out_dir, DATA_DIR), exist_ok=True)
+	cities: List[Dict[str, Any]] = []
+	for key, rows in tables.items():
+		entry = write_city_data(out_dir, key, rows)
+		entry["label"] = (labels or {}).get(key) or key.title()
+		cities.append(entry)
+	with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+		f.write(render_shell(title, generated_at, cities))
+	return cities
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(
+		description=(
+			"Build a static directory site from the <city>_schools.json files written by "
+			"multi_city_schools.py: a shell page with a city switcher and per-city data "
+			"files loaded on demand. Serve it over HTTP (e.g. python -m http.server -d site)."
+		),
+	)
+	parser.add_argument("cities", nargs="?", default="", help="comma-separated city keys (default: all)")
+	parser.add_argument("--src", default=".", help="directory with the <city>_schools.json files")
+	parser.add_argument("--out", default=SITE_DIR, help=f"output directory (default: {SITE_DIR})")
+	return parser.parse_args(argv)
+
+
+def main() -> int:
+	args = parse_args(sys.argv[1:])
+	arg_keys = [a.strip().lower() for a in args.cities.split(",") if a.strip()]
+	cities = [c for c in DEFAULT_CITIES if not arg_keys or c.key in arg_keys]
+	if not cities:
+		print("No matching cities. Valid keys:", ", ".join([c.key for c in DEFAULT_CITIES]))
+		return 2
+
+	tables: Dict[str, SchoolTable] = {}
+	for cfg in cities:
+		path = os.path.join(args.src, f"{cfg.key}_schools.json")
+		if not os.path.exists(path):
+			print(f"{cfg.key}: no {path}, skipped (run multi_city_schools.py first)", file=sys.stderr)
+			continue
+		tables[cfg.key] = SchoolTable.read_json(path)
+	if not tables:
+		print("No city data found.", file=sys.stderr)
+		return 1
+
+	entries = build_site(args.out, tables, labels={c.key: city_label(c) for c in cities})
+	for entry in entries:
+		data_path = os.path.join(args.out, entry["data"].split("?", 1)[0])
+		print(f"{entry['key']}: {entry['rows']} rows, {os.path.getsize(data_path) / 1024:.1f} KB")
+	print(f"Wrote {len(entries)} cities to {os.path.join(args.out, 'index.html')}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,13 +1,22 @@
+import argparse
 import csv
 import os
 import re
 import sys
 import time
-import html
 import urllib.parse
-import urllib.request
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from html_tokens import ParsedPage, complete_prefix, parse_html, visible_text
+from host_health import BASE_BACKOFF_S, HEALTH_NAME, HostHealth, classify_error, health_key
+from http_pool import ConnectionPool
+from keyword_matcher import KeywordMatcher, first_index
+from page_cache import DEFAULT_DISK_BYTES, PAGE_CACHE_DIR, CachedPage, PageCache
+from page_reader import PAGE_BYTE_BUDGET, READ_STATS, ReadGoal, read_text
+from site_discovery import MAX_SITEMAP_FETCHES, parse_sitemap, rank_candidates, robots_url, score_candidate, sitemap_candidates, sitemaps_for
+from enrich_journal import JOURNAL_NAME, RETRY_AFTER_S, Journal
+from crawl_engine import CPU_QUEUE, HOST_INTERVAL_S, MAX_IN_FLIGHT, PER_HOST_LIMIT, CpuTask, CrawlEngine, CrawlOptions, CrawlStats, Fetch, Steps, run_steps
 
 # Columns to enrich (must match those created earlier)
 TARGET_COLUMNS = [
@@ -30,8 +39,18 @@ USER_AGENT = (
 )
 
 FETCH_TIMEOUT_S = 15
-MAX_WORKERS = 6
+# Keep-alive connections shared by every fetch, so a site's sub-pages reuse the
+# connection (and TLS session) opened for its homepage
+HTTP_POOL = ConnectionPool(timeout=FETCH_TIMEOUT_S)
+# In-memory page cache for this process; main() adds a disk directory with --page-cache
+PAGE_CACHE = PageCache()
+# Per-host failure record for this process; main() loads and saves it (--host-health)
+HOST_HEALTH = HostHealth()
+# Sleep after every request on the blocking path (enrich_from_website); the
+# crawl engine spaces requests per host instead (HOST_INTERVAL_S)
 PER_REQUEST_DELAY_S = 0.5
+# Checkpoint a file with new results at least this often during a crawl
+FLUSH_EVERY_S = 60.0
 
 SECTION_KEYWORDS = {
 	"Fee Structure": ["fee", "fees", "tuition", "annual fee", "admission fee"],
@@ -61,6 +80,20 @@ LINK_HINTS = {
 	"Review": ["testimonial", "review"],
 }
 
+# Compiled once: snippet keywords per column (a LINK_HINTS column without
+# SECTION_KEYWORDS falls back to its hints) and link hints per column
+SNIPPET_MATCHER = KeywordMatcher({**LINK_HINTS, **SECTION_KEYWORDS})
+LINK_MATCHER = KeywordMatcher(LINK_HINTS)
+# Columns looked for in the homepage text itself
+HOMEPAGE_SECTIONS = [col for col in SECTION_KEYWORDS if col != "Review"]
+# Section pages tried per missing column, best ranked first (the homepage-link
+# crawl used to try up to six in a row)
+MAX_CANDIDATES = 1
+# Extra visible text required past a snippet window before a page read is cut
+# short, covering a word or entity split by the cut
+SNIPPET_SLACK = 64
+_KEYWORD_OVERLAP = max(len(kw) for kws in SNIPPET_MATCHER.groups.values() for kw in kws) - 1
+
 
 def normalize_url(url: str) -> Optional[str]:
 	if not url:
@@ -79,59 +112,152 @@ def normalize_url(url: str) -> Optional[str]:
 		return None
 
 
-def fetch_url_text(url: str) -> Optional[str]:
+def page_key(url: str) -> str:
+	# Cache identity of a page: normalize_url without the fragment, which is never sent
+	return normalize_url(urllib.parse.urldefrag(url)[0]) or url
+
+
+class SectionGoal(ReadGoal):
+	# A sub-page read can stop once the visible text read so far holds the
+	# snippet extract_snippets would take from the whole page for every wanted
+	# column: the first keyword hit plus its full window. Checking means parsing
+	# the text so far, so it is only done once every column's keywords have
+	# shown up in the raw HTML since the last check.
+	def __init__(self, columns: Iterable[str], max_chars: int = 450) -> None:
+		self.columns = tuple(columns)
+		self.max_chars = max_chars
+		self._missing = set(self.columns)
+		self._tail = ""
+
+	def seen(self, piece: str) -> bool:
+		if self._missing:
+			self._missing -= SNIPPET_MATCHER.present((self._tail + piece).lower(), self._missing)
+			self._tail = piece[-_KEYWORD_OVERLAP:]
+		return not self._missing
+
+	def reached(self, text: str) -> Optional[str]:
+		prefix = complete_prefix(text)
+		visible = visible_text(prefix)
+		hits = SNIPPET_MATCHER.first_hits(visible.lower(), self.columns)
+		# Keyword only in markup so far: wait for it to show up again
+		self._missing = {col for col in self.columns if col not in hits}
+		if self._missing or any(idx + self.max_chars + SNIPPET_SLACK > len(visible) for idx in hits.values()):
+			return None
+		return prefix
+
+
+def fetch_page(
+	url: str,
+	headers: Dict[str, str],
+	pool: Optional[ConnectionPool] = None,
+	want: Tuple[str, ...] = (),
+	budget: int = PAGE_BYTE_BUDGET,
+	health: Optional[HostHealth] = None,
+) -> Tuple[int, Optional[CachedPage]]:
+	# `want`: the columns the caller needs from this page; reading stops once
+	# they are found (empty: read the whole page up to `budget` bytes). Hosts
+	# with an open circuit in `health` are not contacted.
+	health = health or HOST_HEALTH
+	host = health_key(url)
+	if not health.allow(host):
+		return 0, None
+	t0 = time.monotonic()
 	try:
-		req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-		with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT_S) as resp:
-			if resp.getcode() != 200:
-				return None
+		with (pool or HTTP_POOL).open(url, {"User-Agent": USER_AGENT, **headers}) as resp:
+			if resp.status >= 500:
+				health.record_failure(host, "http_5xx", time.monotonic() - t0, resp.status)
+				return resp.status, None
+			health.record_success(host, resp.status)
+			if resp.status != 200:
+				return resp.status, None
 			ct = resp.headers.get("Content-Type", "")
-			if "text" not in ct and "html" not in ct:
-				return None
-			data = resp.read()
-			# Limit to a reasonable size
-			data = data[:800_000]
-			text = data.decode("utf-8", errors="ignore")
-			return text
-	except Exception:
-		return None
+			if "text" not in ct and "html" not in ct and "xml" not in ct:
+				return resp.status, None
+			text, partial = read_text(resp.read, ct, budget, SectionGoal(want) if want else None)
+			return resp.status, CachedPage(
+				key=page_key(url),
+				text=text,
+				etag=resp.headers.get("ETag") or "",
+				last_modified=resp.headers.get("Last-Modified") or "",
+				covers=want if partial else None,
+			)
+	except Exception as e:
+		kind = classify_error(e)
+		if kind is not None:
+			health.record_failure(host, kind, time.monotonic() - t0)
+		return 0, None
+
+
+def read_url_text(
+	url: str,
+	pool: Optional[ConnectionPool] = None,
+	cache: Optional[PageCache] = None,
+	want: Tuple[str, ...] = (),
+	budget: int = PAGE_BYTE_BUDGET,
+	health: Optional[HostHealth] = None,
+) -> Optional[str]:
+	# Same page for the same normalized URL: repeated links within a site and
+	# schools sharing a website are fetched once per run (see PageCache)
+	page = (cache or PAGE_CACHE).get(page_key(url), lambda headers: fetch_page(url, headers, pool, want, budget, health), want)
+	return page.text if page is not None else None
+
+
+def read_request(
+	request: Union[str, Fetch],
+	cache: Optional[PageCache] = None,
+	budget: int = PAGE_BYTE_BUDGET,
+	health: Optional[HostHealth] = None,
+) -> Optional[str]:
+	if isinstance(request, Fetch):
+		return read_url_text(request.url, cache=cache, want=request.want, budget=budget, health=health)
+	return read_url_text(request, cache=cache, budget=budget, health=health)
+
+
+def fetch_url_text(request: Union[str, Fetch]) -> Optional[str]:
+	try:
+		return read_request(request)
 	finally:
 		time.sleep(PER_REQUEST_DELAY_S)
 
 
 def strip_html_get_text(html_text: str) -> str:
-	# Remove scripts/styles, tags, collapse whitespace
-	html_text = re.sub(r"(?is)<script[^>]*>.*?</script>", " ", html_text)
-	html_text = re.sub(r"(?is)<style[^>]*>.*?</style>", " ", html_text)
-	text = re.sub(r"(?is)<[^>]+>", " ", html_text)
-	text = html.unescape(text)
-	text = re.sub(r"\s+", " ", text).strip()
-	return text
+	# Remove scripts/styles, tags, collapse whitespace (one pass, see html_tokens)
+	return visible_text(html_text)
+
+
+def snippet_at(text: str, idx: int, max_chars: int = 450) -> str:
+	start = max(0, idx - 180)
+	end = min(len(text), idx + max_chars)
+	return text[start:end].strip()
 
 
 def extract_snippet(text: str, keywords: Iterable[str], max_chars: int = 450) -> str:
 	if not text:
 		return ""
-	text_l = text.lower()
-	best_idx = -1
-	for kw in keywords:
-		idx = text_l.find(kw.lower())
-		if idx != -1 and (best_idx == -1 or idx < best_idx):
-			best_idx = idx
-	if best_idx == -1:
+	idx = first_index(text.lower(), [kw.lower() for kw in keywords])
+	if idx == -1:
 		return ""
-	start = max(0, best_idx - 180)
-	end = min(len(text), best_idx + max_chars)
-	snippet = text[start:end]
-	return snippet.strip()
+	return snippet_at(text, idx, max_chars)
 
 
-def find_internal_links(html_text: str, base_url: str, hint_keywords: Iterable[str]) -> List[str]:
+def extract_snippets(text: str, columns: Iterable[str], max_chars: int = 450) -> Dict[str, str]:
+	# extract_snippet for several columns at once, lowercasing the text once
+	if not text:
+		return {}
+	hits = SNIPPET_MATCHER.first_hits(text.lower(), columns)
+	out: Dict[str, str] = {}
+	for col, idx in hits.items():
+		val = snippet_at(text, idx, max_chars)
+		if val:
+			out[col] = val
+	return out
+
+
+def links_for_hints(page: ParsedPage, base_url: str, hint_keywords: Iterable[str]) -> List[str]:
+	hints = list(hint_keywords)
 	links: List[str] = []
-	for m in re.finditer(r"(?is)<a[^>]+href=\"([^\"]+)\"[^>]*>(.*?)</a>", html_text):
-		href = m.group(1)
-		anchor = strip_html_get_text(m.group(2))[:120].lower()
-		if any(h in anchor for h in hint_keywords) or any(h in href.lower() for h in hint_keywords):
+	for href, anchor in page.anchors:
+		if any(h in anchor for h in hints) or any(h in href.lower() for h in hints):
 			full = urllib.parse.urljoin(base_url, href)
 			links.append(full)
 	# Deduplicate
@@ -144,36 +270,100 @@ def find_internal_links(html_text: str, base_url: str, hint_keywords: Iterable[s
 	return uniq[:6]
 
 
-def enrich_from_website(base_url: str) -> Dict[str, str]:
+def find_internal_links(html_text: str, base_url: str, hint_keywords: Iterable[str]) -> List[str]:
+	return links_for_hints(parse_html(html_text), base_url, hint_keywords)
+
+
+def section_links(page: ParsedPage, base_url: str, limit: int = 6) -> Dict[str, List[str]]:
+	# links_for_hints for every LINK_HINTS column in one walk over the anchors
+	links: Dict[str, List[str]] = {col: [] for col in LINK_HINTS}
+	for href, anchor in page.anchors:
+		cols = LINK_MATCHER.present(anchor) | LINK_MATCHER.present(href.lower())
+		if not cols:
+			continue
+		full = urllib.parse.urljoin(base_url, href)
+		for col in cols:
+			found = links[col]
+			if len(found) < limit and full not in found:
+				found.append(full)
+	return links
+
+
+def anchor_candidates(page: ParsedPage, base_url: str) -> Dict[str, List[Tuple[float, str]]]:
+	# Scored links per LINK_HINTS column (see site_discovery.score_candidate)
+	scored: Dict[str, List[Tuple[float, str]]] = {col: [] for col in LINK_HINTS}
+	for href, anchor in page.anchors:
+		cols = LINK_MATCHER.present(anchor) | LINK_MATCHER.present(href.lower())
+		if not cols:
+			continue
+		full = urllib.parse.urljoin(base_url, href)
+		for col in cols:
+			scored[col].append((score_candidate(full, LINK_HINTS[col], anchor), full))
+	return scored
+
+
+def analyze_homepage(html_home: str, base_url: str) -> Tuple[Dict[str, str], Dict[str, List[Tuple[float, str]]]]:
+	# One parse of the homepage serves the snippets and the links of every section
+	page_home = parse_html(html_home)
+	return extract_snippets(page_home.text, HOMEPAGE_SECTIONS), anchor_candidates(page_home, base_url)
+
+
+def page_snippet(page_html: str, col: str) -> str:
+	return extract_snippets(strip_html_get_text(page_html), [col]).get(col, "")
+
+
+def sitemap_steps(base: str, columns: List[str]) -> Steps:
+	# Scored sitemap URLs for `columns`: robots.txt names the sitemaps (else
+	# /sitemap.xml is tried); an index is followed to its children, pages first,
+	# for at most MAX_SITEMAP_FETCHES sitemaps. Both files come through the page
+	# cache, so schools on one site share them.
+	robots_text = yield robots_url(base)
+	queue = sitemaps_for(base, robots_text)
+	urls: List[str] = []
+	fetched = 0
+	while queue and fetched < MAX_SITEMAP_FETCHES:
+		xml_text = yield queue.pop(0)
+		fetched += 1
+		if not xml_text:
+			continue
+		locs, children = yield CpuTask(parse_sitemap, (xml_text,))
+		urls.extend(locs)
+		queue.extend(sorted(children, key=lambda u: "page" not in u.lower()))
+	if not urls:
+		return {}
+	return (yield CpuTask(sitemap_candidates, (urls, base, {col: LINK_HINTS[col] for col in columns})))
+
+
+def enrich_steps(base_url: str, max_candidates: int = MAX_CANDIDATES, sitemaps: bool = True) -> Steps:
+	# Crawl job behind enrich_from_website: yields each URL to fetch and is sent
+	# the page text (or None) back. Parsing is yielded as CpuTasks, which the
+	# crawl engine can run in worker processes (--cpu-workers).
 	result: Dict[str, str] = {}
 	base = normalize_url(base_url)
 	if not base:
 		return result
 
-	html_home = fetch_url_text(base)
+	html_home = yield base
 	if not html_home:
 		return result
-	text_home = strip_html_get_text(html_home)
 
 	# Try to extract from homepage first
-	for col, kws in SECTION_KEYWORDS.items():
-		if col in ("Review",):
-			continue
-		val = extract_snippet(text_home, kws)
-		if val:
-			result[col] = val
-
-	# Follow likely internal links per section
-	for col, hints in LINK_HINTS.items():
-		if result.get(col):
-			continue
-		candidates = find_internal_links(html_home, base, hints)
-		for link in candidates:
-			page_html = fetch_url_text(link)
+	found, scored = yield CpuTask(analyze_homepage, (html_home, base))
+	result.update(found)
+
+	# Rank section pages from the homepage links and the sitemap, then fetch
+	# only the best few per missing section
+	missing = [col for col in LINK_HINTS if not result.get(col)]
+	if missing and sitemaps:
+		from_sitemap = yield from sitemap_steps(base, missing)
+		for col, extra in from_sitemap.items():
+			scored[col].extend(extra)
+	for col in missing:
+		for link in rank_candidates(scored[col])[:max_candidates]:
+			page_html = yield Fetch(link, (col,))
 			if not page_html:
 				continue
-			text = strip_html_get_text(page_html)
-			val = extract_snippet(text, SECTION_KEYWORDS.get(col, hints))
+			val = yield CpuTask(page_snippet, (page_html, col))
 			if val:
 				result[col] = val
 				break
@@ -193,29 +383,63 @@ def enrich_from_website(base_url: str) -> Dict[str, str]:
 	return result
 
 
-def process_file(path: str, max_rows: Optional[int]) -> Tuple[str, int, int]:
+def enrich_from_website(base_url: str) -> Dict[str, str]:
+	return run_steps(enrich_steps(base_url), fetch_url_text)
+
+
+ENRICHED_COLUMNS = ("Fee Structure", "Admission Details", "School Infrastructure Details", "Co-Curricular Activities", "FAQ", "Review")
+
+
+def needs_enrichment(row: Dict[str, Any]) -> bool:
+	for col in ENRICHED_COLUMNS:
+		if row.get(col):
+			return False
+	return True
+
+
+@dataclass
+class CsvFile:
+	path: str
+	rows: List[Dict[str, Any]]
+	fieldnames: List[str]
+	tasks: List[Tuple[int, str]]
+	pending: int = 0
+	updated: int = 0
+	resumed: int = 0
+	dirty: bool = False
+	flushed_at: float = 0.0
+	written: bool = False
+
+	@property
+	def name(self) -> str:
+		return os.path.basename(self.path)
+
+
+def load_csv_file(
+	path: str,
+	max_rows: Optional[int],
+	journal: Optional[Journal] = None,
+	retry_after_s: float = RETRY_AFTER_S,
+) -> CsvFile:
+	# With a journal (--resume), sites it already has an outcome for are not
+	# queued again; their data is applied straight from the journal.
 	with open(path, "r", encoding="utf-8-sig", newline="") as f:
 		reader = csv.DictReader(f)
 		rows = list(reader)
-		fieldnames = reader.fieldnames or []
+		fieldnames = list(reader.fieldnames or [])
 
 	# Ensure target columns exist
 	for col in TARGET_COLUMNS:
 		if col not in fieldnames:
 			fieldnames.append(col)
 
-	def needs_enrichment(row: Dict[str, Any]) -> bool:
-		for col in ("Fee Structure", "Admission Details", "School Infrastructure Details", "Co-Curricular Activities", "FAQ", "Review"):
-			if row.get(col):
-				return False
-		return True
-
 	indices = list(range(len(rows)))
 	if max_rows is not None:
 		indices = indices[:max_rows]
 
 	# Prepare tasks
 	tasks: List[Tuple[int, str]] = []
+	resumed = 0
 	for i in indices:
 		row = rows[i]
 		if not needs_enrichment(row):
@@ -226,46 +450,152 @@ def process_file(path: str, max_rows: Optional[int]) -> Tuple[str, int, int]:
 		url = normalize_url(website)
 		if not url:
 			continue
+		rec = journal.resume_entry(url, retry_after_s) if journal is not None else None
+		if rec is not None:
+			if rec["data"]:
+				row.update(rec["data"])
+				resumed += 1
+			continue
 		tasks.append((i, url))
+	return CsvFile(path=path, rows=rows, fieldnames=fieldnames, tasks=tasks, pending=len(tasks), resumed=resumed, dirty=resumed > 0)
+
 
-	updated = 0
-	if tasks:
-		with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-			futures = {ex.submit(enrich_from_website, url): idx for idx, url in tasks}
-			for fut in as_completed(futures):
-				idx = futures[fut]
-				try:
-					data = fut.result()
-				except Exception:
-					data = {}
-				if data:
-					for k, v in data.items():
-						rows[idx][k] = v
-					updated += 1
-
-	# Write back
-	tmp_path = path + ".tmp"
+def write_csv_file(job: CsvFile) -> None:
+	tmp_path = job.path + ".tmp"
 	with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
-		writer = csv.DictWriter(f, fieldnames=fieldnames)
+		writer = csv.DictWriter(f, fieldnames=job.fieldnames)
 		writer.writeheader()
-		for r in rows:
+		for r in job.rows:
 			writer.writerow(r)
-	os.replace(tmp_path, path)
+	os.replace(tmp_path, job.path)
+	job.dirty = False
+	job.flushed_at = time.monotonic()
 
-	return os.path.basename(path), len(rows), updated
+
+def journaled_steps(url: str, max_candidates: int = MAX_CANDIDATES, sitemaps: bool = True) -> Steps:
+	# enrich_steps, also reporting whether the homepage could be fetched, so an
+	# unreachable site ("failed") is told apart from one without matches ("empty")
+	steps = enrich_steps(url, max_candidates, sitemaps)
+	home_ok: Optional[bool] = None
+	try:
+		page = yield next(steps)
+		while True:
+			if home_ok is None:
+				home_ok = page is not None
+			page = yield steps.send(page)
+	except StopIteration as stop:
+		return stop.value, bool(home_ok)
+
+
+def process_files(
+	paths: List[str],
+	max_rows: Optional[int],
+	options: Optional[CrawlOptions] = None,
+	on_written: Optional[Callable[[CsvFile], None]] = None,
+	journal: Optional[Journal] = None,
+	resume: bool = False,
+	retry_after_s: float = RETRY_AFTER_S,
+	flush_every_s: Optional[float] = FLUSH_EVERY_S,
+	page_cache: Optional[PageCache] = None,
+	page_budget: int = PAGE_BYTE_BUDGET,
+	max_candidates: int = MAX_CANDIDATES,
+	sitemaps: bool = True,
+	host_health: Optional[HostHealth] = None,
+) -> Tuple[List[CsvFile], CrawlStats]:
+	# One crawl over the sites of every file: jobs are keyed (file, row), results
+	# go back to their file, and a file is rewritten as soon as its last site is
+	# done instead of after the whole directory. Every outcome is appended to the
+	# journal as it arrives and files with new results are checkpointed every
+	# flush_every_s, so an interrupted run loses at most that much CSV work and
+	# none of the journal.
+	files = [load_csv_file(p, max_rows, journal if resume else None, retry_after_s) for p in paths]
+
+	def finish(job: CsvFile) -> None:
+		write_csv_file(job)
+		job.written = True
+		if on_written is not None:
+			on_written(job)
+
+	def on_result(key: Any, outcome: Optional[Tuple[Dict[str, str], bool]]) -> None:
+		fi, idx, url = key
+		job = files[fi]
+		data, home_ok = outcome if outcome is not None else ({}, False)
+		if journal is not None:
+			journal.record(url, "ok" if data else ("empty" if home_ok else "failed"), data)
+		if data:
+			for k, v in data.items():
+				job.rows[idx][k] = v
+			job.updated += 1
+			job.dirty = True
+		job.pending -= 1
+		if job.pending == 0:
+			finish(job)
+		elif job.dirty and flush_every_s is not None and time.monotonic() - job.flushed_at >= flush_every_s:
+			write_csv_file(job)
+
+	now = time.monotonic()
+	for job in files:
+		job.flushed_at = now
+		if not job.tasks:
+			finish(job)
+
+	jobs = (
+		((fi, idx, url), lambda url=url: journaled_steps(url, max_candidates, sitemaps))
+		for fi, job in enumerate(files)
+		for idx, url in job.tasks
+	)
+	try:
+		stats = CrawlEngine(lambda request: read_request(request, page_cache, page_budget, host_health), options).run(jobs, on_result)
+	finally:
+		# Files with sites cut off by the deadline (or Ctrl-C) keep what was found so far
+		for job in files:
+			if not job.written:
+				finish(job)
+		if journal is not None:
+			journal.sync()
+	return files, stats
+
+
+def process_file(path: str, max_rows: Optional[int], options: Optional[CrawlOptions] = None) -> Tuple[str, int, int]:
+	(job,), _stats = process_files([path], max_rows, options)
+	return job.name, len(job.rows), job.updated
 
 
 def main() -> int:
-	if len(sys.argv) < 2:
-		print("Usage: python3 enrich_csvs.py <csv_dir> [--max-per-file N]")
-		return 2
-	dir_path = sys.argv[1]
-	max_rows: Optional[int] = None
-	if len(sys.argv) > 2 and sys.argv[2] == "--max-per-file" and len(sys.argv) > 3:
-		try:
-			max_rows = int(sys.argv[3])
-		except Exception:
-			max_rows = None
+	parser = argparse.ArgumentParser(description="Fill the section columns of school CSVs from each school's website.")
+	parser.add_argument("csv_dir")
+	parser.add_argument("--max-per-file", type=int, default=None, metavar="N", help="only look at the first N rows of each file")
+	parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help=f"concurrent requests overall (default: {MAX_IN_FLIGHT})")
+	parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help=f"concurrent requests per host (default: {PER_HOST_LIMIT})")
+	parser.add_argument("--host-interval", type=float, default=HOST_INTERVAL_S, help=f"seconds between request starts to one host (default: {HOST_INTERVAL_S})")
+	parser.add_argument("--cpu-workers", type=int, default=os.cpu_count() or 1, metavar="N", help="processes parsing pages, apart from the fetch threads; 0 parses on the crawl loop (default: CPU count)")
+	parser.add_argument("--cpu-queue", type=int, default=CPU_QUEUE, metavar="N", help=f"pages waiting to be parsed before fetching pauses (default: {CPU_QUEUE})")
+	parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS", help="stop the crawl after this long; unfinished rows are left for the next run")
+	parser.add_argument("--candidates", type=int, default=MAX_CANDIDATES, metavar="N", help=f"section pages to try per missing column, best ranked first (default: {MAX_CANDIDATES})")
+	parser.add_argument("--no-sitemaps", action="store_true", help="rank only the homepage links, without reading robots.txt sitemaps or /sitemap.xml")
+	parser.add_argument("--ignore-robots", action="store_true", help="do not fetch robots.txt before crawling a host (Disallow and Crawl-delay are not honoured)")
+	parser.add_argument("--resume", action="store_true", help="skip sites the journal already has a result for (failures are retried after --retry-after)")
+	parser.add_argument("--retry-after", type=float, default=RETRY_AFTER_S / 3600.0, metavar="HOURS", help="with --resume, crawl failed sites again after this long")
+	parser.add_argument("--journal", default=None, help=f"progress journal (default: <csv_dir>/{JOURNAL_NAME})")
+	parser.add_argument("--flush-every", type=float, default=FLUSH_EVERY_S, metavar="SECONDS", help="rewrite a CSV with new results at least this often")
+	parser.add_argument("--page-cache", nargs="?", const=PAGE_CACHE_DIR, default=None, metavar="DIR", help=f"keep fetched pages on disk and revalidate them on later runs (default DIR: {PAGE_CACHE_DIR})")
+	parser.add_argument("--host-health", default=None, metavar="FILE", help=f"per-host failure record kept across runs (default: <csv_dir>/{HEALTH_NAME})")
+	parser.add_argument("--dead-host-hours", type=float, default=BASE_BACKOFF_S / 3600.0, metavar="HOURS", help="skip a failing host for this long, doubling with each further failure")
+	parser.add_argument("--retry-dead-hosts", action="store_true", help="contact hosts even while they are marked dead (their record is still updated)")
+	parser.add_argument("--page-budget-kb", type=int, default=PAGE_BYTE_BUDGET // 1000, metavar="KB", help=f"read at most this much of a page (default: {PAGE_BYTE_BUDGET // 1000})")
+	parser.add_argument("--page-cache-mb", type=int, default=DEFAULT_DISK_BYTES // (1024 * 1024), help="evict least recently used pages above this size on disk")
+	args = parser.parse_args(sys.argv[1:])
+	dir_path = args.csv_dir
+	max_rows: Optional[int] = args.max_per_file
+	options = CrawlOptions(
+		max_in_flight=args.max_in_flight,
+		per_host=args.per_host,
+		host_interval_s=args.host_interval,
+		deadline_s=args.deadline,
+		cpu_workers=max(0, args.cpu_workers),
+		cpu_queue=args.cpu_queue,
+		robots=not args.ignore_robots,
+	)
 
 	files = [
 		os.path.join(dir_path, name)
@@ -276,11 +606,64 @@ def main() -> int:
 		print("No CSV files found in directory.")
 		return 0
 
-	for p in files:
-		name, total, upd = process_file(p, max_rows)
-		print(f"{name}: rows={total}, updated={upd}")
-		# brief politeness delay between files
-		time.sleep(2.0)
+	def report(job: CsvFile) -> None:
+		left = f", unfinished={job.pending}" if job.pending else ""
+		print(f"{job.name}: rows={len(job.rows)}, updated={job.updated + job.resumed}{left}", flush=True)
+
+	page_cache = PAGE_CACHE
+	if args.page_cache:
+		page_cache = PageCache(directory=args.page_cache, max_disk_bytes=args.page_cache_mb * 1024 * 1024)
+	host_health = HostHealth(
+		args.host_health or os.path.join(dir_path, HEALTH_NAME),
+		base_backoff_s=args.dead_host_hours * 3600.0,
+		enforce=not args.retry_dead_hosts,
+	)
+	journal = Journal(args.journal or os.path.join(dir_path, JOURNAL_NAME))
+	try:
+		done, stats = process_files(
+			files,
+			max_rows,
+			options,
+			on_written=report,
+			journal=journal,
+			resume=args.resume,
+			retry_after_s=args.retry_after * 3600.0,
+			flush_every_s=args.flush_every,
+			page_cache=page_cache,
+			page_budget=max(1, args.page_budget_kb) * 1000,
+			max_candidates=max(1, args.candidates),
+			sitemaps=not args.no_sitemaps,
+			host_health=host_health,
+		)
+	finally:
+		journal.close()
+		host_health.save()
+	resumed = sum(job.resumed for job in done)
+	if resumed:
+		print(f"Resumed {resumed} row(s) from the journal without crawling")
+	if stats.unfinished:
+		print(f"Deadline reached: {stats.unfinished} site(s) left for the next run", file=sys.stderr)
+	pool = HTTP_POOL.stats
+	print(
+		f"{stats.fetches} fetches in {stats.seconds:.1f}s over {pool.connections} connections "
+		f"({pool.reused} reused), {pool.wire_bytes / 1e6:.1f} MB on the wire for {pool.body_bytes / 1e6:.1f} MB of pages"
+	)
+	health = host_health.stats
+	print(
+		f"Host health: skipped {health.skipped} request(s) to {len(health.skipped_hosts)} host(s) marked dead, "
+		f"about {health.saved_seconds:.0f}s of failing requests saved; {health.opened} host(s) newly marked dead, {health.recovered} recovered"
+	)
+	if stats.disallowed or stats.slowed_hosts:
+		print(f"robots.txt: {stats.disallowed} URL(s) disallowed, {stats.slowed_hosts} host(s) slowed to their Crawl-delay")
+	reads = READ_STATS
+	print(f"Pages read: {reads.pages}, {reads.stopped_early} stopped once their sections were found, {reads.over_budget} cut at --page-budget-kb")
+	where = f"{options.cpu_workers} worker process(es)" if options.cpu_workers else "the crawl loop"
+	print(f"{stats.cpu_tasks} parse tasks on {where}")
+	cached = page_cache.stats
+	print(f"Page cache: {cached.hits + cached.coalesced} duplicate fetches avoided, {cached.revalidated} pages revalidated (304), {cached.fetched} fetched")
+	if args.page_cache:
+		page_cache.evict_disk()
+	HTTP_POOL.close()
 
 	print("Done.")
 	return 0
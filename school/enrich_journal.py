@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# Append-only record of every site crawled by enrich_csvs, one JSON object per
+# line: {"url", "status", "data", "t"}. status is "ok" (data found), "empty"
+# (site answered, nothing matched) or "failed" (homepage could not be fetched).
+JOURNAL_NAME = ".enrich_journal.jsonl"
+RETRY_AFTER_S = 24 * 3600
+FSYNC_EVERY = 50
+
+STATUSES = ("ok", "empty", "failed")
+
+
+class Journal:
+	# Later lines win, so a site that failed and later succeeded is "ok". A torn
+	# last line from a crash is ignored on load.
+	def __init__(self, path: str) -> None:
+		self.path = path
+		self.entries: Dict[str, Dict[str, Any]] = {}
+		self._lock = threading.Lock()
+		self._unsynced = 0
+		self._load()
+		self._f = open(path, "a", encoding="utf-8")
+
+	def _load(self) -> None:
+		if not os.path.isfile(self.path):
+			return
+		with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+			for line in f:
+				try:
+					rec = json.loads(line)
+				except ValueError:
+					continue
+				if isinstance(rec, dict) and rec.get("url") and rec.get("status") in STATUSES:
+					self.entries[rec["url"]] = rec
+
+	def record(self, url: str, status: str, data: Optional[Dict[str, str]] = None) -> None:
+		rec = {"url": url, "status": status, "data": data or {}, "t": round(time.time(), 1)}
+		line = json.dumps(rec, ensure_ascii=False) + "\n"
+		with self._lock:
+			self.entries[url] = rec
+			self._f.write(line)
+			self._f.flush()
+			self._unsynced += 1
+			if self._unsynced >= FSYNC_EVERY:
+				self._sync()
+
+	def _sync(self) -> None:
+		try:
+			os.fsync(self._f.fileno())
+		except OSError:
+			pass
+		self._unsynced = 0
+
+	def sync(self) -> None:
+		with self._lock:
+			self._sync()
+
+	def resume_entry(self, url: str, retry_after_s: float = RETRY_AFTER_S) -> Optional[Dict[str, Any]]:
+		# The entry that lets a resumed run skip `url`: any ok/empty outcome, or a
+		# failure younger than retry_after_s
+		rec = self.entries.get(url)
+		if rec is None:
+			return None
+		if rec["status"] == "failed" and time.time() - float(rec.get("t") or 0) >= retry_after_s:
+			return None
+		return rec
+
+	def close(self) -> None:
+		with self._lock:
+			if self._f.closed:
+				return
+			self._sync()
+			self._f.close()
@@ -0,0 +1,181 @@
+import http.client
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Set
+
+# Health of every website host enrich_csvs has talked to, kept across runs:
+# {host:port: HostRecord}. A host whose requests fail is skipped (circuit open) for
+# a backoff that doubles with each consecutive failure, so dead domains and
+# hosts that time out stop costing a full FETCH_TIMEOUT_S every run.
+HEALTH_NAME = ".host_health.json"
+BASE_BACKOFF_S = 6 * 3600
+MAX_BACKOFF_S = 30 * 24 * 3600
+
+# Consecutive failures of a kind before the circuit opens: a missing domain,
+# a broken certificate or a host that does not answer fails the same way next
+# time; a 5xx or an odd error gets a second chance.
+OPEN_AFTER = {"dns": 1, "tls": 1, "timeout": 1, "refused": 1, "http_5xx": 2, "other": 2}
+# Failures that can be about one URL (a broken robots.txt, an erroring page,
+# a slow deep page timing out after the homepage loaded, a restart refusing
+# one connection) rather than the host; they never open the circuit of a
+# host that answered earlier in the same run
+SOFT_FAILURES = ("http_5xx", "other", "timeout", "refused")
+
+
+def classify_error(exc: BaseException) -> Optional[str]:
+	# Kind of network failure, or None for errors that say nothing about the
+	# host (a bad URL, an unsupported encoding)
+	if isinstance(exc, socket.gaierror):
+		return "dns"
+	if isinstance(exc, ssl.SSLError):
+		return "tls"
+	if isinstance(exc, (socket.timeout, TimeoutError)):
+		return "timeout"
+	if isinstance(exc, ConnectionRefusedError):
+		return "refused"
+	if isinstance(exc, (OSError, http.client.HTTPException)):
+		return "other"
+	return None
+
+
+def health_key(url: str) -> str:
+	# host:port, so a dead service does not take down others on the same
+	# machine, and a TLS failure on 443 does not block plain http
+	try:
+		parts = urllib.parse.urlsplit(url)
+		host = (parts.hostname or "").lower()
+		port = parts.port or (443 if parts.scheme.lower() == "https" else 80)
+	except ValueError:
+		return ""
+	return f"{host}:{port}" if host else ""
+
+
+def status_class(status: int) -> str:
+	return f"{status // 100}xx" if status else ""
+
+
+@dataclass
+class HostRecord:
+	failures: int = 0  # consecutive
+	last_error: str = ""
+	last_status: str = ""
+	open_until: float = 0.0
+	checked_at: float = 0.0
+	# Seconds the failed requests took, for the time-saved estimate
+	failed_requests: int = 0
+	failed_seconds: float = 0.0
+
+	def failure_cost(self) -> float:
+		return self.failed_seconds / self.failed_requests if self.failed_requests else 0.0
+
+
+@dataclass
+class HealthStats:
+	skipped: int = 0
+	saved_seconds: float = 0.0
+	opened: int = 0
+	recovered: int = 0
+	skipped_hosts: Set[str] = field(default_factory=set)
+
+
+class HostHealth:
+	# Negative cache and circuit breaker keyed by health_key(url). allow() is asked
+	# before each request; record_success/record_failure after it. When the
+	# backoff has passed the next request goes through as a probe: success
+	# closes the circuit, failure reopens it for twice as long.
+	def __init__(
+		self,
+		path: Optional[str] = None,
+		base_backoff_s: float = BASE_BACKOFF_S,
+		max_backoff_s: float = MAX_BACKOFF_S,
+		enforce: bool = True,
+	) -> None:
+		# enforce=False keeps recording but lets every request through
+		self.path = path
+		self.base_backoff_s = base_backoff_s
+		self.max_backoff_s = max_backoff_s
+		self.enforce = enforce
+		self.hosts: Dict[str, HostRecord] = {}
+		self.stats = HealthStats()
+		self._alive: Set[str] = set()
+		self._lock = threading.Lock()
+		if path:
+			self._load()
+
+	def _load(self) -> None:
+		assert self.path is not None
+		try:
+			with open(self.path, "r", encoding="utf-8") as f:
+				data: Dict[str, Any] = json.load(f)
+		except (OSError, ValueError):
+			return
+		for host, rec in (data.get("hosts") or {}).items():
+			try:
+				self.hosts[host] = HostRecord(**rec)
+			except TypeError:
+				continue
+
+	def save(self) -> None:
+		if not self.path:
+			return
+		with self._lock:
+			data = {"hosts": {host: asdict(rec) for host, rec in self.hosts.items()}}
+		tmp_path = self.path + ".tmp"
+		with open(tmp_path, "w", encoding="utf-8") as f:
+			json.dump(data, f, separators=(",", ":"))
+		os.replace(tmp_path, self.path)
+
+	def allow(self, host: str) -> bool:
+		if not host or not self.enforce:
+			return True
+		with self._lock:
+			rec = self.hosts.get(host)
+			if rec is None or time.time() >= rec.open_until:
+				return True
+			self.stats.skipped += 1
+			self.stats.saved_seconds += rec.failure_cost()
+			self.stats.skipped_hosts.add(host)
+			return False
+
+	def record_success(self, host: str, status: int) -> None:
+		if not host:
+			return
+		with self._lock:
+			self._alive.add(host)
+			rec = self.hosts.get(host)
+			if rec is None:
+				rec = self.hosts[host] = HostRecord()
+			elif rec.open_until:
+				self.stats.recovered += 1
+			rec.failures = 0
+			rec.open_until = 0.0
+			rec.last_error = ""
+			rec.last_status = status_class(status)
+			rec.checked_at = time.time()
+
+	def record_failure(self, host: str, kind: str, seconds: float, status: int = 0) -> None:
+		if not host:
+			return
+		with self._lock:
+			rec = self.hosts.setdefault(host, HostRecord())
+			now = time.time()
+			rec.failures += 1
+			rec.last_error = kind
+			rec.last_status = status_class(status)
+			rec.checked_at = now
+			rec.failed_requests += 1
+			rec.failed_seconds += seconds
+			if kind in SOFT_FAILURES and host in self._alive:
+				return
+			if rec.failures >= OPEN_AFTER.get(kind, 2):
+				steps = rec.failures - OPEN_AFTER.get(kind, 2)
+				backoff = min(self.max_backoff_s, self.base_backoff_s * (2 ** min(steps, 32)))
+				if rec.open_until <= now:
+					self.stats.opened += 1
+				rec.open_until = now + backoff
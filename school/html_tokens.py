@@ -0,0 +1,130 @@
+import html
+import re
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+# One alternation over everything that is not visible text: script and style
+# blocks, then any other tag. Splitting on it yields text and tag tokens in
+# document order in a single scan.
+TOKEN_RE = re.compile(r"(?is)(<script[^>]*>.*?</script>|<style[^>]*>.*?</style>|<[^>]+>)")
+SCRIPT_RE = re.compile(r"(?is)<script[^>]*>.*?</script>")
+STYLE_RE = re.compile(r"(?is)<style[^>]*>.*?</style>")
+TAG_RE = re.compile(r"(?is)<[^>]+>")
+ANCHOR_START_RE = re.compile(r"(?is)<a[^>]+href=\"([^\"]+)\"[^>]*>")
+ANCHOR_RE = re.compile(r"(?is)<a[^>]+href=\"([^\"]+)\"[^>]*>(.*?)</a>")
+
+ANCHOR_TEXT_CHARS = 120
+_HEADING_LEVELS = ("1", "2", "3", "4", "5", "6")
+
+
+@dataclass
+class ParsedPage:
+	# Visible text, <a href="..."> links as (href, lowercased anchor text) and
+	# <h1>-<h6> headings as (level, text), in document order
+	text: str
+	anchors: List[Tuple[str, str]] = field(default_factory=list)
+	headings: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def clean_text(text: str) -> str:
+	# Unescape entities and collapse whitespace (str.split() and \s agree on
+	# what whitespace is)
+	if "&" in text:
+		text = html.unescape(text)
+	return " ".join(text.split())
+
+
+def visible_text(html_text: str) -> str:
+	return clean_text(TOKEN_RE.sub(" ", html_text))
+
+
+def complete_prefix(html_text: str) -> str:
+	# The part of a truncated page that tokenizes exactly as it does in the
+	# whole page: drops a trailing unfinished tag and an unclosed script/style
+	low = html_text.lower()
+	cut = len(html_text)
+	lt = low.rfind("<")
+	if lt > low.rfind(">"):
+		cut = lt
+	for start, end in (("<script", "</script>"), ("<style", "</style>")):
+		i = low.rfind(start, 0, cut)
+		if i != -1 and low.rfind(end, 0, cut) < i:
+			cut = i
+	return html_text[:cut]
+
+
+def legacy_text(html_text: str) -> str:
+	# The original three sequential substitutions; used when one-pass tokenizing
+	# could differ (see parse_html)
+	html_text = SCRIPT_RE.sub(" ", html_text)
+	html_text = STYLE_RE.sub(" ", html_text)
+	return clean_text(TAG_RE.sub(" ", html_text))
+
+
+def _anchor(href: str, inner: str) -> Tuple[str, str]:
+	return href, inner[:ANCHOR_TEXT_CHARS].lower()
+
+
+def parse_html(html_text: str) -> ParsedPage:
+	# Text and tags come from one split, and the tag tokens are walked once to
+	# pair up <a href="...">...</a> and <hN>...</hN>. The result is the same as
+	# the old pipeline (sequential script/style/tag substitutions for the text,
+	# ANCHOR_RE over the raw HTML for links). The only places where one pass can
+	# disagree with it are markup hidden inside another token: a tag whose body
+	# holds another "<" (unclosed "<", comments containing tags) or a script/style
+	# block mentioning <a>. Those are detected and the affected part is redone
+	# the old way.
+	parts = TOKEN_RE.split(html_text)
+	texts = parts[0::2]
+	tags = parts[1::2]
+	anchors: List[Tuple[str, str]] = []
+	headings: List[Tuple[int, str]] = []
+	exact_text = True
+	exact_anchors = True
+
+	href = None
+	a_from = 0
+	level = None
+	h_from = 0
+	for i, tag in enumerate(tags):
+		if tag.find("<", 1) != -1:
+			low = tag.lower()
+			if "<a" in low or "</a" in low:
+				exact_anchors = False
+			if low.startswith("<script") and low.endswith("</script>"):
+				pass
+			elif low.startswith("<style") and low.endswith("</style>"):
+				# Scripts were removed before styles, possibly cutting this block short
+				if "<script" in low:
+					exact_text = False
+			elif "<script" in low[1:] or "<style" in low[1:]:
+				# A plain tag swallowing a block the old passes would have removed first
+				exact_text = False
+			continue
+		c = tag[1]
+		if c == "/":
+			if href is not None and len(tag) == 4 and tag[2] in "aA":
+				anchors.append(_anchor(href, clean_text(" ".join(texts[a_from:i + 1]))))
+				href = None
+			elif level is not None and tag[2] in "hH" and tag[3:4] == level:
+				headings.append((int(level), clean_text(" ".join(texts[h_from:i + 1]))))
+				level = None
+		elif c in "aA":
+			if href is None:
+				m = ANCHOR_START_RE.match(tag)
+				if m:
+					href = m.group(1)
+					a_from = i + 1
+				elif 'href="' in tag.lower():
+					# e.g. a quoted ">" inside the href: the old regex reads past this token
+					exact_anchors = False
+		elif c in "hH":
+			if level is None and tag[2:3] in _HEADING_LEVELS and not tag[3:4].isalnum():
+				level = tag[2]
+				h_from = i + 1
+
+	text = clean_text(" ".join(texts)) if exact_text else legacy_text(html_text)
+	if not exact_anchors:
+		anchors = [_anchor(m.group(1), legacy_text(m.group(2))) for m in ANCHOR_RE.finditer(html_text)]
+	return ParsedPage(text=text, anchors=anchors, headings=headings)
@@ -0,0 +1,252 @@
+import http.client
+import ssl
+import string
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+	import brotli  # type: ignore
+except ImportError:  # optional: br is only advertised when it can be decoded
+	brotli = None
+
+
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+MAX_IDLE_PER_HOST = 4
+MAX_IDLE_TOTAL = 256
+IDLE_TIMEOUT_S = 30.0
+READ_CHUNK = 64 * 1024
+# A body abandoned part way is drained (to keep the connection) when at most
+# this much of it is left
+DRAIN_MAX = 64 * 1024
+
+HostKey = Tuple[str, str, int]
+
+
+@dataclass
+class PoolStats:
+	connections: int = 0
+	requests: int = 0
+	reused: int = 0
+	wire_bytes: int = 0
+	body_bytes: int = 0
+
+
+class _Decoder:
+	# Content-Encoding decoder fed raw chunks, returning decoded bytes
+	def __init__(self, encoding: str) -> None:
+		self.encoding = encoding
+		self._z: Optional["zlib._Decompress"] = None
+		self._br = None
+		if encoding in ("gzip", "x-gzip"):
+			self._z = zlib.decompressobj(16 + zlib.MAX_WBITS)
+		elif encoding == "deflate":
+			self._z = zlib.decompressobj()
+		elif encoding == "br":
+			if brotli is None:
+				raise ValueError("brotli-encoded response but brotli is not installed")
+			self._br = brotli.Decompressor()
+		elif encoding not in ("", "identity"):
+			raise ValueError(f"Unsupported Content-Encoding {encoding!r}")
+		self._first = True
+
+	def feed(self, data: bytes) -> bytes:
+		if self._br is not None:
+			return self._br.process(data)
+		if self._z is None:
+			return data
+		if self._first and self.encoding == "deflate":
+			self._first = False
+			# Servers disagree on whether deflate means zlib-wrapped or raw
+			try:
+				return self._z.decompress(data)
+			except zlib.error:
+				self._z = zlib.decompressobj(-zlib.MAX_WBITS)
+		self._first = False
+		return self._z.decompress(data)
+
+
+class PooledResponse:
+	# Final response after redirects. read() returns decoded body bytes; close()
+	# hands the connection back to the pool when the body was read to the end
+	# (or what is left of it is short enough to drain).
+	def __init__(self, pool: "ConnectionPool", key: HostKey, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse, url: str) -> None:
+		self._pool = pool
+		self._key = key
+		self._conn: Optional[http.client.HTTPConnection] = conn
+		self._resp = resp
+		self.url = url
+		self.status = resp.status
+		self.headers = resp.headers
+		self._pending = b""
+		try:
+			self._decoder = _Decoder((resp.headers.get("Content-Encoding") or "").strip().lower())
+		except ValueError:
+			self._conn = None
+			resp.close()
+			conn.close()
+			raise
+
+	def read(self, n: int = -1) -> bytes:
+		out = [self._pending]
+		size = len(self._pending)
+		self._pending = b""
+		while n < 0 or size < n:
+			raw = self._resp.read(READ_CHUNK)
+			if not raw:
+				break
+			self._pool.stats.wire_bytes += len(raw)
+			data = self._decoder.feed(raw)
+			out.append(data)
+			size += len(data)
+		data = b"".join(out)
+		if n >= 0 and len(data) > n:
+			data, self._pending = data[:n], data[n:]
+		self._pool.stats.body_bytes += len(data)
+		return data
+
+	def close(self) -> None:
+		conn, self._conn = self._conn, None
+		if conn is None:
+			return
+		if not self._resp.isclosed() and self._resp.length is not None and self._resp.length <= DRAIN_MAX:
+			# 204/304, empty bodies and short remainders: cheaper to read than
+			# to open a new connection
+			try:
+				left = self._resp.read()
+			except (OSError, http.client.HTTPException):
+				left = b""
+				self._resp.close()
+			self._pool.stats.wire_bytes += len(left)
+		if self._resp.isclosed() and not self._resp.will_close:
+			self._pool.release(self._key, conn)
+		else:
+			self._resp.close()
+			conn.close()
+
+	def __enter__(self) -> "PooledResponse":
+		return self
+
+	def __exit__(self, *exc: object) -> None:
+		self.close()
+
+
+class ConnectionPool:
+	# Keep-alive HTTP/1.1 connections per (scheme, host, port), shared by every
+	# thread. Idle connections are capped per host and overall and dropped after
+	# IDLE_TIMEOUT_S; a request on a reused connection that the server has
+	# already closed is retried once on a fresh one.
+	def __init__(
+		self,
+		timeout: float = 15.0,
+		max_idle_per_host: int = MAX_IDLE_PER_HOST,
+		max_idle_total: int = MAX_IDLE_TOTAL,
+		idle_timeout_s: float = IDLE_TIMEOUT_S,
+	) -> None:
+		self.timeout = timeout
+		self.max_idle_per_host = max_idle_per_host
+		self.max_idle_total = max_idle_total
+		self.idle_timeout_s = idle_timeout_s
+		self.stats = PoolStats()
+		self._idle: "OrderedDict[HostKey, List[Tuple[float, http.client.HTTPConnection]]]" = OrderedDict()
+		self._idle_count = 0
+		self._lock = threading.Lock()
+		self._ssl = ssl.create_default_context()
+
+	def _acquire(self, key: HostKey) -> Tuple[http.client.HTTPConnection, bool]:
+		now = time.monotonic()
+		with self._lock:
+			conns = self._idle.get(key)
+			while conns:
+				used, conn = conns.pop()
+				self._idle_count -= 1
+				if not conns:
+					del self._idle[key]
+				if now - used < self.idle_timeout_s:
+					self.stats.reused += 1
+					return conn, True
+				conn.close()
+			self.stats.connections += 1
+		scheme, host, port = key
+		if scheme == "https":
+			return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl), False
+		return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+	def release(self, key: HostKey, conn: http.client.HTTPConnection) -> None:
+		drop: List[http.client.HTTPConnection] = []
+		with self._lock:
+			conns = self._idle.setdefault(key, [])
+			self._idle.move_to_end(key)
+			conns.append((time.monotonic(), conn))
+			self._idle_count += 1
+			if len(conns) > self.max_idle_per_host:
+				drop.append(conns.pop(0)[1])
+				self._idle_count -= 1
+			while self._idle_count > self.max_idle_total:
+				old_key, old = next(iter(self._idle.items()))
+				drop.append(old.pop(0)[1])
+				self._idle_count -= 1
+				if not old:
+					del self._idle[old_key]
+		for c in drop:
+			c.close()
+
+	def close(self) -> None:
+		with self._lock:
+			idle, self._idle, self._idle_count = self._idle, OrderedDict(), 0
+		for conns in idle.values():
+			for _used, c in conns:
+				c.close()
+
+	def _request(self, key: HostKey, target: str, headers: Dict[str, str]) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+		while True:
+			conn, reused = self._acquire(key)
+			try:
+				conn.request("GET", target, headers=headers)
+				resp = conn.getresponse()
+			except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest):
+				conn.close()
+				if reused:
+					continue
+				raise
+			except BaseException:
+				conn.close()
+				raise
+			self.stats.requests += 1
+			return conn, resp
+
+	def open(self, url: str, headers: Optional[Dict[str, str]] = None, max_redirects: int = MAX_REDIRECTS) -> PooledResponse:
+		# GET `url`, following redirects like urllib.request.urlopen
+		hdrs = {"Accept-Encoding": ACCEPT_ENCODING}
+		hdrs.update(headers or {})
+		for _ in range(max_redirects + 1):
+			parts = urllib.parse.urlsplit(url)
+			scheme = parts.scheme.lower()
+			if scheme not in ("http", "https") or not parts.hostname:
+				raise ValueError(f"Unsupported URL {url!r}")
+			key = (scheme, parts.hostname.lower(), parts.port or (443 if scheme == "https" else 80))
+			target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+			conn, resp = self._request(key, target, hdrs)
+			location = resp.getheader("Location")
+			if resp.status in REDIRECT_CODES and location:
+				# Drain the (small) redirect body so the connection can be reused
+				pooled = PooledResponse(self, key, conn, resp, url)
+				try:
+					pooled.read(READ_CHUNK)
+				except Exception:  # noqa: BLE001
+					pass
+				pooled.close()
+				# Same normalization as urllib's HTTPRedirectHandler
+				target_parts = list(urllib.parse.urlparse(urllib.parse.urljoin(url, location.strip())))
+				if not target_parts[2] and target_parts[1]:
+					target_parts[2] = "/"
+				url = urllib.parse.quote(urllib.parse.urlunparse(target_parts), encoding="iso-8859-1", safe=string.punctuation)
+				continue
+			return PooledResponse(self, key, conn, resp, url)
+		raise http.client.HTTPException(f"Too many redirects for {url}")
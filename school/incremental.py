@@ -0,0 +1,88 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+
+# Per-city bookkeeping for incremental refreshes: the Overpass data timestamp
+# (osm3s.timestamp_osm_base) of the last successful fetch, keyed by CityConfig.key
+STATE_PATH = "fetch_state.json"
+
+
+def load_state(path: str = STATE_PATH) -> Dict[str, Dict[str, Any]]:
+	if not os.path.isfile(path):
+		return {}
+	try:
+		with open(path, "r", encoding="utf-8") as f:
+			data = json.load(f)
+	except (OSError, ValueError):
+		return {}
+	return data if isinstance(data, dict) else {}
+
+
+def save_state(state: Dict[str, Dict[str, Any]], path: str = STATE_PATH) -> None:
+	tmp_path = path + ".tmp"
+	with open(tmp_path, "w", encoding="utf-8") as f:
+		json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+	os.replace(tmp_path, path)
+
+
+def data_timestamp(meta: Dict[str, Any]) -> Optional[str]:
+	osm3s = meta.get("osm3s")
+	if isinstance(osm3s, dict) and osm3s.get("timestamp_osm_base"):
+		return str(osm3s["timestamp_osm_base"])
+	return None
+
+
+def element_url(el: Dict[str, Any]) -> str:
+	# Same identity as the osm_url column written by to_school_row
+	etype = el.get("type", "")
+	eid = el.get("id")
+	return f"https://www.openstreetmap.org/{etype}/{eid}" if etype and eid is not None else ""
+
+
+def load_rows(path: str) -> Optional[List[Dict[str, Any]]]:
+	if not os.path.isfile(path):
+		return None
+	try:
+		with open(path, "r", encoding="utf-8") as f:
+			rows = json.load(f)
+	except (OSError, ValueError):
+		return None
+	return rows if isinstance(rows, list) else None
+
+
+@dataclass
+class MergeResult:
+	rows: List[Dict[str, Any]]
+	added: int = 0
+	updated: int = 0
+	removed: int = 0
+
+
+def merge_rows(existing: List[Dict[str, Any]], changed: List[Dict[str, Any]], alive: Set[str]) -> MergeResult:
+	# Apply a change set to the previous rows, matching on osm_url (OSM type and id).
+	# Rows whose object is no longer a school in the area are dropped, changed
+	# objects replace their old row (or drop it if they lost their name), and new
+	# named objects are added.
+	by_url: Dict[str, Dict[str, Any]] = {}
+	for row in existing:
+		url = row.get("osm_url") or ""
+		if url and url in alive:
+			by_url[url] = row
+	result = MergeResult(rows=[], removed=len(existing) - len(by_url))
+	for row in changed:
+		url = row.get("osm_url") or ""
+		if not url:
+			continue
+		if not row.get("name"):
+			if by_url.pop(url, None) is not None:
+				result.removed += 1
+			continue
+		if url in by_url:
+			result.updated += 1
+		else:
+			result.added += 1
+		by_url[url] = row
+	result.rows = sorted(by_url.values(), key=lambda r: (r.get("name") or "").lower())
+	return result
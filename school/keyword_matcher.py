@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+def _plan(keywords: Iterable[str]) -> Tuple[str, ...]:
+	# Lowercased, deduplicated keywords, dropping any keyword that starts with
+	# another one of the group: wherever "fees" occurs, "fee" occurs at the same
+	# index, so "fees" can never be the first hit
+	kws: List[str] = []
+	for kw in keywords:
+		kw = kw.lower()
+		if kw and kw not in kws:
+			kws.append(kw)
+	return tuple(k for k in kws if not any(k != j and k.startswith(j) for j in kws))
+
+
+def first_index(text_l: str, keywords: Iterable[str]) -> int:
+	# Lowest index in text_l at which any keyword starts, or -1. Once a hit is
+	# known, the remaining keywords are only searched in front of it.
+	best = -1
+	for kw in keywords:
+		if best == -1:
+			idx = text_l.find(kw)
+		else:
+			idx = text_l.find(kw, 0, best + len(kw) - 1)
+		if idx != -1:
+			best = idx
+	return best
+
+
+class KeywordMatcher:
+	# Keyword groups (e.g. SECTION_KEYWORDS columns) compiled once, then matched
+	# against an already-lowercased text: the first hit of every group, or just
+	# which groups occur. Scanning is left to str.find, which runs in C; the
+	# plan keeps the number of scans and their length down.
+	def __init__(self, groups: Mapping[str, Iterable[str]]) -> None:
+		self.groups: Dict[str, Tuple[str, ...]] = {name: _plan(kws) for name, kws in groups.items()}
+
+	def first_hits(self, text_l: str, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+		hits: Dict[str, int] = {}
+		for name in self.groups if names is None else names:
+			idx = first_index(text_l, self.groups[name])
+			if idx != -1:
+				hits[name] = idx
+		return hits
+
+	def present(self, text_l: str, names: Optional[Iterable[str]] = None) -> Set[str]:
+		return {name for name in (self.groups if names is None else names) if any(kw in text_l for kw in self.groups[name])}
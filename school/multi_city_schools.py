@@ -1,10 +1,19 @@
-import csv
-import json
+import argparse
 import sys
+import threading
 import time
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple, TypeVar
+
+from overpass_cache import CACHE_DIR, ResponseCache, add_cache_args, cache_from_args, is_error_remark
+from city_locator import CityLocator, element_rings
+from incremental import STATE_PATH, data_timestamp, element_url, load_rows, load_state, merge_rows, save_state
+from overpass_mirrors import HEDGE_DELAY_S, MirrorHealth, hedged_fetch
+from overpass_query import OUTPUT_MODES, SCHOOL_ROW_TAGS, normalize_element, output_block
+from overpass_stream import http_post_stream, iter_elements, stream_rows
+from school_rows import to_school_row
+from school_table import SchoolTable
 
 
 # Reuse a pool of Overpass endpoints for resiliency
@@ -15,6 +24,17 @@ OVERPASS_ENDPOINTS = [
 	"https://overpass.openstreetmap.ru/api/interpreter",
 ]
 
+# Latency/health score per mirror, shared by every fetch in this process
+MIRROR_HEALTH = MirrorHealth(OVERPASS_ENDPOINTS)
+
+# City boundaries are cached for a month; derived marker elements of this type
+# separate the cities in the boundary response
+BOUNDARY_TTL_S = 30 * 24 * 3600
+BOUNDARY_MARKER = "city_marker"
+
+
+T = TypeVar("T")
+
 
 @dataclass
 class CityConfig:
@@ -24,6 +44,20 @@ class CityConfig:
 	wikidata_ids: List[str]
 
 
+@dataclass
+class FetchOptions:
+	# Query output mode and optional tag whitelist (see overpass_query)
+	mode: str = "center"
+	tags: Optional[List[str]] = None
+	# Race mirrors, adding a backup after this many seconds without a first
+	# byte; None keeps plain sequential failover
+	hedge_delay_s: Optional[float] = None
+	# Raw response cache; None always downloads
+	cache: Optional[ResponseCache] = None
+	# Only download schools changed since the last recorded fetch of each city
+	incremental: bool = False
+
+
 DEFAULT_CITIES: List[CityConfig] = [
 	CityConfig(
 		key="mumbai",
@@ -82,31 +116,146 @@ DEFAULT_CITIES: List[CityConfig] = [
 ]
 
 
-def http_post_raw(url: str, body: str, timeout: int = 240) -> Tuple[int, str]:
-	data = body.encode("utf-8")
-	req = urllib.request.Request(url, data=data)
-	req.add_header("Content-Type", "text/plain; charset=utf-8")
-	with urllib.request.urlopen(req, timeout=timeout) as resp:
-		status = resp.getcode()
-		text = resp.read().decode("utf-8", errors="replace")
-		return status, text
-
-
-def fetch_overpass_json(query: str) -> Dict[str, Any]:
+class EndpointPool:
+	# Hands out Overpass endpoints to concurrent fetches. Each endpoint serves at
+	# most `per_endpoint_limit` requests at a time, and request starts across all
+	# endpoints are spaced by at least `min_interval_s` (shared politeness budget).
+	def __init__(self, endpoints: Iterable[str], per_endpoint_limit: int = 1, min_interval_s: float = 1.0) -> None:
+		self.endpoints = list(endpoints)
+		self.per_endpoint_limit = max(1, per_endpoint_limit)
+		self.min_interval_s = max(0.0, min_interval_s)
+		self._in_flight: Dict[str, int] = {e: 0 for e in self.endpoints}
+		self._cond = threading.Condition()
+		self._next_start = 0.0
+
+	@property
+	def capacity(self) -> int:
+		return len(self.endpoints) * self.per_endpoint_limit
+
+	def acquire(self, exclude: Iterable[str] = (), order: Optional[List[str]] = None) -> str:
+		excluded = set(exclude)
+		preferred = [e for e in (order or []) if e in self._in_flight]
+		preferred += [e for e in self.endpoints if e not in preferred]
+		candidates = [e for e in preferred if e not in excluded] or preferred
+		return self._claim(candidates)
+
+	def acquire_endpoint(self, endpoint: str) -> None:
+		self._claim([endpoint])
+
+	def _claim(self, candidates: List[str]) -> str:
+		with self._cond:
+			while True:
+				free = [e for e in candidates if self._in_flight[e] < self.per_endpoint_limit]
+				if free:
+					# Least loaded first; ties keep the preference order
+					endpoint = min(free, key=lambda e: self._in_flight[e])
+					self._in_flight[endpoint] += 1
+					break
+				self._cond.wait()
+			now = time.monotonic()
+			start_at = max(now, self._next_start)
+			self._next_start = start_at + self.min_interval_s
+		if start_at > now:
+			time.sleep(start_at - now)
+		return endpoint
+
+	def release(self, endpoint: str) -> None:
+		with self._cond:
+			self._in_flight[endpoint] -= 1
+			self._cond.notify_all()
+
+
+def _with_failover(attempt: Callable[[str], T], pool: Optional[EndpointPool] = None) -> T:
+	# Run `attempt(endpoint)` against the Overpass endpoints until one succeeds
 	last_err: Optional[Exception] = None
-	for idx, endpoint in enumerate(OVERPASS_ENDPOINTS):
-		try:
-			status, text = http_post_raw(endpoint, query, timeout=240)
-			if status == 200:
-				return json.loads(text)
-			else:
-				last_err = RuntimeError(f"HTTP {status} from {endpoint}")
-		except Exception as e:  # noqa: BLE001
-			last_err = e
+	if pool is None:
+		for idx, endpoint in enumerate(OVERPASS_ENDPOINTS):
+			try:
+				result = attempt(endpoint)
+				MIRROR_HEALTH.record_success(endpoint)
+				return result
+			except Exception as e:  # noqa: BLE001
+				MIRROR_HEALTH.record_failure(endpoint)
+				last_err = e
+				time.sleep(1.5 * (idx + 1))
+	else:
+		tried: List[str] = []
+		for idx in range(len(pool.endpoints)):
+			endpoint = pool.acquire(exclude=tried, order=MIRROR_HEALTH.ranked())
+			tried.append(endpoint)
+			try:
+				result = attempt(endpoint)
+				MIRROR_HEALTH.record_success(endpoint)
+				return result
+			except Exception as e:  # noqa: BLE001
+				MIRROR_HEALTH.record_failure(endpoint)
+				last_err = e
+			finally:
+				pool.release(endpoint)
 			time.sleep(1.5 * (idx + 1))
-	if last_err:
-		raise last_err
-	return {}
+	raise last_err or RuntimeError("No Overpass endpoints configured")
+
+
+def fetch_overpass_stream(
+	query: str,
+	consume: Callable[[BinaryIO], T],
+	pool: Optional[EndpointPool] = None,
+	hedge_delay_s: Optional[float] = None,
+) -> T:
+	# Hand the raw response body to `consume` as a stream, with failover (or
+	# hedging across mirrors when `hedge_delay_s` is set)
+	if hedge_delay_s is not None:
+		return hedged_fetch(
+			query,
+			consume,
+			MIRROR_HEALTH,
+			hedge_delay_s=hedge_delay_s,
+			acquire=pool.acquire_endpoint if pool is not None else None,
+			release=pool.release if pool is not None else None,
+		)
+
+	def attempt(endpoint: str) -> T:
+		with http_post_stream(endpoint, query, timeout=240) as resp:
+			status = resp.getcode()
+			if status != 200:
+				raise RuntimeError(f"HTTP {status} from {endpoint}")
+			return consume(resp)
+
+	return _with_failover(attempt, pool)
+
+
+def check_complete(meta: Mapping[str, Any]) -> None:
+	# A response the server cut short lists only part of the area; merging or
+	# writing it would drop every school it did not get to
+	remark = meta.get("remark")
+	if isinstance(remark, str) and is_error_remark(remark):
+		raise RuntimeError(f"Overpass response incomplete: {remark}")
+
+
+def fetch_overpass_rows(
+	query: str,
+	to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+	pool: Optional[EndpointPool] = None,
+	hedge_delay_s: Optional[float] = None,
+	cache: Optional[ResponseCache] = None,
+	meta: Optional[Dict[str, Any]] = None,
+) -> Tuple[SchoolTable, int]:
+	# Elements are parsed off the socket (or the cache file) and turned into
+	# rows one at a time, so the raw body is never held. Top-level response keys are stored in `meta`.
+	meta = {} if meta is None else meta
+
+	def consume(fp: BinaryIO) -> Tuple[SchoolTable, int]:
+		return stream_rows(fp, to_row, meta=meta, into=SchoolTable())
+
+	def fetch_live(c: Callable[[BinaryIO], Tuple[SchoolTable, int]]) -> Tuple[SchoolTable, int]:
+		return fetch_overpass_stream(query, c, pool=pool, hedge_delay_s=hedge_delay_s)
+
+	if cache is not None:
+		result = cache.fetch(query, consume, fetch_live)
+	else:
+		result = fetch_live(consume)
+	check_complete(meta)
+	return result
 
 
 def to_regex_union(parts: Iterable[str]) -> str:
@@ -121,7 +270,7 @@ def urllib_safe_regex(s: str) -> str:
 	return s.replace('"', '\\"')
 
 
-def build_query_for_city(cfg: CityConfig) -> str:
+def _area_lines(cfg: CityConfig) -> List[str]:
 	name_union = to_regex_union(cfg.name_patterns)
 	extra_union = to_regex_union(cfg.extra_area_patterns)
 	wikidata_union = to_regex_union(cfg.wikidata_ids)
@@ -133,10 +282,60 @@ def build_query_for_city(cfg: CityConfig) -> str:
 		areas.append(f"  area[\"boundary\"=\"administrative\"][\"name\"~\"^({extra_union})$\",i];\n")
 	if wikidata_union:
 		areas.append(f"  area[\"wikidata\"~\"^({wikidata_union})$\"];\n")
+	return areas
+
+
+def _area_block(cfg: CityConfig) -> str:
+	areas = _area_lines(cfg)
 	area_block = "".join(areas) if areas else "  /* no explicit areas; rely on name match */\n"
+	return (
+		"(\n"
+		f"{area_block}"
+		")->.a;\n"
+	)
+
+
+def build_query_for_city(cfg: CityConfig, mode: str = "center", tags: Optional[Iterable[str]] = None) -> str:
+	return (
+		"[out:json][timeout:240];\n"
+		f"{_area_block(cfg)}"
+		"(\n"
+		"  node[\"amenity\"=\"school\"](area.a);\n"
+		"  way[\"amenity\"=\"school\"](area.a);\n"
+		"  relation[\"amenity\"=\"school\"](area.a);\n"
+		");\n"
+		f"{output_block(mode, tags)}"
+	)
+
 
+def build_changes_query_for_city(
+	cfg: CityConfig,
+	since: str,
+	mode: str = "center",
+	tags: Optional[Iterable[str]] = None,
+) -> str:
+	# Full output only for schools edited after `since`; every other school in the
+	# area is listed by id alone so deletions and lost tags can be detected.
 	return (
 		"[out:json][timeout:240];\n"
+		f"{_area_block(cfg)}"
+		"(\n"
+		"  node[\"amenity\"=\"school\"](area.a);\n"
+		"  way[\"amenity\"=\"school\"](area.a);\n"
+		"  relation[\"amenity\"=\"school\"](area.a);\n"
+		")->.all;\n"
+		f"nwr.all(newer:\"{urllib_safe_regex(since)}\");\n"
+		f"{output_block(mode, tags)}"
+		".all out ids;\n"
+	)
+
+
+def build_batch_query(cities: List[CityConfig], mode: str = "center", tags: Optional[Iterable[str]] = None) -> str:
+	# One request for several cities: the union of all their areas is resolved
+	# once and each school is assigned to its city locally (see CityLocator).
+	area_block = "".join(line for cfg in cities for line in _area_lines(cfg))
+	return (
+		"[out:json][timeout:900];\n"
 		"(\n"
 		f"{area_block}"
 		")->.a;\n"
@@ -145,159 +344,331 @@ def build_query_for_city(cfg: CityConfig) -> str:
 		"  way[\"amenity\"=\"school\"](area.a);\n"
 		"  relation[\"amenity\"=\"school\"](area.a);\n"
 		");\n"
-		"out center tags;\n"
-		">;\n"
-		"out skel qt;\n"
+		f"{output_block(mode, tags)}"
 	)
 
 
-def _first_nonempty(*values: Optional[str]) -> str:
-	for v in values:
-		if v and str(v).strip():
-			return str(v).strip()
-	return ""
-
-
-def _join_semicolon(values: List[str]) -> str:
-	parts: List[str] = []
-	for v in values:
-		if not v:
-			continue
-		for p in str(v).replace(" ", "").split(";"):
-			if p and p not in parts:
-				parts.append(p)
-	return ", ".join(parts)
-
-
-def to_school_row(el: Dict[str, Any]) -> Dict[str, Any]:
-	etype = el.get("type", "")
-	eid = el.get("id")
-	tags: Dict[str, str] = el.get("tags", {}) or {}
-	name = tags.get("name", "")
-
-	lat: Optional[float] = None
-	lon: Optional[float] = None
-	if "lat" in el and "lon" in el:
-		lat = float(el["lat"])  # node
-		lon = float(el["lon"])
-	elif "center" in el and isinstance(el["center"], dict):
-		lat = float(el["center"].get("lat"))
-		lon = float(el["center"].get("lon"))
-
-	housenumber = tags.get("addr:housenumber", "")
-	street = tags.get("addr:street", "")
-	suburb = _first_nonempty(tags.get("addr:suburb"), tags.get("addr:neighbourhood"), tags.get("addr:locality"))
-	city = _first_nonempty(tags.get("addr:city"), tags.get("is_in:city"))
-	state = tags.get("addr:state", "")
-	postcode = tags.get("addr:postcode", "")
-	addr_parts = [
-		" ".join([p for p in [housenumber, street] if p]).strip(),
-		suburb,
-		city,
-		state,
-		postcode,
-	]
-	address = ", ".join([p for p in addr_parts if p])
-
-	phone = _join_semicolon([
-		tags.get("contact:phone", ""),
-		tags.get("contact:mobile", ""),
-		tags.get("phone", ""),
-	])
-	website = _first_nonempty(tags.get("contact:website"), tags.get("website"), tags.get("url"))
-	operator = tags.get("operator", "")
-	operator_type = tags.get("operator:type", "")
-	board = _first_nonempty(tags.get("education:board"), tags.get("board"))
-	levels = _first_nonempty(tags.get("isced:level"), tags.get("grades"), tags.get("level"))
-	gender = _first_nonempty(tags.get("school:gender"), tags.get("gender"))
-	religion = tags.get("religion", "")
-	language = _first_nonempty(tags.get("language"), tags.get("medium"), tags.get("medium_of_instruction"))
-
-	osm_url = f"https://www.openstreetmap.org/{etype}/{eid}" if etype and eid is not None else ""
-
-	return {
-		"name": name,
-		"address": address,
-		"phone": phone,
-		"website": website,
-		"operator": operator,
-		"operator_type": operator_type,
-		"board": board,
-		"levels": levels,
-		"gender": gender,
-		"religion": religion,
-		"language": language,
-		"lat": lat,
-		"lon": lon,
-		"osm_url": osm_url,
-	}
-
-
-def write_csv(path: str, rows: List[Dict[str, Any]]) -> None:
-	fieldnames = [
-		"name",
-		"address",
-		"phone",
-		"website",
-		"operator",
-		"operator_type",
-		"board",
-		"levels",
-		"gender",
-		"religion",
-		"language",
-		"lat",
-		"lon",
-		"osm_url",
-	]
-	with open(path, "w", encoding="utf-8-sig", newline="") as f:
-		w = csv.DictWriter(f, fieldnames=fieldnames)
-		w.writeheader()
-		for r in rows:
-			w.writerow({k: ("" if r.get(k) is None else r.get(k)) for k in fieldnames})
-
-
-def fetch_city(cfg: CityConfig) -> Tuple[List[Dict[str, Any]], int]:
-	query = build_query_for_city(cfg)
-	resp = fetch_overpass_json(query)
-	elements = resp.get("elements", []) if isinstance(resp, dict) else []
-	rows: List[Dict[str, Any]] = []
-	for el in elements:
-		if not isinstance(el, dict):
-			continue
-		row = to_school_row(el)
-		if not row.get("name"):
-			continue
-		rows.append(row)
-	rows.sort(key=lambda r: (r.get("name") or "").lower())
-	return rows, len(elements)
+def build_boundary_query(cities: List[CityConfig]) -> str:
+	# Boundary geometry of every area matched by each city. A derived marker
+	# element precedes each city's boundaries so the stream can be split by city.
+	parts = ["[out:json][timeout:240];\n"]
+	for cfg in cities:
+		parts.append(_area_block(cfg))
+		parts.append(f"make {BOUNDARY_MARKER} city=\"{urllib_safe_regex(cfg.key)}\";\nout;\n")
+		parts.append("(\n  way(pivot.a);\n  rel(pivot.a);\n);\nout geom;\n")
+	return "".join(parts)
+
+
+def fetch_boundaries(
+	cities: List[CityConfig],
+	pool: Optional[EndpointPool] = None,
+	options: Optional[FetchOptions] = None,
+) -> CityLocator:
+	# Boundaries rarely change, so they always go through the response cache
+	# with a long TTL, even when school responses are not cached.
+	opts = options or FetchOptions()
+	cache = ResponseCache(
+		directory=opts.cache.directory if opts.cache else CACHE_DIR,
+		ttl_s=BOUNDARY_TTL_S,
+		offline=opts.cache.offline if opts.cache else False,
+		refresh=opts.cache.refresh if opts.cache else False,
+	)
+	query = build_boundary_query(cities)
+
+	def consume(fp: BinaryIO) -> Dict[str, List[Any]]:
+		rings: Dict[str, List[Any]] = {}
+		current = ""
+		for el in iter_elements(fp):
+			if el.get("type") == BOUNDARY_MARKER:
+				current = (el.get("tags") or {}).get("city", "")
+			elif current:
+				rings.setdefault(current, []).append(element_rings(el))
+		return rings
+
+	def fetch_live(c: Callable[[BinaryIO], Dict[str, List[Any]]]) -> Dict[str, List[Any]]:
+		return fetch_overpass_stream(query, c, pool=pool, hedge_delay_s=opts.hedge_delay_s)
+
+	locator = CityLocator()
+	for key, rings_per_element in cache.fetch(query, consume, fetch_live).items():
+		locator.add(key, rings_per_element)
+	return locator
+
+
+def fetch_city(
+	cfg: CityConfig,
+	pool: Optional[EndpointPool] = None,
+	options: Optional[FetchOptions] = None,
+	meta: Optional[Dict[str, Any]] = None,
+) -> Tuple[SchoolTable, int]:
+	opts = options or FetchOptions()
+	query = build_query_for_city(cfg, opts.mode, opts.tags)
+	rows, raw_count = fetch_overpass_rows(
+		query,
+		lambda el: to_school_row(normalize_element(el)),
+		pool=pool,
+		hedge_delay_s=opts.hedge_delay_s,
+		cache=opts.cache,
+		meta=meta,
+	)
+	return rows.sorted_by_name(), raw_count
+
+
+def fetch_city_changes(
+	cfg: CityConfig,
+	since: str,
+	pool: Optional[EndpointPool] = None,
+	options: Optional[FetchOptions] = None,
+	meta: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Set[str], int]:
+	# Rows for schools changed since `since` (named or not, so renames to empty can
+	# be applied) plus the osm_url of every school currently in the area.
+	# Never cached: the query text changes with every timestamp.
+	opts = options or FetchOptions()
+	query = build_changes_query_for_city(cfg, since, opts.mode, opts.tags)
+	meta = {} if meta is None else meta
+
+	def consume(fp: BinaryIO) -> Tuple[List[Dict[str, Any]], Set[str], int]:
+		changed: List[Dict[str, Any]] = []
+		alive: Set[str] = set()
+		count = 0
+		for el in iter_elements(fp, meta=meta):
+			count += 1
+			if el.get("tags"):
+				changed.append(to_school_row(normalize_element(el)))
+			else:
+				alive.add(element_url(el))
+		return changed, alive, count
+
+	result = fetch_overpass_stream(query, consume, pool=pool, hedge_delay_s=opts.hedge_delay_s)
+	# A cut-short `alive` set would delete every school after the cut
+	check_complete(meta)
+	return result
+
+
+def fetch_cities_batched(
+	cities: List[CityConfig],
+	locator: CityLocator,
+	pool: Optional[EndpointPool] = None,
+	options: Optional[FetchOptions] = None,
+	meta: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, SchoolTable], int, int]:
+	# Fetch all schools for `cities` in one request and split them by boundary.
+	# A school inside overlapping boundaries is listed under each city, as the
+	# per-city queries would. Returns rows per city key, raw element count and
+	# the number of named schools that fell outside every boundary.
+	opts = options or FetchOptions()
+	query = build_batch_query(cities, opts.mode, opts.tags)
+	rows, raw_count = fetch_overpass_rows(
+		query,
+		lambda el: to_school_row(normalize_element(el)),
+		pool=pool,
+		hedge_delay_s=opts.hedge_delay_s,
+		cache=opts.cache,
+		meta=meta,
+	)
+	indices: Dict[str, List[int]] = {cfg.key: [] for cfg in cities}
+	unassigned = 0
+	lats = rows.column("lat")
+	lons = rows.column("lon")
+	for i in range(len(rows)):
+		lat, lon = lats[i], lons[i]
+		keys = locator.locate(lat, lon) if lat == lat and lon == lon else []
+		keys = [k for k in keys if k in indices]
+		if not keys:
+			unassigned += 1
+		for k in keys:
+			indices[k].append(i)
+	by_city = {k: rows.take(idx).sorted_by_name() for k, idx in indices.items()}
+	return by_city, raw_count, unassigned
+
+
+@dataclass
+class CityResult:
+	key: str
+	rows: int = 0
+	raw_elements: int = 0
+	seconds: float = 0.0
+	error: str = ""
+	note: str = ""
+	# Overpass data timestamp of the response, recorded for incremental runs
+	osm_base: str = ""
+
+
+def write_city_outputs(cfg: CityConfig, rows: Iterable[Mapping]) -> str:
+	table = rows if isinstance(rows, SchoolTable) else SchoolTable.from_rows(rows)
+	json_path = f"{cfg.key}_schools.json"
+	table.write_json(json_path)
+	csv_path = f"{cfg.key}_schools.csv"
+	table.write_csv(csv_path)
+	return csv_path
+
+
+def run_city(
+	cfg: CityConfig,
+	pool: EndpointPool,
+	options: Optional[FetchOptions] = None,
+	since: Optional[str] = None,
+) -> CityResult:
+	result = CityResult(key=cfg.key)
+	started = time.monotonic()
+	opts = options or FetchOptions()
+	meta: Dict[str, Any] = {}
+	try:
+		existing = load_rows(f"{cfg.key}_schools.json") if opts.incremental and since else None
+		if existing is not None and since:
+			print(f"Fetching {cfg.key} changes since {since}...", flush=True)
+			changed, alive, raw_count = fetch_city_changes(cfg, since, pool=pool, options=opts, meta=meta)
+			merged = merge_rows(existing, changed, alive)
+			rows = merged.rows
+			result.note = f"incremental +{merged.added} ~{merged.updated} -{merged.removed}"
+		else:
+			print(f"Fetching {cfg.key}...", flush=True)
+			rows, raw_count = fetch_city(cfg, pool=pool, options=opts, meta=meta)
+		csv_path = write_city_outputs(cfg, rows)
+		result.rows = len(rows)
+		result.raw_elements = raw_count
+		result.osm_base = data_timestamp(meta) or ""
+		note = f", {result.note}" if result.note else ""
+		print(f"{cfg.key}: wrote {len(rows)} rows (raw elements {raw_count}{note}) -> {csv_path}", flush=True)
+	except Exception as e:  # noqa: BLE001
+		result.error = str(e) or e.__class__.__name__
+		print(f"{cfg.key}: ERROR: {result.error}", flush=True)
+	result.seconds = time.monotonic() - started
+	return result
+
+
+def run_batched(cities: List[CityConfig], pool: EndpointPool, options: FetchOptions) -> Tuple[List[CityResult], Optional[CityResult]]:
+	# Cities without usable boundary geometry fall back to their own query.
+	# The shared request is reported once, as a "batch" result with its raw
+	# element count and time; each batched city lists the schools located in it.
+	started = time.monotonic()
+	print(f"Fetching boundaries for {len(cities)} cities...", flush=True)
+	locator = fetch_boundaries(cities, pool=pool, options=options)
+	boundary_seconds = time.monotonic() - started
+	located = [c for c in cities if c.key in locator.keys()]
+	fallback = [c for c in cities if c.key not in locator.keys()]
+	results: List[CityResult] = []
+	batch: Optional[CityResult] = None
+	if located:
+		print(f"Fetching schools for {', '.join(c.key for c in located)} in one request...", flush=True)
+		batch = CityResult(key="batch", note=f"{len(located)} cities, boundaries {boundary_seconds:.1f}s")
+		fetch_started = time.monotonic()
+		meta: Dict[str, Any] = {}
+		try:
+			by_city, raw_count, unassigned = fetch_cities_batched(located, locator, pool=pool, options=options, meta=meta)
+		except Exception as e:  # noqa: BLE001
+			err = str(e) or e.__class__.__name__
+			print(f"batch: ERROR: {err}", flush=True)
+			batch.error = err
+			results.extend(CityResult(key=c.key, error=err) for c in located)
+		else:
+			batch.raw_elements = raw_count
+			print(f"batch: {raw_count} raw elements for {len(located)} cities", flush=True)
+			if unassigned:
+				print(f"batch: {unassigned} schools fell outside every city boundary", flush=True)
+			for cfg in located:
+				rows = by_city[cfg.key]
+				csv_path = write_city_outputs(cfg, rows)
+				print(f"{cfg.key}: wrote {len(rows)} rows -> {csv_path}", flush=True)
+				results.append(CityResult(
+					key=cfg.key,
+					rows=len(rows),
+					raw_elements=len(rows),
+					note="batched",
+					osm_base=data_timestamp(meta) or "",
+				))
+				batch.rows += len(rows)
+		batch.seconds = time.monotonic() - fetch_started
+	for cfg in fallback:
+		print(f"{cfg.key}: no boundary geometry, fetching separately", flush=True)
+		results.append(run_city(cfg, pool, options))
+	return results, batch
+
+
+def print_timing_table(results: List[CityResult], wall_seconds: float) -> None:
+	width = max([len("city")] + [len(r.key) for r in results])
+	print()
+	print(f"{'city':<{width}}  {'rows':>6}  {'raw':>7}  {'seconds':>8}  status")
+	for r in results:
+		status = f"ERROR: {r.error}" if r.error else ("ok" + (f" ({r.note})" if r.note else ""))
+		print(f"{r.key:<{width}}  {r.rows:>6}  {r.raw_elements:>7}  {r.seconds:>8.1f}  {status}")
+	total = sum(r.seconds for r in results)
+	print(f"wall time {wall_seconds:.1f}s (sum of city times {total:.1f}s)")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Fetch schools for Indian cities from Overpass.")
+	parser.add_argument("cities", nargs="?", default="", help="comma-separated city keys (default: all)")
+	parser.add_argument("--per-endpoint", type=int, default=1, help="max concurrent requests per Overpass endpoint")
+	parser.add_argument("--min-interval", type=float, default=1.0, help="min seconds between request starts across all endpoints")
+	parser.add_argument("--query-mode", choices=OUTPUT_MODES, default="center", help="Overpass output mode")
+	parser.add_argument("--tag-whitelist", action="store_true", help="only download the tags used for the rows")
+	parser.add_argument(
+		"--hedge-delay",
+		type=float,
+		default=None,
+		metavar="S",
+		help=f"race mirrors, adding a backup after S seconds without a first byte (e.g. {HEDGE_DELAY_S:g})",
+	)
+	add_cache_args(parser)
+	parser.add_argument(
+		"--incremental",
+		action="store_true",
+		help=f"only fetch schools changed since the last run recorded in {STATE_PATH}",
+	)
+	parser.add_argument(
+		"--batched",
+		action="store_true",
+		help="fetch all cities in one request and assign schools to cities by boundary",
+	)
+	args = parser.parse_args(argv)
+	if args.batched and args.incremental:
+		parser.error("--batched and --incremental cannot be combined")
+	return args
 
 
 def main() -> int:
-	# Cities can be passed via argv as comma-separated keys; otherwise use defaults
-	arg_keys = []
-	if len(sys.argv) > 1:
-		arg_keys = [a.strip().lower() for a in sys.argv[1].split(",") if a.strip()]
+	args = parse_args(sys.argv[1:])
+	# Cities can be passed as comma-separated keys; otherwise use defaults
+	arg_keys = [a.strip().lower() for a in args.cities.split(",") if a.strip()]
 	cities = [c for c in DEFAULT_CITIES if not arg_keys or c.key in arg_keys]
 	if not cities:
 		print("No matching cities. Valid keys:", ", ".join([c.key for c in DEFAULT_CITIES]))
 		return 2
 
-	for idx, cfg in enumerate(cities):
-		try:
-			print(f"Fetching {cfg.key}...", flush=True)
-			rows, raw_count = fetch_city(cfg)
-			json_path = f"{cfg.key}_schools.json"
-			with open(json_path, "w", encoding="utf-8") as f:
-				json.dump(rows, f, ensure_ascii=False, indent=2)
-			csv_path = f"{cfg.key}_schools.csv"
-			write_csv(csv_path, rows)
-			print(f"{cfg.key}: wrote {len(rows)} rows (raw elements {raw_count}) -> {csv_path}")
-		except Exception as e:  # noqa: BLE001
-			print(f"{cfg.key}: ERROR: {e}")
-		# brief pause to be polite to Overpass
-		time.sleep(2.0 + 0.5 * idx)
-
+	pool = EndpointPool(OVERPASS_ENDPOINTS, per_endpoint_limit=args.per_endpoint, min_interval_s=args.min_interval)
+	options = FetchOptions(
+		mode=args.query_mode,
+		tags=SCHOOL_ROW_TAGS if args.tag_whitelist else None,
+		hedge_delay_s=args.hedge_delay,
+		cache=cache_from_args(args),
+		incremental=args.incremental,
+	)
+	state = load_state()
+	started = time.monotonic()
+	by_key: Dict[str, CityResult] = {}
+	batch: Optional[CityResult] = None
+	if args.batched:
+		results, batch = run_batched(cities, pool, options)
+		by_key = {r.key: r for r in results}
+	else:
+		with ThreadPoolExecutor(max_workers=min(len(cities), pool.capacity)) as ex:
+			futures = {}
+			for cfg in cities:
+				since = (state.get(cfg.key) or {}).get("osm_base") if args.incremental else None
+				futures[ex.submit(run_city, cfg, pool, options, since)] = cfg.key
+			for fut in as_completed(futures):
+				by_key[futures[fut]] = fut.result()
+
+	for r in by_key.values():
+		if not r.error and r.osm_base:
+			state[r.key] = {"osm_base": r.osm_base}
+	save_state(state)
+
+	table = [by_key[c.key] for c in cities]
+	if batch is not None:
+		table.append(batch)
+	print_timing_table(table, time.monotonic() - started)
 	return 0
 
 
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, BinaryIO, Callable, List, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+CACHE_DIR = ".overpass_cache"
+DEFAULT_TTL_S = 6 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# End of each response kept while storing it, where Overpass puts "remark"
+TAIL_BYTES = 8 * 1024
+
+_REMARK = re.compile(rb'"remark"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+class CacheMiss(LookupError):
+	pass
+
+
+def error_remark(tail: bytes) -> Optional[str]:
+	# The "remark" of a response cut short by the server ("runtime error: Query
+	# timed out ..."), found in the last bytes of the body
+	m = _REMARK.search(tail)
+	if not m:
+		return None
+	try:
+		remark = json.loads(m.group(1).decode("utf-8", "replace"))
+	except ValueError:
+		return None
+	return remark if is_error_remark(remark) else None
+
+
+def is_error_remark(remark: str) -> bool:
+	# Overpass reports a query stopped midway (timeout, out of memory) as a
+	# "runtime error" remark after whatever elements it had already sent
+	lowered = remark.lower()
+	return "error" in lowered or "timeout" in lowered or "timed out" in lowered
+
+
+class _TeeReader:
+	# Pass-through reader that copies every chunk into the cache file and keeps
+	# the last TAIL_BYTES for the remark check
+	def __init__(self, fp: BinaryIO, sink: Any) -> None:
+		self.fp = fp
+		self.sink = sink
+		self.tail = b""
+
+	def read(self, n: int = -1) -> bytes:
+		data = self.fp.read(n)
+		if data:
+			self.sink.write(data)
+			self.tail = (self.tail + data)[-TAIL_BYTES:]
+		return data
+
+
+class ResponseCache:
+	# Content-addressed store of raw Overpass responses. Entries are keyed by the
+	# SHA-256 of the query text and gzip-compressed on disk. An entry younger than
+	# `ttl_s` is served without touching the network; an older one is refreshed,
+	# and is still served if the refresh fails. Least recently used entries are
+	# evicted once the directory grows past `max_bytes`.
+	def __init__(
+		self,
+		directory: str = CACHE_DIR,
+		ttl_s: float = DEFAULT_TTL_S,
+		max_bytes: int = DEFAULT_MAX_BYTES,
+		offline: bool = False,
+		refresh: bool = False,
+	) -> None:
+		self.directory = directory
+		self.ttl_s = ttl_s
+		self.max_bytes = max_bytes
+		self.offline = offline
+		self.refresh = refresh
+		self._evict_lock = threading.Lock()
+
+	@staticmethod
+	def key(query: str) -> str:
+		return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+	def path_for(self, query: str) -> str:
+		key = self.key(query)
+		return os.path.join(self.directory, key[:2], key + ".json.gz")
+
+	def fetch(self, query: str, consume: Callable[[BinaryIO], T], fetch_live: Callable[[Callable[[BinaryIO], T]], T]) -> T:
+		# `fetch_live(consume)` performs the network request and hands the response
+		# stream to `consume`; the stream is written to the cache as it is read.
+		path = self.path_for(query)
+		age = self._age(path)
+		if self.offline:
+			if age is None:
+				raise CacheMiss(f"No cached Overpass response for query {self.key(query)[:12]} (offline)")
+			return self._replay(path, consume)
+		if age is not None and not self.refresh and age < self.ttl_s:
+			print(f"Using cached Overpass response from {age / 60.0:.0f} min ago (--refresh to re-download)", file=sys.stderr)
+			return self._replay(path, consume)
+		try:
+			result = fetch_live(lambda fp: self._store(path, fp, consume))
+		except Exception as e:  # noqa: BLE001
+			if age is None:
+				raise
+			print(f"Overpass refresh failed ({e}); using cached response from {age / 3600.0:.1f}h ago", file=sys.stderr)
+			return self._replay(path, consume)
+		self.evict()
+		return result
+
+	def _age(self, path: str) -> Optional[float]:
+		try:
+			# mtime is the write time; atime is bumped explicitly on every read for LRU
+			return max(0.0, time.time() - os.stat(path).st_mtime)
+		except OSError:
+			return None
+
+	def _replay(self, path: str, consume: Callable[[BinaryIO], T]) -> T:
+		with gzip.open(path, "rb") as f:
+			result = consume(f)
+		try:
+			os.utime(path, (time.time(), os.stat(path).st_mtime))
+		except OSError:
+			pass
+		return result
+
+	def _store(self, path: str, fp: BinaryIO, consume: Callable[[BinaryIO], T]) -> T:
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+				tee = _TeeReader(fp, gz)
+				result = consume(tee)
+				# Keep the whole body even if the consumer stopped at the closing brace
+				while tee.read(64 * 1024):
+					pass
+			# A response the server cut short holds only part of the area; it
+			# is used for this run but never replayed
+			remark = error_remark(tee.tail)
+			if remark:
+				print(f"Overpass response not cached: {remark}", file=sys.stderr)
+				os.remove(tmp_path)
+				return result
+			os.replace(tmp_path, path)
+		except BaseException:
+			try:
+				os.remove(tmp_path)
+			except OSError:
+				pass
+			raise
+		return result
+
+	def evict(self) -> int:
+		# Drop least recently used entries until the cache fits in max_bytes
+		with self._evict_lock:
+			entries: List[Tuple[float, int, str]] = []
+			for root, _dirs, files in os.walk(self.directory):
+				for name in files:
+					if not name.endswith(".json.gz"):
+						continue
+					p = os.path.join(root, name)
+					try:
+						st = os.stat(p)
+					except OSError:
+						continue
+					entries.append((max(st.st_atime, st.st_mtime), st.st_size, p))
+			total = sum(size for _, size, _ in entries)
+			removed = 0
+			for _used, size, p in sorted(entries):
+				if total <= self.max_bytes:
+					break
+				try:
+					os.remove(p)
+				except OSError:
+					continue
+				total -= size
+				removed += 1
+			return removed
+
+
+def add_cache_args(parser: Any) -> None:
+	# Caching is opt-in, for development and CI runs; a plain run always
+	# downloads fresh data
+	parser.add_argument("--cache", action="store_true", help="read and write the Overpass response cache")
+	parser.add_argument("--offline", action="store_true", help="only use cached Overpass responses; never touch the network")
+	parser.add_argument("--refresh", action="store_true", help="with --cache: re-download, ignoring cached responses younger than the TTL")
+	parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"response cache directory (default: {CACHE_DIR})")
+	parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_S / 3600.0, metavar="HOURS", help="serve cached responses younger than this")
+	parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="evict least recently used entries above this size")
+
+
+def cache_from_args(args: Any) -> Optional[ResponseCache]:
+	if not args.cache and not args.offline:
+		return None
+	return ResponseCache(
+		directory=args.cache_dir,
+		ttl_s=args.cache_ttl * 3600.0,
+		max_bytes=args.cache_max_mb * 1024 * 1024,
+		offline=args.offline,
+		refresh=args.refresh,
+	)
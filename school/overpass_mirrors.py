@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+from overpass_stream import http_post_stream
+
+
+T = TypeVar("T")
+
+# Start a backup request when no mirror has sent a first byte after this long.
+# Overpass only starts answering once the query has been evaluated, so this has
+# to cover the server-side run time of a typical city query.
+HEDGE_DELAY_S = 20.0
+
+
+class MirrorHealth:
+	# Per-mirror latency/health score shared by all fetches in a process.
+	# Latency is an exponentially weighted average of time-to-first-byte; a
+	# failure puts the mirror on cooldown, doubling with consecutive failures.
+	def __init__(self, endpoints: Iterable[str], alpha: float = 0.3, cooldown_s: float = 60.0, max_cooldown_s: float = 900.0) -> None:
+		self.endpoints = list(endpoints)
+		self.alpha = alpha
+		self.cooldown_s = cooldown_s
+		self.max_cooldown_s = max_cooldown_s
+		self._latency: Dict[str, float] = {}
+		self._failures: Dict[str, int] = {e: 0 for e in self.endpoints}
+		self._down_until: Dict[str, float] = {e: 0.0 for e in self.endpoints}
+		self._lock = threading.Lock()
+
+	def ranked(self) -> List[str]:
+		# Healthy mirrors first, fastest first; mirrors without a measurement keep
+		# their configured order after the measured ones. Mirrors on cooldown go last.
+		now = time.monotonic()
+		with self._lock:
+			def key(item: Any) -> Any:
+				idx, endpoint = item
+				down = self._down_until.get(endpoint, 0.0) > now
+				latency = self._latency.get(endpoint)
+				return (down, latency is None, latency or 0.0, idx)
+
+			return [e for _, e in sorted(enumerate(self.endpoints), key=key)]
+
+	def record_first_byte(self, endpoint: str, seconds: float) -> None:
+		with self._lock:
+			prev = self._latency.get(endpoint)
+			self._latency[endpoint] = seconds if prev is None else prev + self.alpha * (seconds - prev)
+
+	def record_success(self, endpoint: str) -> None:
+		with self._lock:
+			self._failures[endpoint] = 0
+			self._down_until[endpoint] = 0.0
+
+	def record_failure(self, endpoint: str) -> None:
+		with self._lock:
+			failures = self._failures.get(endpoint, 0) + 1
+			self._failures[endpoint] = failures
+			cooldown = min(self.max_cooldown_s, self.cooldown_s * (2 ** (failures - 1)))
+			self._down_until[endpoint] = time.monotonic() + cooldown
+
+	def snapshot(self) -> Dict[str, Dict[str, Any]]:
+		now = time.monotonic()
+		with self._lock:
+			return {
+				e: {
+					"latency_s": self._latency.get(e),
+					"failures": self._failures.get(e, 0),
+					"healthy": self._down_until.get(e, 0.0) <= now,
+				}
+				for e in self.endpoints
+			}
+
+
+class _Cancelled(Exception):
+	pass
+
+
+class _RacerReader:
+	# File-like wrapper that aborts the losing requests once the race is decided
+	def __init__(self, fp: BinaryIO, cancel: threading.Event) -> None:
+		self.fp = fp
+		self.cancel = cancel
+
+	def read(self, n: int = -1) -> bytes:
+		if self.cancel.is_set():
+			raise _Cancelled()
+		return self.fp.read(n)
+
+
+def hedged_fetch(
+	query: str,
+	consume: Callable[[BinaryIO], T],
+	health: MirrorHealth,
+	hedge_delay_s: float = HEDGE_DELAY_S,
+	timeout: int = 240,
+	acquire: Optional[Callable[[str], None]] = None,
+	release: Optional[Callable[[str], None]] = None,
+) -> T:
+	# Race the mirrors: start with the best-ranked one and add the next mirror
+	# whenever none of the running requests has produced a first byte within
+	# `hedge_delay_s`, or as soon as one fails. The first request whose body is
+	# fully consumed wins; the others are cancelled.
+	order = health.ranked()
+	events: "queue.Queue[Any]" = queue.Queue()
+	cancel = threading.Event()
+	open_responses: Dict[str, Any] = {}
+	lock = threading.Lock()
+
+	def run(endpoint: str) -> None:
+		if acquire is not None:
+			acquire(endpoint)
+		# Timed from here: waiting for a pool slot or the shared request
+		# interval is local queueing, not mirror latency
+		started = time.monotonic()
+		try:
+			if cancel.is_set():
+				return
+			with http_post_stream(endpoint, query, timeout=timeout) as resp:
+				with lock:
+					open_responses[endpoint] = resp
+				status = resp.getcode()
+				if status != 200:
+					raise RuntimeError(f"HTTP {status} from {endpoint}")
+				# The status line is the first byte Overpass sends once the query has run
+				health.record_first_byte(endpoint, time.monotonic() - started)
+				events.put(("first", endpoint, None))
+				result = consume(_RacerReader(resp, cancel))
+			events.put(("done", endpoint, result))
+		except BaseException as e:  # noqa: BLE001 - reported to the coordinator
+			events.put(("error", endpoint, e))
+		finally:
+			with lock:
+				open_responses.pop(endpoint, None)
+			if release is not None:
+				release(endpoint)
+
+	next_idx = 0
+	running: Set[str] = set()
+	answering: Set[str] = set()
+	last_err: Optional[BaseException] = None
+
+	def launch() -> None:
+		nonlocal next_idx
+		endpoint = order[next_idx]
+		next_idx += 1
+		running.add(endpoint)
+		threading.Thread(target=run, args=(endpoint,), daemon=True).start()
+
+	if not order:
+		raise RuntimeError("No Overpass endpoints configured")
+	launch()
+	hedge_at = time.monotonic() + hedge_delay_s
+	try:
+		while running:
+			can_hedge = not answering and next_idx < len(order)
+			wait = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+			try:
+				kind, endpoint, payload = events.get(timeout=wait)
+			except queue.Empty:
+				launch()
+				hedge_at = time.monotonic() + hedge_delay_s
+				continue
+			if kind == "first":
+				answering.add(endpoint)
+			elif kind == "done":
+				health.record_success(endpoint)
+				return payload
+			else:
+				running.discard(endpoint)
+				answering.discard(endpoint)
+				if not isinstance(payload, _Cancelled):
+					health.record_failure(endpoint)
+					last_err = payload
+				if next_idx < len(order) and not answering:
+					launch()
+					hedge_at = time.monotonic() + hedge_delay_s
+	finally:
+		cancel.set()
+		with lock:
+			losers = list(open_responses.values())
+		for resp in losers:
+			try:
+				resp.close()
+			except Exception:  # noqa: BLE001
+				pass
+	raise last_err or RuntimeError("All Overpass mirrors failed")
@@ -0,0 +1,59 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from school_rows import spec_tags
+
+
+# Output modes for the school queries:
+# - "center": one element per school with its tags and a center point (default)
+# - "full":   legacy output that also recurses down (`>; out skel qt;`) and returns
+#             a bare skeleton for every member node of every way/relation. Those
+#             nodes have no tags and are dropped by to_school_row, so this mode is
+#             only kept for comparisons.
+OUTPUT_MODES = ("center", "full")
+
+# Every tag read by to_school_row (derived from school_rows.ROW_SPEC). Used as
+# the optional server-side whitelist.
+SCHOOL_ROW_TAGS: List[str] = spec_tags()
+
+# Tag carrying the original OSM element type on converted (whitelisted) elements
+OSM_TYPE_TAG = "_osm_type"
+
+
+def _quote(s: str) -> str:
+	return s.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def output_block(mode: str = "center", tags: Optional[Iterable[str]] = None) -> str:
+	if mode not in OUTPUT_MODES:
+		raise ValueError(f"Unknown query mode {mode!r}; expected one of {', '.join(OUTPUT_MODES)}")
+	if mode == "full":
+		return "out center tags;\n>;\nout skel qt;\n"
+	tag_list = [t for t in (tags or []) if t]
+	if not tag_list:
+		return "out center tags;\n"
+	# `convert` keeps only the listed tags and replaces the geometry with its center,
+	# so each school costs a handful of short tags and one coordinate pair.
+	exprs = ["::id=id()", "::geom=center(geom())", f'"{OSM_TYPE_TAG}"=type()']
+	exprs.extend(f'"{_quote(t)}"=t["{_quote(t)}"]' for t in tag_list)
+	return "convert school " + ",".join(exprs) + ";\nout geom;\n"
+
+
+def normalize_element(el: Dict[str, Any]) -> Dict[str, Any]:
+	# Converted elements come back as type "school" with a GeoJSON-ish point and
+	# empty strings for absent tags; map them back to the regular Overpass shape.
+	tags = el.get("tags") or {}
+	if OSM_TYPE_TAG not in tags:
+		return el
+	out: Dict[str, Any] = {
+		"type": tags.get(OSM_TYPE_TAG, ""),
+		"id": el.get("id"),
+		"tags": {k: v for k, v in tags.items() if v and k != OSM_TYPE_TAG},
+	}
+	geom = el.get("geometry")
+	if isinstance(geom, dict) and isinstance(geom.get("coordinates"), list) and len(geom["coordinates"]) >= 2:
+		out["lon"], out["lat"] = geom["coordinates"][0], geom["coordinates"][1]
+	elif "lat" in el and "lon" in el:
+		out["lat"], out["lon"] = el["lat"], el["lon"]
+	elif isinstance(el.get("center"), dict):
+		out["center"] = el["center"]
+	return out
@@ -0,0 +1,144 @@
+import codecs
+import json
+import re
+import urllib.request
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+class OverpassStreamError(ValueError):
+	pass
+
+
+def http_post_stream(url: str, body: str, timeout: int = 240) -> Any:
+	# POST the query and hand back the open response so the body can be
+	# consumed incrementally. Use as a context manager.
+	req = urllib.request.Request(url, data=body.encode("utf-8"))
+	req.add_header("Content-Type", "text/plain; charset=utf-8")
+	return urllib.request.urlopen(req, timeout=timeout)
+
+
+class _Buffer:
+	# Sliding window of decoded text over a binary stream. Consumed text is
+	# dropped on every refill, so only the unparsed tail is kept in memory.
+	def __init__(self, fp: BinaryIO, chunk_size: int) -> None:
+		self.fp = fp
+		self.chunk_size = chunk_size
+		self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+		self.text = ""
+		self.pos = 0
+		self.eof = False
+
+	def fill(self) -> bool:
+		if self.eof:
+			return False
+		chunk = self.fp.read(self.chunk_size)
+		if not chunk:
+			self.eof = True
+			tail = self.decoder.decode(b"", final=True)
+		else:
+			tail = self.decoder.decode(chunk)
+		self.text = self.text[self.pos:] + tail
+		self.pos = 0
+		return True
+
+	def peek(self) -> str:
+		# Next non-whitespace character, or "" at end of stream
+		while True:
+			text = self.text
+			pos = self.pos
+			n = len(text)
+			while pos < n and text[pos] in _WHITESPACE:
+				pos += 1
+			self.pos = pos
+			if pos < n:
+				return text[pos]
+			if not self.fill():
+				return ""
+
+	def expect(self, ch: str) -> None:
+		got = self.peek()
+		if got != ch:
+			raise OverpassStreamError(f"Expected {ch!r} in Overpass response, got {got or 'end of data'!r}")
+		self.pos += 1
+
+	def value(self) -> Any:
+		self.peek()
+		while True:
+			try:
+				obj, end = _DECODER.raw_decode(self.text, self.pos)
+			except json.JSONDecodeError as e:
+				if not self.fill():
+					raise OverpassStreamError(f"Malformed Overpass response: {e}") from e
+				continue
+			# A bare number cut by the end of the buffer may continue in the next
+			# chunk. raw_decode stops early on a dangling "0." or "1e", so re-fill
+			# whenever nothing but number characters follow the parsed value.
+			if not self.eof and isinstance(obj, (int, float)) and _NUMBER_TAIL.fullmatch(self.text, end):
+				self.fill()
+				continue
+			self.pos = end
+			return obj
+
+
+def iter_elements(fp: BinaryIO, meta: Optional[Dict[str, Any]] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+	# Yield the members of the top-level "elements" array one at a time without
+	# holding the whole response. Other top-level keys (version, osm3s, remark)
+	# are stored in `meta` when given.
+	buf = _Buffer(fp, chunk_size)
+	buf.expect("{")
+	while True:
+		ch = buf.peek()
+		if ch == "}":
+			return
+		if ch == ",":
+			buf.pos += 1
+			continue
+		if ch != '"':
+			raise OverpassStreamError(f"Unexpected {ch or 'end of data'!r} in Overpass response")
+		key = buf.value()
+		buf.expect(":")
+		if key != "elements":
+			value = buf.value()
+			if meta is not None:
+				meta[key] = value
+			continue
+		buf.expect("[")
+		while True:
+			ch = buf.peek()
+			if ch == "]":
+				buf.pos += 1
+				break
+			if ch == ",":
+				buf.pos += 1
+				continue
+			if not ch:
+				raise OverpassStreamError("Overpass response ended inside the elements array")
+			el = buf.value()
+			if isinstance(el, dict):
+				yield el
+
+
+def stream_rows(
+	fp: BinaryIO,
+	to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+	meta: Optional[Dict[str, Any]] = None,
+	into: Any = None,
+) -> Tuple[Any, int]:
+	# Feed each element straight into `to_row`; keep rows that have a name.
+	# Rows are appended to `into` (anything with .append, e.g. a SchoolTable),
+	# or to a new list.
+	rows = [] if into is None else into
+	count = 0
+	for el in iter_elements(fp, meta=meta):
+		count += 1
+		row = to_row(el)
+		if row.get("name"):
+			rows.append(row)
+	return rows, count
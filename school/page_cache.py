@@ -0,0 +1,231 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+PAGE_CACHE_DIR = ".page_cache"
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+@dataclass
+class CachedPage:
+	key: str
+	text: str
+	etag: str = ""
+	last_modified: str = ""
+	# None for the whole page; for a page read only until some sections were
+	# found (see page_reader.ReadGoal), the sections it is known to hold
+	covers: Optional[Tuple[str, ...]] = None
+
+	@property
+	def size(self) -> int:
+		return len(self.text)
+
+	def serves(self, want: Iterable[str] = ()) -> bool:
+		# A partial page serves requests for sections it covers, never a request
+		# for the whole page (empty want)
+		if self.covers is None:
+			return True
+		want = tuple(want)
+		return bool(want) and set(want) <= set(self.covers)
+
+	def validators(self) -> Dict[str, str]:
+		headers: Dict[str, str] = {}
+		if self.etag:
+			headers["If-None-Match"] = self.etag
+		if self.last_modified:
+			headers["If-Modified-Since"] = self.last_modified
+		return headers
+
+
+@dataclass
+class PageCacheStats:
+	hits: int = 0
+	revalidated: int = 0
+	fetched: int = 0
+	coalesced: int = 0
+
+
+# fetch(conditional_headers) -> (status, page or None). status 304 means the
+# cached copy is still valid; any other status comes with the fresh page (None
+# if it is not usable).
+PageFetch = Callable[[Dict[str, str]], Tuple[int, Optional[CachedPage]]]
+
+
+class _Flight:
+	__slots__ = ("done", "page")
+
+	def __init__(self) -> None:
+		self.done = threading.Event()
+		self.page: Optional[CachedPage] = None
+
+
+class PageCache:
+	# Process-wide cache of fetched pages, keyed by normalized URL. Pages fetched
+	# in this run are served from memory (LRU within max_bytes). With a directory,
+	# pages are also kept on disk across runs and revalidated with a conditional
+	# GET (ETag / Last-Modified) the first time they are needed again. Concurrent
+	# requests for the same key share one fetch.
+	def __init__(
+		self,
+		max_bytes: int = DEFAULT_MEMORY_BYTES,
+		directory: Optional[str] = None,
+		max_disk_bytes: int = DEFAULT_DISK_BYTES,
+	) -> None:
+		self.max_bytes = max_bytes
+		self.directory = directory
+		self.max_disk_bytes = max_disk_bytes
+		self.stats = PageCacheStats()
+		self._mem: "OrderedDict[str, CachedPage]" = OrderedDict()
+		self._mem_bytes = 0
+		self._flights: Dict[str, _Flight] = {}
+		self._lock = threading.Lock()
+		self._disk_writes = 0
+
+	def get(self, key: str, fetch: PageFetch, want: Iterable[str] = ()) -> Optional[CachedPage]:
+		# `want` as for CachedPage.serves: a cached partial page is only reused
+		# for sections it covers
+		want = tuple(want)
+		with self._lock:
+			page = self._mem.get(key)
+			if page is not None and page.serves(want):
+				self._mem.move_to_end(key)
+				self.stats.hits += 1
+				return page
+			flight = self._flights.get(key)
+			if flight is None:
+				flight = self._flights[key] = _Flight()
+				owner = True
+			else:
+				owner = False
+		if not owner:
+			flight.done.wait()
+			if flight.page is None or flight.page.serves(want):
+				with self._lock:
+					self.stats.coalesced += 1
+				return flight.page
+			# The shared fetch stopped short of what this request needs
+			return self._load(key, fetch)
+		try:
+			flight.page = self._load(key, fetch)
+		finally:
+			with self._lock:
+				del self._flights[key]
+			flight.done.set()
+		return flight.page
+
+	def _load(self, key: str, fetch: PageFetch) -> Optional[CachedPage]:
+		stored = self._read_disk(key)
+		status, page = fetch(stored.validators() if stored is not None else {})
+		if status == 304 and stored is not None:
+			self.stats.revalidated += 1
+			page = stored
+			self._touch_disk(key)
+		else:
+			self.stats.fetched += 1
+			if page is not None:
+				self._write_disk(key, page)
+		if page is not None:
+			self._remember(key, page)
+		return page
+
+	def _remember(self, key: str, page: CachedPage) -> None:
+		if page.size > self.max_bytes:
+			return
+		with self._lock:
+			old = self._mem.get(key)
+			if old is not None and old.covers is None and page.covers is not None:
+				return
+			old = self._mem.pop(key, None)
+			if old is not None:
+				self._mem_bytes -= old.size
+			self._mem[key] = page
+			self._mem_bytes += page.size
+			while self._mem_bytes > self.max_bytes:
+				_k, evicted = self._mem.popitem(last=False)
+				self._mem_bytes -= evicted.size
+
+	def _path(self, key: str) -> Optional[str]:
+		if not self.directory:
+			return None
+		digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+		return os.path.join(self.directory, digest[:2], digest + ".json.gz")
+
+	def _read_disk(self, key: str) -> Optional[CachedPage]:
+		path = self._path(key)
+		if path is None or not os.path.isfile(path):
+			return None
+		try:
+			with gzip.open(path, "rt", encoding="utf-8") as f:
+				data: Dict[str, Any] = json.load(f)
+			page = CachedPage(key=data["key"], text=data["text"], etag=data.get("etag", ""), last_modified=data.get("last_modified", ""))
+		except (OSError, ValueError, KeyError, TypeError):
+			return None
+		# Without a validator the copy cannot be revalidated, so it is refetched
+		return page if page.key == key and (page.etag or page.last_modified) else None
+
+	def _touch_disk(self, key: str) -> None:
+		path = self._path(key)
+		if path is None:
+			return
+		try:
+			os.utime(path, (time.time(), os.stat(path).st_mtime))
+		except OSError:
+			pass
+
+	def _write_disk(self, key: str, page: CachedPage) -> None:
+		path = self._path(key)
+		if path is None or page.covers is not None or not (page.etag or page.last_modified):
+			return
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+				json.dump({"key": key, "etag": page.etag, "last_modified": page.last_modified, "text": page.text}, f, ensure_ascii=False)
+			os.replace(tmp_path, path)
+		except OSError:
+			try:
+				os.remove(tmp_path)
+			except OSError:
+				pass
+			return
+		with self._lock:
+			self._disk_writes += 1
+			evict = self._disk_writes % 200 == 0
+		if evict:
+			self.evict_disk()
+
+	def evict_disk(self) -> int:
+		# Drop least recently used entries until the directory fits max_disk_bytes
+		if not self.directory or not os.path.isdir(self.directory):
+			return 0
+		entries: List[Tuple[float, int, str]] = []
+		for root, _dirs, files in os.walk(self.directory):
+			for name in files:
+				if not name.endswith(".json.gz"):
+					continue
+				p = os.path.join(root, name)
+				try:
+					st = os.stat(p)
+				except OSError:
+					continue
+				entries.append((max(st.st_atime, st.st_mtime), st.st_size, p))
+		total = sum(size for _, size, _ in entries)
+		removed = 0
+		for _used, size, p in sorted(entries):
+			if total <= self.max_disk_bytes:
+				break
+			try:
+				os.remove(p)
+			except OSError:
+				continue
+			total -= size
+			removed += 1
+		return removed
@@ -0,0 +1,112 @@
+import codecs
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+PAGE_BYTE_BUDGET = 800_000
+STREAM_CHUNK = 32 * 1024
+# Where browsers look for <meta charset> (HTML prescan)
+SNIFF_BYTES = 1024
+DEFAULT_CHARSET = "utf-8"
+
+_CT_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.I)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.I)
+_BOMS = (
+	(codecs.BOM_UTF8, "utf-8-sig"),
+	(codecs.BOM_UTF16_LE, "utf-16"),
+	(codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _known(charset: Optional[str]) -> Optional[str]:
+	if not charset:
+		return None
+	try:
+		name = codecs.lookup(charset).name
+	except LookupError:
+		return None
+	# Pages labelled latin-1 are windows-1252 in practice (as in browsers)
+	return "cp1252" if name in ("latin-1", "iso8859-1", "ascii") else name
+
+
+def charset_from_content_type(content_type: str) -> Optional[str]:
+	m = _CT_CHARSET_RE.search(content_type or "")
+	return _known(m.group(1)) if m else None
+
+
+def bom_charset(head: bytes) -> Optional[str]:
+	for bom, name in _BOMS:
+		if head.startswith(bom):
+			return name
+	return None
+
+
+def sniff_charset(head: bytes) -> Optional[str]:
+	# <meta charset=...> or <meta http-equiv content="...; charset=...">
+	m = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+	return _known(m.group(1).decode("ascii", "ignore")) if m else None
+
+
+@dataclass
+class ReadStats:
+	pages: int = 0
+	stopped_early: int = 0
+	over_budget: int = 0
+	body_bytes: int = 0
+	_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+	def record(self, size: int, stopped_early: bool, over_budget: bool) -> None:
+		with self._lock:
+			self.pages += 1
+			self.body_bytes += size
+			self.stopped_early += stopped_early
+			self.over_budget += over_budget
+
+
+READ_STATS = ReadStats()
+
+
+class ReadGoal:
+	# What a caller is looking for in a page, so read_text can stop before the
+	# end. seen() gets each newly decoded piece and should be cheap: it says when
+	# the goal may have been met. reached() then confirms on the text so far and
+	# returns the text to keep, or None to read on.
+	def seen(self, piece: str) -> bool:
+		return False
+
+	def reached(self, text: str) -> Optional[str]:
+		return None
+
+
+def read_text(
+	read: Callable[[int], bytes],
+	content_type: str = "",
+	budget: int = PAGE_BYTE_BUDGET,
+	goal: Optional[ReadGoal] = None,
+) -> Tuple[str, bool]:
+	# Read and decode a body chunk by chunk, up to `budget` bytes, and return
+	# (text, stopped_early). The charset is a BOM, else the Content-Type
+	# charset, else a <meta> charset in the first chunk, else UTF-8.
+	first = read(min(STREAM_CHUNK, budget))
+	charset = bom_charset(first) or charset_from_content_type(content_type) or sniff_charset(first) or DEFAULT_CHARSET
+	decoder = codecs.getincrementaldecoder(charset)(errors="ignore")
+
+	parts: List[str] = []
+	size = 0
+	data = first
+	while data:
+		size += len(data)
+		piece = decoder.decode(data)
+		parts.append(piece)
+		if goal is not None and goal.seen(piece):
+			kept = goal.reached("".join(parts))
+			if kept is not None:
+				READ_STATS.record(size, True, False)
+				return kept, True
+		if size >= budget:
+			break
+		data = read(min(STREAM_CHUNK, budget - size))
+	parts.append(decoder.decode(b"", final=True))
+	READ_STATS.record(size, False, size >= budget)
+	return "".join(parts), False
@@ -0,0 +1,164 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Declarative field -> tag fallback spec behind to_school_row. Each entry is
+# (field, rule, tags):
+# - "raw":   value of the single tag as-is ("" when absent)
+# - "first": first tag with a non-blank value, stripped
+# - "join":  ;-separated values of all tags, spaces removed, deduplicated, ", "-joined
+# - "address": housenumber+street, suburb, city, state, postcode from ADDRESS_SPEC
+ROW_SPEC: List[Tuple[str, str, List[str]]] = [
+	("name", "raw", ["name"]),
+	("address", "address", []),
+	("phone", "join", ["contact:phone", "contact:mobile", "phone"]),
+	("website", "first", ["contact:website", "website", "url"]),
+	("operator", "raw", ["operator"]),
+	("operator_type", "raw", ["operator:type"]),
+	("board", "first", ["education:board", "board"]),
+	("levels", "first", ["isced:level", "grades", "level"]),
+	("gender", "first", ["school:gender", "gender"]),
+	("religion", "raw", ["religion"]),
+	("language", "first", ["language", "medium", "medium_of_instruction"]),
+]
+
+# Address parts in output order, same (part, rule, tags) shape; the first two
+# are joined with a space, the rest with ", "
+ADDRESS_SPEC: List[Tuple[str, str, List[str]]] = [
+	("housenumber", "raw", ["addr:housenumber"]),
+	("street", "raw", ["addr:street"]),
+	("suburb", "first", ["addr:suburb", "addr:neighbourhood", "addr:locality"]),
+	("city", "first", ["addr:city", "is_in:city"]),
+	("state", "raw", ["addr:state"]),
+	("postcode", "raw", ["addr:postcode"]),
+]
+
+
+def spec_tags() -> List[str]:
+	# Every tag read by the spec, in spec order
+	tags: List[str] = []
+	for _field, rule, keys in ROW_SPEC:
+		for t in ([k for _part, _rule, ks in ADDRESS_SPEC for k in ks] if rule == "address" else keys):
+			if t not in tags:
+				tags.append(t)
+	return tags
+
+
+def _strip(v: Any) -> str:
+	return v.strip() if isinstance(v, str) else str(v).strip()
+
+
+def _join(values: Iterable[Any]) -> str:
+	# ;-separated multi-values, spaces removed, first occurrence wins
+	parts: List[str] = []
+	seen = set()
+	for v in values:
+		if not v:
+			continue
+		for p in str(v).replace(" ", "").split(";"):
+			if p and p not in seen:
+				seen.add(p)
+				parts.append(p)
+	return ", ".join(parts)
+
+
+class _Source:
+	# Lines of the generated function plus the constants it closes over
+	def __init__(self) -> None:
+		self.lines: List[str] = []
+		self.consts: Dict[str, Any] = {}
+
+	def add(self, depth: int, line: str) -> None:
+		self.lines.append("\t" * depth + line)
+
+	def keyset(self, keys: List[str]) -> str:
+		name = f"_K{len(self.consts)}"
+		self.consts[name] = frozenset(keys)
+		return name
+
+
+def _emit_first(src: _Source, var: str, keys: List[str], depth: int) -> None:
+	# var = first non-blank stripped value of keys, as nested fallbacks so a hit
+	# on the first tag costs one dict lookup
+	for i, k in enumerate(keys):
+		src.add(depth + i, f"{var} = get({k!r})")
+		src.add(depth + i, f"if {var}:")
+		src.add(depth + i + 1, f"{var} = {var}.strip() if {var}.__class__ is str else _strip({var})")
+		src.add(depth + i, f"if not {var}:")
+	src.add(depth + len(keys), f"{var} = ''")
+
+
+def _emit(src: _Source, var: str, rule: str, keys: List[str], depth: int = 1) -> None:
+	if rule == "raw":
+		src.add(depth, f"{var} = get({keys[0]!r}, '')")
+		return
+	if rule not in ("first", "join", "address"):
+		raise ValueError(f"Unknown row rule {rule!r} for {var}")
+	# Most elements carry only a handful of tags: one set test skips every
+	# lookup of a multi-tag field (or the whole address) when none are present
+	group = [k for _part, _rule, ks in ADDRESS_SPEC for k in ks] if rule == "address" else keys
+	if len(group) > 1:
+		src.add(depth, f"if {src.keyset(group)}.isdisjoint(tags):")
+		src.add(depth + 1, f"{var} = ''")
+		src.add(depth, "else:")
+		depth += 1
+	if rule == "first":
+		_emit_first(src, var, keys, depth)
+	elif rule == "join":
+		src.add(depth, f"{var} = _join(({', '.join(f'get({k!r})' for k in keys)},))")
+	else:
+		parts = []
+		for i, (_part, part_rule, part_keys) in enumerate(ADDRESS_SPEC):
+			parts.append(f"{var}_{i}")
+			_emit(src, parts[-1], part_rule, part_keys, depth)
+		house, street, rest = parts[0], parts[1], parts[2:]
+		src.add(depth, f"{var}_h = ' '.join([p for p in ({house}, {street}) if p]).strip()")
+		src.add(depth, f"{var} = ', '.join([p for p in ({var}_h, {', '.join(rest)}) if p])")
+
+
+def compile_spec(spec: Optional[List[Tuple[str, str, List[str]]]] = None) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+	# Turn the spec into the source of one flat function (every lookup inlined,
+	# no per-field calls) and compile it once at import time.
+	src = _Source()
+	src.add(0, "def to_school_row(el):")
+	src.add(1, "tags = el.get('tags') or _EMPTY")
+	src.add(1, "get = tags.get")
+	fields = []
+	for i, (field, rule, keys) in enumerate(spec or ROW_SPEC):
+		_emit(src, f"f{i}", rule, keys)
+		fields.append(f"{field!r}: f{i}")
+	src.lines += [
+		"\tif 'lat' in el and 'lon' in el:",
+		"\t\tlat = float(el['lat'])",
+		"\t\tlon = float(el['lon'])",
+		"\telse:",
+		"\t\tcenter = el.get('center')",
+		"\t\tif isinstance(center, dict):",
+		"\t\t\tlat = float(center.get('lat'))",
+		"\t\t\tlon = float(center.get('lon'))",
+		"\t\telse:",
+		"\t\t\tlat = lon = None",
+		"\tetype = el.get('type', '')",
+		"\teid = el.get('id')",
+		"\tosm_url = f'https://www.openstreetmap.org/{etype}/{eid}' if etype and eid is not None else ''",
+		f"\treturn {{{', '.join(fields)}, 'lat': lat, 'lon': lon, 'osm_url': osm_url}}",
+	]
+	namespace: Dict[str, Any] = {"_strip": _strip, "_join": _join, "_EMPTY": {}, **src.consts}
+	exec(compile("\n".join(src.lines) + "\n", "<school_rows.ROW_SPEC>", "exec"), namespace)  # noqa: S102
+	return namespace["to_school_row"]
+
+
+to_school_row = compile_spec()
+
+
+def extract_rows(elements: Iterable[Any], into: Any = None, to_row: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Any:
+	# Batch form: convert a sequence of Overpass elements, keeping named rows
+	convert = to_row or to_school_row
+	rows = [] if into is None else into
+	append = rows.append
+	for el in elements:
+		if isinstance(el, dict):
+			row = convert(el)
+			if row["name"]:
+				append(row)
+	return rows
+
@@ -0,0 +1,187 @@
+import csv
+import json
+import math
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+# Column order of every <city>_schools.json/.csv
+SCHOOL_FIELDS: List[str] = [
+	"name",
+	"address",
+	"phone",
+	"website",
+	"operator",
+	"operator_type",
+	"board",
+	"levels",
+	"gender",
+	"religion",
+	"language",
+	"lat",
+	"lon",
+	"osm_url",
+]
+
+# Low-cardinality text columns, stored as codes into a per-column value list
+CATEGORICAL_FIELDS = ("operator_type", "board", "levels", "gender", "religion", "language")
+COORD_FIELDS = ("lat", "lon")
+TEXT_FIELDS = tuple(f for f in SCHOOL_FIELDS if f not in CATEGORICAL_FIELDS and f not in COORD_FIELDS)
+
+
+class _Categories:
+	# Dictionary-encoded string column
+	__slots__ = ("codes", "values", "index")
+
+	def __init__(self) -> None:
+		self.codes = array("I")
+		self.values: List[str] = [""]
+		self.index: Dict[str, int] = {"": 0}
+
+	def append(self, value: str) -> None:
+		code = self.index.get(value)
+		if code is None:
+			code = len(self.values)
+			self.values.append(value)
+			self.index[value] = code
+		self.codes.append(code)
+
+	def __getitem__(self, i: int) -> str:
+		return self.values[self.codes[i]]
+
+
+class RowView(Mapping):
+	# Read-only dict-like view of one row; no per-row dict is materialized
+	__slots__ = ("_table", "_i")
+
+	def __init__(self, table: "SchoolTable", i: int) -> None:
+		self._table = table
+		self._i = i
+
+	def __getitem__(self, key: str) -> Any:
+		return self._table.value(key, self._i)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(SCHOOL_FIELDS)
+
+	def __len__(self) -> int:
+		return len(SCHOOL_FIELDS)
+
+	def __repr__(self) -> str:
+		return f"RowView({dict(self)!r})"
+
+
+class SchoolTable:
+	# Columnar store for school rows (see to_school_row). Text columns are plain
+	# lists, low-cardinality columns are dictionary-encoded and coordinates live
+	# in array('d') with NaN for missing values, so a row costs a few machine
+	# words instead of a 14-key dict.
+	def __init__(self) -> None:
+		self._text: Dict[str, List[str]] = {f: [] for f in TEXT_FIELDS}
+		self._cats: Dict[str, _Categories] = {f: _Categories() for f in CATEGORICAL_FIELDS}
+		self._coords: Dict[str, array] = {f: array("d") for f in COORD_FIELDS}
+
+	@classmethod
+	def from_rows(cls, rows: Iterable[Mapping]) -> "SchoolTable":
+		table = cls()
+		table.extend(rows)
+		return table
+
+	@classmethod
+	def read_json(cls, path: str) -> "SchoolTable":
+		with open(path, "r", encoding="utf-8") as f:
+			return cls.from_rows(json.load(f))
+
+	def __len__(self) -> int:
+		return len(self._text["name"])
+
+	def __iter__(self) -> Iterator[RowView]:
+		for i in range(len(self)):
+			yield RowView(self, i)
+
+	def __getitem__(self, i: int) -> RowView:
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError(i)
+		return RowView(self, i)
+
+	def append(self, row: Mapping) -> None:
+		for f, col in self._text.items():
+			v = row.get(f)
+			col.append("" if v is None else str(v))
+		for f, cat in self._cats.items():
+			v = row.get(f)
+			cat.append("" if v is None else str(v))
+		for f, arr in self._coords.items():
+			v = row.get(f)
+			arr.append(math.nan if v is None or v == "" else float(v))
+
+	def extend(self, rows: Iterable[Mapping]) -> None:
+		for row in rows:
+			self.append(row)
+
+	def value(self, field: str, i: int) -> Any:
+		col = self._text.get(field)
+		if col is not None:
+			return col[i]
+		cat = self._cats.get(field)
+		if cat is not None:
+			return cat[i]
+		arr = self._coords.get(field)
+		if arr is not None:
+			v = arr[i]
+			return None if v != v else v
+		raise KeyError(field)
+
+	def column(self, field: str) -> Sequence[Any]:
+		# Raw column: list of str, or array('d') for lat/lon (NaN = missing)
+		if field in self._text:
+			return self._text[field]
+		if field in self._coords:
+			return self._coords[field]
+		cat = self._cats[field]
+		return [cat.values[c] for c in cat.codes]
+
+	def categories(self, field: str) -> List[str]:
+		return list(self._cats[field].values)
+
+	def take(self, indices: Iterable[int]) -> "SchoolTable":
+		out = SchoolTable()
+		for i in indices:
+			out.append(RowView(self, i))
+		return out
+
+	def sorted_by_name(self) -> "SchoolTable":
+		names = self._text["name"]
+		order = sorted(range(len(self)), key=lambda i: names[i].lower())
+		return self.take(order)
+
+	def to_dicts(self) -> List[Dict[str, Any]]:
+		return [dict(r) for r in self]
+
+	def write_json(self, path: str) -> None:
+		# Byte-identical to json.dump(rows, indent=2, ensure_ascii=False), one row at a time
+		with open(path, "w", encoding="utf-8") as f:
+			if not len(self):
+				f.write("[]")
+				return
+			f.write("[\n")
+			for i, row in enumerate(self):
+				if i:
+					f.write(",\n")
+				f.write("  " + json.dumps(dict(row), ensure_ascii=False, indent=2).replace("\n", "\n  "))
+			f.write("\n]")
+
+	def write_csv(self, path: str, fieldnames: Optional[List[str]] = None) -> None:
+		fields = fieldnames or SCHOOL_FIELDS
+		with open(path, "w", encoding="utf-8-sig", newline="") as f:
+			w = csv.writer(f)
+			w.writerow(fields)
+			for i in range(len(self)):
+				row = []
+				for k in fields:
+					v = self.value(k, i)
+					row.append("" if v is None else v)
+				w.writerow(row)
@@ -0,0 +1,101 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+# Substring search over the directory's search column (directory_page.search_key)
+# through a trigram inverted index: a row can only contain the query if it
+# contains every trigram of it, so the page intersects the posting lists of
+# the query's trigrams and checks just those rows with includes().
+GRAM_SIZE = 3
+# Trigrams found in more than this share of the rows ("sch", "ool", ...) are
+# left out: their lists are the largest and barely narrow a query. A query
+# made only of such trigrams falls back to a scan.
+MAX_GRAM_SHARE = 0.1
+
+
+def grams(text: str, size: int = GRAM_SIZE) -> Set[str]:
+	return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _intersect(a: List[int], b: List[int]) -> List[int]:
+	# Both ascending; a is the shorter list
+	out: List[int] = []
+	j = 0
+	n = len(b)
+	for x in a:
+		while j < n and b[j] < x:
+			j += 1
+		if j == n:
+			break
+		if b[j] == x:
+			out.append(x)
+	return out
+
+
+class SearchIndex:
+	# Posting lists are ascending row ids; in JSON they are delta-encoded, which
+	# keeps the numbers short and the file gzip-friendly. The page decodes them
+	# the same way (postingList in directory_page.TABLE_SCRIPT).
+	def __init__(self, postings: Dict[str, List[int]], common: Iterable[str], rows: int, size: int = GRAM_SIZE) -> None:
+		self.postings = postings
+		self.common: Set[str] = set(common)
+		self.rows = rows
+		self.size = size
+
+	@classmethod
+	def build(cls, search: Sequence[str], max_share: float = MAX_GRAM_SHARE, size: int = GRAM_SIZE) -> "SearchIndex":
+		postings: Dict[str, List[int]] = {}
+		for i, text in enumerate(search):
+			for g in grams(text, size):
+				postings.setdefault(g, []).append(i)
+		limit = max(1, int(max_share * len(search)))
+		common = {g for g, ids in postings.items() if len(ids) > limit}
+		kept = {g: ids for g, ids in postings.items() if g not in common}
+		return cls(kept, common, len(search), size)
+
+	def to_json(self) -> Dict[str, Any]:
+		postings: Dict[str, List[int]] = {}
+		for g in sorted(self.postings):
+			prev = 0
+			deltas: List[int] = []
+			for i in self.postings[g]:
+				deltas.append(i - prev)
+				prev = i
+			postings[g] = deltas
+		return {"size": self.size, "rows": self.rows, "common": sorted(self.common), "postings": postings}
+
+	@classmethod
+	def from_json(cls, data: Dict[str, Any]) -> "SearchIndex":
+		postings: Dict[str, List[int]] = {}
+		for g, deltas in data["postings"].items():
+			ids: List[int] = []
+			prev = 0
+			for d in deltas:
+				prev += d
+				ids.append(prev)
+			postings[g] = ids
+		return cls(postings, data["common"], data["rows"], data["size"])
+
+	def candidates(self, q: str) -> Optional[List[int]]:
+		# Ascending ids of the rows that may contain q, or None when the index
+		# cannot narrow q (shorter than a trigram, or only common trigrams)
+		lists: List[List[int]] = []
+		for g in grams(q, self.size):
+			ids = self.postings.get(g)
+			if ids is not None:
+				lists.append(ids)
+			elif g not in self.common:
+				return []
+		if not lists:
+			return None
+		lists.sort(key=len)
+		out = lists[0]
+		for ids in lists[1:]:
+			if not out:
+				break
+			out = _intersect(out, ids)
+		return out
+
+	def search(self, search: Sequence[str], q: str) -> List[int]:
+		# Rows whose search text contains q: the same result as a full scan
+		ids = self.candidates(q)
+		rows: Iterable[int] = range(len(search)) if ids is None else ids
+		return [i for i in rows if q in search[i]]
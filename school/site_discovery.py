@@ -0,0 +1,141 @@
+import html
+import os
+import re
+import urllib.parse
+import urllib.robotparser
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Sitemaps fetched per site (an index counts as one) and URLs kept from them
+MAX_SITEMAP_FETCHES = 3
+MAX_SITEMAP_URLS = 5000
+
+# Links to these are never a section page
+SKIP_EXTENSIONS = {
+	".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip", ".doc", ".docx",
+	".xls", ".xlsx", ".ppt", ".pptx", ".mp4", ".mp3", ".xml", ".gz", ".css", ".js",
+}
+
+_LOC_RE = re.compile(r"(?is)<loc>\s*(.*?)\s*</loc>")
+_WORD_SPLIT_RE = re.compile(r"[-_.+\s]+")
+
+
+def robots_url(url: str) -> str:
+	parts = urllib.parse.urlsplit(url)
+	return urllib.parse.urlunsplit((parts.scheme or "http", parts.netloc, "/robots.txt", "", ""))
+
+
+def parse_robots(text: str) -> urllib.robotparser.RobotFileParser:
+	rules = urllib.robotparser.RobotFileParser()
+	rules.parse(text.splitlines())
+	return rules
+
+
+def crawl_delay(rules: urllib.robotparser.RobotFileParser, agent: str = "*") -> Optional[float]:
+	# Crawl-delay, or the interval implied by Request-rate, whichever is longer
+	delays: List[float] = []
+	try:
+		delay = rules.crawl_delay(agent)
+		if delay is not None:
+			delays.append(float(delay))
+		rate = rules.request_rate(agent)
+		if rate is not None and rate.requests > 0:
+			delays.append(rate.seconds / rate.requests)
+	except (TypeError, ValueError):
+		pass
+	return max(delays) if delays else None
+
+
+def sitemaps_for(base_url: str, robots_text: Optional[str]) -> List[str]:
+	# Sitemap: lines from robots.txt, else the conventional /sitemap.xml
+	found: List[str] = []
+	if robots_text:
+		found = list(parse_robots(robots_text).site_maps() or [])
+	if not found:
+		found = [urllib.parse.urljoin(base_url, "/sitemap.xml")]
+	return found
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[str], List[str]]:
+	# (page URLs, child sitemap URLs) of a <urlset> or <sitemapindex>; falls
+	# back to picking out <loc> elements when the XML does not parse
+	try:
+		root = ET.fromstring(xml_text.strip().encode("utf-8"))
+	except ET.ParseError:
+		locs = [html.unescape(loc) for loc in _LOC_RE.findall(xml_text)]
+		if "<sitemapindex" in xml_text[:2000].lower():
+			return [], locs
+		return locs, []
+	is_index = root.tag.rsplit("}", 1)[-1].lower() == "sitemapindex"
+	locs = [(el.text or "").strip() for el in root.iter() if el.tag.rsplit("}", 1)[-1].lower() == "loc"]
+	locs = [loc for loc in locs if loc]
+	return ([], locs) if is_index else (locs, [])
+
+
+def _site(host: str) -> str:
+	host = host.lower()
+	return host[4:] if host.startswith("www.") else host
+
+
+def score_candidate(url: str, hints: Iterable[str], anchor: str = "") -> float:
+	# How likely `url` is the page for a section: a hint as a word of the last
+	# path segment beats one inside it, then one in the query, then one in a
+	# parent segment; a hint in the anchor text adds to that. Deep paths and
+	# unrelated query strings lose a little. 0 means not a candidate.
+	parts = urllib.parse.urlsplit(url)
+	segments = [s for s in urllib.parse.unquote(parts.path).lower().split("/") if s]
+	stem, ext = os.path.splitext(segments[-1]) if segments else ("", "")
+	if ext in SKIP_EXTENSIONS:
+		return 0.0
+	words = set(_WORD_SPLIT_RE.split(stem))
+	query = urllib.parse.unquote(parts.query).lower()
+	path_score = 0.0
+	anchor_score = 0.0
+	for hint in hints:
+		if hint in words:
+			path_score = max(path_score, 4.0)
+		elif hint in stem:
+			path_score = max(path_score, 3.0)
+		elif hint in query:
+			# index.php?page=fees
+			path_score = max(path_score, 2.0)
+		elif any(hint in seg for seg in segments[:-1]):
+			path_score = max(path_score, 1.0)
+		if anchor and hint in anchor:
+			anchor_score = 2.0
+	score = path_score + anchor_score
+	if not score:
+		return 0.0
+	return max(0.1, score - 0.25 * max(0, len(segments) - 1) - (0.5 if query and path_score != 2.0 else 0.0))
+
+
+def rank_candidates(scored: Iterable[Tuple[float, str]]) -> List[str]:
+	# Best first; ties go to the shorter URL, then to the earlier one
+	best: Dict[str, Tuple[float, int]] = {}
+	for order, (score, url) in enumerate(scored):
+		if score <= 0:
+			continue
+		old = best.get(url)
+		if old is None or score > old[0]:
+			best[url] = (score, old[1] if old is not None else order)
+	return sorted(best, key=lambda u: (-best[u][0], len(u), best[u][1]))
+
+
+def sitemap_candidates(urls: Iterable[str], base_url: str, hints_by_section: Dict[str, List[str]]) -> Dict[str, List[Tuple[float, str]]]:
+	# Scored same-site sitemap URLs per section (www. and scheme ignored)
+	site = _site(urllib.parse.urlsplit(base_url).hostname or "")
+	out: Dict[str, List[Tuple[float, str]]] = {col: [] for col in hints_by_section}
+	for n, url in enumerate(urls):
+		if n >= MAX_SITEMAP_URLS:
+			break
+		try:
+			host = urllib.parse.urlsplit(url).hostname or ""
+		except ValueError:
+			continue
+		if _site(host) != site:
+			continue
+		for col, hints in hints_by_section.items():
+			score = score_candidate(url, hints)
+			if score > 0:
+				out[col].append((score, url))
+	return out
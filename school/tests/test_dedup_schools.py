@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from dedup_schools import Deduper
+from spatial_index import EARTH_RADIUS_KM
+
+# Pairs seen in the city files: (name, name, distance in km, same school)
+KNOWN_PAIRS = [
+	("Nirmala Rani High School", "Nirmala Rani High School", 0.02, True),
+	("Cardinal Gracias High School", "Cardinal Gracias high school", 0.003, True),
+	("MCD Primary school No. 2", "MCD PRIMARY SCHOOL NO. 2", 0.02, True),
+	("Calcutta S. D. A. Primary School", "Calcutta SDA Primary School", 0.053, True),
+	("S.T. Joseph's High School", "St. Joseph's High School", 0.047, True),
+	("Sree krishna Grammar School", "Sri Krishna Grammar School", 0.03, True),
+	("Dnayneshwar Vidyalaya", "Dnyaneshwar Vidyalaya", 0.027, True),
+	(
+		"Dr. Rathnavelu Subramaniam Muthialpet Girls Higher Secondary School",
+		"Dr.Rathinavel Subramanian Muthialpet Girls Higher Secondary School",
+		0.029,
+		True,
+	),
+	("Mother's International School", "The Mother's International School", 0.017, True),
+	("Fellowship International School", "Fellowship School", 0.044, True),
+	("Orchard International School", "Orchids The International School", 0.007, False),
+	("GHPS Lakkasandra", "GUHPS Lakkasandra", 0.102, False),
+	("GKHPS Vivekangara", "GTELPS Vivekanagara", 0.013, False),
+	("GHPS (K) Jogupalya", "GTLPS jogupalya", 0.023, False),
+	("Government Model Primary School", "Government Model Public School", 0.048, False),
+	("Department of Electrical & Electronics Engg.", "Department of Electronics", 0.03, False),
+	("Belaghata deshbondhu school for girls", "Beleghata Deshabandhu High School (Main)", 0.024, False),
+	("Gnanabodhini English Higher Primary School", "Gnanabodhini English Pre-Primary School", 0.026, False),
+	("Gnanabodhini English Higher Primary School", "Gnanabodhini School", 0.04, False),
+	("The Oxford English School", "The Oxford Secondary School", 0.036, False),
+	("The Oxford Secondary School", "The Oxford Senior Secondary School", 0.008, False),
+	("Don Bosco High School", "Don Bosco Primary School", 0.02, False),
+	("Parle Tilak English School", "Parle Tilak Marathi School", 0.036, False),
+	("Sarvodaya Bal Vidyalaya", "Sarvodaya Kanya Vidyalaya", 0.063, False),
+	("Napoo High School", "VLN High School", 0.027, False),
+	("Disha Public School", "Jasola Public School", 0.034, False),
+]
+
+
+@pytest.mark.parametrize("a,b,km,same", KNOWN_PAIRS)
+def test_known_pair(a, b, km, same):
+	# Two entries `km` apart with no contact details; only the generic words
+	# are common, as in a run over a single small city
+	deduper = Deduper()
+	deduper.add("", [
+		{"name": a, "lat": 0.0, "lon": 0.0},
+		{"name": b, "lat": math.degrees(km / EARTH_RADIUS_KM), "lon": 0.0},
+	])
+	clusters = deduper.run()
+	m = deduper.score(0, 1)
+	assert (clusters == [[0, 1]]) == same, f"scored {m.score:.3f}" if m else "not scored"
@@ -0,0 +1,104 @@
+import io
+import json
+
+import pytest
+
+import multi_city_schools
+from multi_city_schools import EndpointPool, FetchOptions, run_city
+
+CITY = multi_city_schools.DEFAULT_CITIES[0]
+SINCE = "2024-04-01T00:00:00Z"
+
+
+class _Response(io.BytesIO):
+	def getcode(self):
+		return 200
+
+
+def _school(eid, name):
+	return {"type": "node", "id": eid, "lat": 19.0 + eid / 1000.0, "lon": 72.8, "tags": {"amenity": "school", "name": name}}
+
+
+@pytest.fixture
+def overpass(monkeypatch, tmp_path):
+	# Serve `body` for every Overpass request; outputs go to a scratch directory
+	monkeypatch.chdir(tmp_path)
+	served = {}
+	monkeypatch.setattr(multi_city_schools, "http_post_stream", lambda url, body, timeout=240: _Response(served["body"]))
+
+	def serve(elements, remark=None):
+		doc = {"version": 0.6, "osm3s": {"timestamp_osm_base": "2024-05-01T10:00:00Z"}, "elements": elements}
+		if remark:
+			doc["remark"] = remark
+		served["body"] = json.dumps(doc).encode("utf-8")
+
+	return serve
+
+
+def _pool():
+	return EndpointPool(multi_city_schools.OVERPASS_ENDPOINTS, min_interval_s=0.0)
+
+
+def test_full_fetch_writes_city(overpass, tmp_path):
+	overpass([_school(1, "A School"), _school(2, "B School")])
+	result = run_city(CITY, _pool())
+	assert not result.error
+	assert result.rows == 2
+	assert result.osm_base == "2024-05-01T10:00:00Z"
+	assert (tmp_path / f"{CITY.key}_schools.csv").exists()
+
+
+def test_timed_out_full_fetch_writes_nothing(overpass, tmp_path):
+	overpass([_school(1, "A School")], remark="runtime error: Query timed out in \"query\" at line 3 after 241 seconds.")
+	result = run_city(CITY, _pool())
+	assert "timed out" in result.error
+	assert result.osm_base == ""
+	assert not (tmp_path / f"{CITY.key}_schools.json").exists()
+	assert not (tmp_path / f"{CITY.key}_schools.csv").exists()
+
+
+def test_timed_out_change_fetch_keeps_previous_rows(overpass, tmp_path):
+	overpass([_school(1, "A School"), _school(2, "B School"), _school(3, "C School")])
+	run_city(CITY, _pool())
+	before = (tmp_path / f"{CITY.key}_schools.json").read_bytes()
+
+	# Only the first school's id made it out before the server gave up
+	overpass([{"type": "node", "id": 1}], remark="runtime error: Query run out of memory using about 2048 MB of RAM.")
+	result = run_city(CITY, _pool(), FetchOptions(incremental=True), since=SINCE)
+	assert result.error
+	assert result.osm_base == ""
+	assert (tmp_path / f"{CITY.key}_schools.json").read_bytes() == before
+
+
+def test_change_fetch_applies_deletions(overpass, tmp_path):
+	overpass([_school(1, "A School"), _school(2, "B School")])
+	run_city(CITY, _pool())
+	overpass([{"type": "node", "id": 1}])
+	result = run_city(CITY, _pool(), FetchOptions(incremental=True), since=SINCE)
+	assert not result.error
+	assert result.rows == 1
+	assert result.note == "incremental +0 ~0 -1"
+
+
+class _Locator:
+	# Schools south of 19.002 are in the first city, the rest in the second
+	def __init__(self, keys):
+		self._keys = keys
+
+	def keys(self):
+		return self._keys
+
+	def locate(self, lat, lon):
+		return [self._keys[0] if lat < 19.002 else self._keys[1]]
+
+
+def test_batched_reports_each_city_and_the_request_once(overpass, monkeypatch):
+	a, b = multi_city_schools.DEFAULT_CITIES[:2]
+	monkeypatch.setattr(multi_city_schools, "fetch_boundaries", lambda cities, pool=None, options=None: _Locator([a.key, b.key]))
+	overpass([_school(1, "A School"), _school(2, "B School"), _school(3, "C School"), {"type": "node", "id": 4, "lat": 19.0, "lon": 72.8}])
+	results, batch = multi_city_schools.run_batched([a, b], _pool(), FetchOptions())
+	by_key = {r.key: r for r in results}
+	assert (by_key[a.key].rows, by_key[a.key].raw_elements) == (1, 1)
+	assert (by_key[b.key].rows, by_key[b.key].raw_elements) == (2, 2)
+	assert all(r.seconds == 0.0 and not r.error for r in results)
+	assert (batch.rows, batch.raw_elements) == (3, 4)
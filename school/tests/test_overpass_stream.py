@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from overpass_stream import OverpassStreamError, iter_elements
+
+RESPONSE = {
+	"version": 0.6,
+	"generator": "Overpass API 0.7.62.1 084b4234",
+	"osm3s": {"timestamp_osm_base": "2024-05-01T10:00:00Z", "copyright": "The data included in this document is from www.openstreetmap.org."},
+	"elements": [
+		{"type": "node", "id": 1, "lat": 19.0760, "lon": 72.8777, "tags": {"amenity": "school", "name": "St. Mary's"}},
+		{"type": "way", "id": 22, "center": {"lat": 1.5e1, "lon": -7.25E+1}, "tags": {"amenity": "school"}},
+	],
+	"remark": "runtime error: Query timed out",
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_elements_and_meta_survive_any_chunking(chunk_size):
+	body = json.dumps(RESPONSE, ensure_ascii=False).encode("utf-8")
+	meta = {}
+	elements = list(iter_elements(io.BytesIO(body), meta, chunk_size=chunk_size))
+	assert elements == RESPONSE["elements"]
+	assert meta == {k: v for k, v in RESPONSE.items() if k != "elements"}
+
+
+def test_number_split_after_the_point():
+	# raw_decode stops at "0." and would return 0 without a re-fill
+	meta = {}
+	list(iter_elements(io.BytesIO(b'{"version":0.6,"elements":[]}'), meta, chunk_size=1))
+	assert meta["version"] == 0.6
+
+
+def test_truncated_response_raises():
+	body = json.dumps(RESPONSE).encode("utf-8")[:120]
+	with pytest.raises(OverpassStreamError):
+		list(iter_elements(io.BytesIO(body), {}, chunk_size=1))